@@ -1,26 +1,138 @@
 import logging
+import re
+import threading
+import unicodedata
+from concurrent.futures import Future
+from typing import Callable, Optional
+
 from langchain.agents import Tool
 from langchain_google_community import GoogleSearchAPIWrapper
 
+from config import (
+    GOOGLE_SEARCH_CACHE_TTL,
+    GOOGLE_SEARCH_EMPTY_CACHE_TTL,
+    GOOGLE_SEARCH_CACHE_PATH,
+    GOOGLE_SEARCH_RATE_PER_SEC,
+    GOOGLE_SEARCH_BURST,
+    GOOGLE_SEARCH_WAIT_SECONDS,
+)
+from utils.rate_limit import TokenBucket
+from utils.ttl_cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+NUM_RESULTS = 5
+_YEAR_MARKERS = ["2025", "令和7", "R7"]
+_SYSTEM_KEYWORDS = ["制度", "給付", "補助", "支援", "助成", "要件", "対象"]
+
+
+def normalize_search_query(query: str) -> str:
+    """全角/半角と空白を正規化し、年の指定がない制度系クエリには 2025 を付与する。"""
+    q = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", query or "")).strip()
+    # If the query is about systems/benefits without a year, append 2025
+    if not any(y in q for y in _YEAR_MARKERS) and any(k in q for k in _SYSTEM_KEYWORDS):
+        q += " 2025"
+    return q
+
+
+def search_cache_key(normalized: str) -> str:
+    """空白・大文字小文字・年表記（令和7/R7/2025）の違いを同一視したキャッシュキー。
+
+    語順は検索結果の順位に影響するため区別する。
+    """
+    q = normalized.lower()
+    q = re.sub(r"令和7年?|\br7\b", "2025", q)
+    return " ".join(q.split())
+
+
+class SearchResultStore:
+    """Google 検索結果の TTL ストア。レート制限と同一クエリの同時実行の集約を行う。"""
 
-def create_google_search_tool(google_api_key: str, google_cse_id: str | None) -> Tool:
+    def __init__(self, cache: TTLCache, bucket: TokenBucket, wait_seconds: float, empty_ttl: float = 0.0):
+        self.cache = cache
+        self.bucket = bucket
+        self.wait_seconds = wait_seconds
+        self.empty_ttl = empty_ttl
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self.counters = {"requests": 0, "api_calls": 0, "coalesced": 0, "rate_limited": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def search(self, query: str, fetch: Callable[[str], list]) -> list:
+        """正規化済みクエリの検索結果を返す。キャッシュ → 実行中の同一クエリ → API の順に参照する。"""
+        self._count("requests")
+        key = search_cache_key(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.counters["coalesced"] += 1
+        if not owner:
+            return future.result(timeout=self.wait_seconds + 60)
+
+        try:
+            if not self.bucket.acquire(self.wait_seconds):
+                self._count("rate_limited")
+                raise RuntimeError("検索APIのレート制限に達しました。しばらく待ってから再試行してください。")
+            self._count("api_calls")
+            results = fetch(query) or []
+            if results:
+                self.cache.put(key, results)
+            elif self.empty_ttl > 0:
+                self.cache.put(key, results, ttl=self.empty_ttl)
+            future.set_result(results)
+            return results
+        except Exception as e:
+            self._count("errors")
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, "cache": self.cache.stats()}
+
+
+google_search_store = SearchResultStore(
+    cache=TTLCache(
+        ttl=GOOGLE_SEARCH_CACHE_TTL, max_items=1000, path=GOOGLE_SEARCH_CACHE_PATH or None, namespace="google_search"
+    ),
+    bucket=TokenBucket(rate=GOOGLE_SEARCH_RATE_PER_SEC, capacity=GOOGLE_SEARCH_BURST),
+    wait_seconds=GOOGLE_SEARCH_WAIT_SECONDS,
+    empty_ttl=GOOGLE_SEARCH_EMPTY_CACHE_TTL,
+)
+
+
+def create_google_search_tool(
+    google_api_key: str, google_cse_id: str | None, store: Optional[SearchResultStore] = None
+) -> Tool:
     """
     Create a robust Google search tool that safely fetches top results
     and returns structured text (title/link/snippet). Always returns
     an explanatory message instead of None on failures.
     """
     search_api = GoogleSearchAPIWrapper(google_api_key=google_api_key, google_cse_id=google_cse_id)
+    store = store or google_search_store
 
     def safe_google_search(query: str) -> str:
         """Execute Google search safely and format the results."""
         try:
-            # If the query is about systems/benefits without a year, append 2025
-            if not any(y in query for y in ["2025", "令和7", "R7"]) and any(
-                k in query for k in ["制度", "給付", "補助", "支援", "助成", "要件", "対象"]
-            ):
-                query += " 2025"
-
-            results = search_api.results(query, num_results=5)
+            query = normalize_search_query(query)
+            results = store.search(query, lambda q: search_api.results(q, num_results=NUM_RESULTS))
             if not results:
                 return "Google検索結果は0件でした。クエリを具体化してください。"
 
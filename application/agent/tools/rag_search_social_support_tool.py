@@ -1,20 +1,154 @@
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from typing import Optional
+
+import numpy as np
 from langchain.agents import Tool
-from config import RAG_PROJECT_ID, RAG_LOCATION, RAG_CORPUS_RESOURCE, RAG_MODEL
+from config import (
+    RAG_PROJECT_ID,
+    RAG_LOCATION,
+    RAG_CORPUS_RESOURCE,
+    RAG_MODEL,
+    RAG_CACHE_TTL,
+    RAG_CACHE_MAX_ITEMS,
+    RAG_CACHE_PATH,
+    RAG_CACHE_SIMILARITY,
+    RAG_CACHE_EMBED_TIMEOUT,
+)
+from infra.embedding import embedding_service
 from utils.auth.google_credentials import get_google_service_account_credentials
+from utils.ttl_cache import TTLCache
 from google import genai
 from google.genai import types
 
 
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """認証情報と genai.Client はプロセス内で1度だけ生成して使い回す。"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Build explicit credentials from FIREBASE_SERVICE_ACCOUNT and pass to Client
+                creds = get_google_service_account_credentials()
+                _client = genai.Client(vertexai=True, project=RAG_PROJECT_ID, location=RAG_LOCATION, credentials=creds)
+    return _client
+
+
+def _normalize_situation(situation: str) -> str:
+    text = unicodedata.normalize("NFKC", situation or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class RagAnswerCache:
+    """RAG 回答の TTL キャッシュ。キーは (コーパスID, 正規化済み状況テキスト)。
+
+    similarity_threshold > 0 の場合、完全一致しなくても埋め込みのコサイン類似度が閾値以上の
+    過去の状況があればその回答を返す。
+    """
+
+    def __init__(self, store: TTLCache, corpus: str, similarity_threshold: float = 0.0, embed_timeout: float = 2.0):
+        self.store = store
+        self.corpus = corpus
+        self.similarity_threshold = similarity_threshold
+        self.embed_timeout = embed_timeout
+        self._lock = threading.Lock()
+        self._keys: list[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self.similar_hits = 0
+
+    def key(self, normalized: str) -> str:
+        return hashlib.sha256(f"{self.corpus}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, normalized: str) -> tuple[Optional[str], Optional[list[float]]]:
+        """(回答, 埋め込み) を返す。埋め込みは類似検索を行った場合のみ（put で再利用する）。"""
+        answer = self.store.get(self.key(normalized))
+        if answer is not None or self.similarity_threshold <= 0:
+            return answer, None
+        # キャッシュ参照が回答を遅らせないよう、埋め込みは1回のみ短いタイムアウトで試す（失敗時は類似判定を省略）
+        vec = _unit(embedding_service.embed([normalized], max_attempts=1, timeout=self.embed_timeout)[0])
+        if vec is None:
+            return None, None
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vec.size:
+                return None, vec.tolist()
+            sims = self._matrix @ vec
+            i = int(np.argmax(sims))
+            similar_key = self._keys[i] if sims[i] >= self.similarity_threshold else None
+        if similar_key is not None:
+            answer = self.store.get(similar_key)
+            if answer is not None:
+                self.similar_hits += 1
+                return answer, None
+        return None, vec.tolist()
+
+    def put(self, normalized: str, answer: str, vec: Optional[list[float]] = None) -> None:
+        key = self.key(normalized)
+        self.store.put(key, answer)
+        unit = _unit(vec)
+        if unit is None:
+            return
+        with self._lock:
+            if key in self._keys:
+                return
+            if self._matrix is not None and self._matrix.shape[1] != unit.size:
+                return
+            self._keys.append(key)
+            self._matrix = unit[None, :] if self._matrix is None else np.vstack([self._matrix, unit[None, :]])
+            if len(self._keys) > self.store.max_items:
+                self._keys = self._keys[1:]
+                self._matrix = self._matrix[1:]
+
+    def stats(self) -> dict:
+        return {**self.store.stats(), "similar_hits": self.similar_hits, "similarity_items": len(self._keys)}
+
+
+def _unit(vec) -> Optional[np.ndarray]:
+    if not vec:
+        return None
+    arr = np.asarray(vec, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(arr))
+    if not np.isfinite(norm) or norm == 0.0:
+        return None
+    return arr / norm
+
+
+rag_answer_cache = RagAnswerCache(
+    TTLCache(ttl=RAG_CACHE_TTL, max_items=RAG_CACHE_MAX_ITEMS, path=RAG_CACHE_PATH or None, namespace="rag"),
+    corpus=RAG_CORPUS_RESOURCE,
+    similarity_threshold=RAG_CACHE_SIMILARITY,
+    embed_timeout=RAG_CACHE_EMBED_TIMEOUT,
+)
+
+
 def create_rag_search_social_support_tool() -> Tool:
     """
     Return a LangChain Tool that queries Vertex RAG Store for relevant policies/services.
     """
 
     def rag_suggest(situation: str) -> str:
-        # Build explicit credentials from FIREBASE_SERVICE_ACCOUNT and pass to Client
-        # (falls back to ADC if building fails or is omitted)
-        creds = get_google_service_account_credentials()
-        client = genai.Client(vertexai=True, project=RAG_PROJECT_ID, location=RAG_LOCATION, credentials=creds)
+        normalized = _normalize_situation(situation)
+        vec = None
+        try:
+            cached, vec = rag_answer_cache.get(normalized)
+        except Exception as e:
+            logger.warning(f"RAG cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            return cached
+
+        try:
+            client = _get_client()
+        except Exception as e:
+            return f"(ERROR) RAG検索でエラーが発生しました: {e}"
 
         contents = [
             types.Content(
@@ -72,7 +206,12 @@ def create_rag_search_social_support_tool() -> Tool:
                     t = getattr(p, "text", None)
                     if t:
                         texts.append(t)
-            return "\n".join(texts).strip() or "(NO_RESULT) 返答テキストが空でした。"
+            answer = "\n".join(texts).strip()
+            if not answer:
+                return "(NO_RESULT) 返答テキストが空でした。"
+            # エラー/空の結果はキャッシュしない
+            rag_answer_cache.put(normalized, answer, vec)
+            return answer
         except Exception as e:
             return f"(ERROR) RAG検索でエラーが発生しました: {e}"
 
@@ -1,7 +1,11 @@
+import asyncio
 import google.generativeai as genai
 import json
 import logging
 
+from utils.assessment_digest import assessment_digest
+from .llm_utils import LLMCallLimiter, parse_json_response
+
 # loggingの設定
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
@@ -11,15 +15,26 @@ class AssessmentMappingAgent:
         self,
         api_key: str,
         model_name: str = "gemini-1.5-flash",
+        max_concurrency: int = 4,
+        timeout: float = 60.0,
     ):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
+        self.limiter = LLMCallLimiter(max_concurrency, timeout)
 
-    def generate_suggestions_from_assessment(self, assessment_data: dict) -> dict:
+    async def _agenerate_json(self, prompt: str, label: str) -> dict:
         try:
-            assessment_json = json.dumps(assessment_data, ensure_ascii=False, indent=2)
-        except Exception:
-            assessment_json = str(assessment_data)
+            resp = await self.limiter.run(lambda: self.model.generate_content_async(prompt))
+            return parse_json_response(resp)
+        except asyncio.TimeoutError:
+            logging.warning(f"{label} timed out ({self.limiter.timeout}s)")
+            return {"error": "Gemini API呼び出しがタイムアウトしました。"}
+        except Exception as e:
+            logging.error(f"{label} failed: {e}", exc_info=True)
+            return {"error": f"Gemini API呼び出しエラー: {e}"}
+
+    def _build_suggestions_prompt(self, assessment_data: dict) -> str:
+        assessment_json = assessment_digest(assessment_data).context(max_chars=None)
 
         prompt = f"""
         あなたは社会福祉士の業務を支援するAIアシスタントです。
@@ -40,43 +55,20 @@ class AssessmentMappingAgent:
         JSONのみを返してください。説明や前置きは不要です。
         """
 
+        return prompt
+
+    def generate_suggestions_from_assessment(self, assessment_data: dict) -> dict:
         try:
-            resp = self.model.generate_content(prompt)
-            text = ""
-            if getattr(resp, "candidates", None):
-                c0 = resp.candidates[0]
-                parts = getattr(getattr(c0, "content", None), "parts", [])
-                if parts:
-                    text = getattr(parts[0], "text", "").strip()
-
-            if not text:
-                return {"error": "Geminiからの応答がありませんでした。"}
-
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
-
-            try:
-                return json.loads(text)
-            except Exception:
-                start = text.find("{")
-                end = text.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    return json.loads(text[start : end + 1])
-                return {"error": "Gemini応答のJSON解析に失敗しました。", "raw": text}
+            resp = self.model.generate_content(self._build_suggestions_prompt(assessment_data))
+            return parse_json_response(resp)
         except Exception as e:
             logging.error(f"generate_suggestions failed: {e}", exc_info=True)
             return {"error": f"Gemini API呼び出しエラー: {e}"}
 
-    def map_to_assessment_items(self, text_content: str, assessment_items: dict) -> dict:
-        """
-        面談記録テキストを指定のアセスメント項目構成にマッピングして要約を返す。
+    async def agenerate_suggestions_from_assessment(self, assessment_data: dict) -> dict:
+        return await self._agenerate_json(self._build_suggestions_prompt(assessment_data), "generate_suggestions")
 
-        旧実装(df520a1)ではNLP抽出 + Geminiでのマッピングを行っていたが、
-        現行ではGemini(GenerativeModel)のみで自己完結するように簡潔化して復元する。
-        """
+    def _build_mapping_prompt(self, text_content: str, assessment_items: dict) -> str:
         try:
             items_json = json.dumps(assessment_items, ensure_ascii=False, indent=2)
         except Exception:
@@ -101,34 +93,23 @@ class AssessmentMappingAgent:
         次のJSONのみを返してください。説明文や前置きは不要です。
         """
 
+        return prompt
+
+    def map_to_assessment_items(self, text_content: str, assessment_items: dict) -> dict:
+        """
+        面談記録テキストを指定のアセスメント項目構成にマッピングして要約を返す。
+
+        旧実装(df520a1)ではNLP抽出 + Geminiでのマッピングを行っていたが、
+        現行ではGemini(GenerativeModel)のみで自己完結するように簡潔化して復元する。
+        """
         try:
-            resp = self.model.generate_content(prompt)
-            # 期待: JSON文字列
-            text = ""
-            if getattr(resp, "candidates", None):
-                c0 = resp.candidates[0]
-                parts = getattr(getattr(c0, "content", None), "parts", [])
-                if parts:
-                    text = getattr(parts[0], "text", "").strip()
-            if not text:
-                return {"error": "Geminiからの応答がありませんでした。"}
-
-            # フェンス ```json ... ``` を除去
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
-
-            try:
-                return json.loads(text)
-            except Exception:
-                # 緊急フォールバック: 最初の { から最後の } を抽出
-                start = text.find("{")
-                end = text.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    return json.loads(text[start : end + 1])
-                return {"error": "Gemini応答のJSON解析に失敗しました。", "raw": text}
+            resp = self.model.generate_content(self._build_mapping_prompt(text_content, assessment_items))
+            return parse_json_response(resp)
         except Exception as e:
             logging.error(f"map_to_assessment_items failed: {e}", exc_info=True)
             return {"error": f"Gemini API呼び出しエラー: {e}"}
+
+    async def amap_to_assessment_items(self, text_content: str, assessment_items: dict) -> dict:
+        """map_to_assessment_items の非同期版（同時実行数・タイムアウト制御付き）。"""
+        prompt = self._build_mapping_prompt(text_content, assessment_items)
+        return await self._agenerate_json(prompt, "map_to_assessment_items")
@@ -4,6 +4,8 @@ import asyncio
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 
+from utils.assessment_digest import assessment_digest
+
 # loggingの設定
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
@@ -45,7 +47,7 @@ class ConversationalAgent:
         message: str,
         chat_history: list = [],
     ):
-        context = json.dumps(assessment_data, ensure_ascii=False, indent=2)[:8000]
+        context = assessment_digest(assessment_data).context()
         history_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in chat_history])
 
         try:
@@ -7,6 +7,7 @@ from langchain.tools.render import render_text_description
 from langchain.prompts import PromptTemplate
 from typing import Optional
 from models.pydantic_models import Client
+from utils.assessment_digest import assessment_digest
 
 from agent.prompts.conversational_agent import CONVERSATIONAL_AGENT_PROMPT
 from agent.tools.rag_search_social_support_tool import create_rag_search_social_support_tool
@@ -57,7 +58,7 @@ class InteractiveSupportPlanAgent:
 
         この関数は非同期ジェネータを返すため、FastAPI等でStreamingResponseとして利用できます。
         """
-        context = json.dumps(assessment_data, ensure_ascii=False, indent=2)[:8000]
+        context = assessment_digest(assessment_data).context()
         conv_input = f"利用者: {client_name}\n状況: {context}\n質問: {message}".replace("ClientName", client_name)
         try:
 
@@ -102,12 +103,9 @@ class InteractiveSupportPlanAgent:
 
             return err_gen()
 
-    def summarize_for_resource_match(
+    def _build_resource_match_prompt(
         self, assessment_text: str, client: Optional[Client] = None, resource_context: Optional[str] = None
     ) -> str:
-        """
-        与えられたアセスメントテキストと社会資源の情報を基に、マッチングに適した要約や提案理由を生成する
-        """
         client_info = ""
         if client and client.name:
             client_info = f"クライアントは {client.name} さんです。"
@@ -148,18 +146,43 @@ class InteractiveSupportPlanAgent:
 
             要約:
             """
+        return prompt.strip()
+
+    @staticmethod
+    def _resource_match_fallback(assessment_text: str, resource_context: Optional[str]) -> str:
+        if resource_context:
+            return json.dumps(
+                {
+                    "is_match": False,
+                    "reason": "AIによる判定中にエラーが発生しました。",
+                    "task_suggestion": "手動で要件を確認してください。",
+                }
+            )
+        # fallback to simple text extraction
+        return assessment_text[:2000]
+
+    def summarize_for_resource_match(
+        self, assessment_text: str, client: Optional[Client] = None, resource_context: Optional[str] = None
+    ) -> str:
+        """
+        与えられたアセスメントテキストと社会資源の情報を基に、マッチングに適した要約や提案理由を生成する
+        """
+        prompt = self._build_resource_match_prompt(assessment_text, client, resource_context)
         try:
-            response = self.llm.invoke(prompt.strip())
+            response = self.llm.invoke(prompt)
             return response.content
         except Exception as e:
             logging.error(f"summarize_for_resource_match failed: {e}", exc_info=True)
-            if resource_context:
-                return json.dumps(
-                    {
-                        "is_match": False,
-                        "reason": "AIによる判定中にエラーが発生しました。",
-                        "task_suggestion": "手動で要件を確認してください。",
-                    }
-                )
-            # fallback to simple text extraction
-            return assessment_text[:2000]
+            return self._resource_match_fallback(assessment_text, resource_context)
+
+    async def asummarize_for_resource_match(
+        self, assessment_text: str, client: Optional[Client] = None, resource_context: Optional[str] = None
+    ) -> str:
+        """summarize_for_resource_match の非同期版。イベントループをブロックしない。"""
+        prompt = self._build_resource_match_prompt(assessment_text, client, resource_context)
+        try:
+            response = await self.llm.ainvoke(prompt)
+            return response.content
+        except Exception as e:
+            logging.error(f"asummarize_for_resource_match failed: {e}", exc_info=True)
+            return self._resource_match_fallback(assessment_text, resource_context)
@@ -0,0 +1,79 @@
+"""Gemini (google.generativeai) 呼び出しの共通処理。
+
+- 応答テキストの取り出しと JSON 解析（```json フェンスや前後の説明文を許容）
+- 非同期呼び出しの同時実行数制限とタイムアウト
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def response_text(resp) -> str:
+    """GenerateContentResponse から先頭候補のテキストを取り出す。"""
+    if getattr(resp, "candidates", None):
+        c0 = resp.candidates[0]
+        parts = getattr(getattr(c0, "content", None), "parts", [])
+        if parts:
+            return getattr(parts[0], "text", "").strip()
+    return ""
+
+
+def parse_json_response(resp) -> dict:
+    """Gemini 応答を JSON として解析する。失敗時は {"error": ...} を返す。"""
+    text = response_text(resp)
+    if not text:
+        return {"error": "Geminiからの応答がありませんでした。"}
+
+    # フェンス ```json ... ``` を除去
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.endswith("```"):
+        text = text[:-3]
+    text = text.strip()
+
+    try:
+        return json.loads(text)
+    except Exception:
+        # 緊急フォールバック: 最初の { から最後の } を抽出
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            try:
+                return json.loads(text[start : end + 1])
+            except Exception:
+                pass
+        return {"error": "Gemini応答のJSON解析に失敗しました。", "raw": text}
+
+
+class LLMCallLimiter:
+    """エージェント単位の同時実行数とタイムアウトを管理する。
+
+    セマフォはイベントループ上で初めて使われた時点で生成する（起動前のループに紐付かないように）。
+    """
+
+    def __init__(self, concurrency: int, timeout: Optional[float]):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """`call()` を同時実行数の枠内で実行する。
+
+        timeout は枠を取得してからの呼び出し時間にのみ適用する（順番待ちの時間は含めない）。超えると asyncio.TimeoutError。
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await asyncio.wait_for(call(), timeout=self.timeout)
+            finally:
+                self.in_flight -= 1
@@ -1,13 +1,13 @@
-import io
 import os
-import httpx
-from PyPDF2 import PdfReader
-from bs4 import BeautifulSoup
 from typing import List
 from pydantic import BaseModel, Field
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 
+import config
+from infra.document_fetch import fetch_document_text
+from .llm_utils import LLMCallLimiter
+
 
 class SocialResource(BaseModel):
     service_name: str = Field(description="サービス名")
@@ -26,44 +26,48 @@ class SocialResource(BaseModel):
     keywords: List[str] = Field(description="検索精度を向上させるためのキーワードやタグ")
 
 
-async def extract_resource_from_url(url: str) -> SocialResource:
-    """
-    URLから社会資源情報を抽出する。
-    PDFとWebページに対応しています。
-    """
-    text = ""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        content_type = response.headers.get("content-type", "")
+_chain = None
+
+
+def _get_chain():
+    """構造化出力チェーンはプロセス内で1度だけ生成して使い回す。"""
+    global _chain
+    if _chain is None:
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-1.5-pro-latest",
+            temperature=0,
+            google_api_key=os.getenv("GEMINI_API_KEY"),
+        )
+        structured_llm = llm.with_structured_output(SocialResource)
 
-        if "application/pdf" in content_type:
-            pdf_file = io.BytesIO(response.content)
-            reader = PdfReader(pdf_file)
-            for page in reader.pages:
-                text += page.extract_text()
-        else:
-            soup = BeautifulSoup(response.text, "html.parser")
-            text = soup.get_text()
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    "あなたは、テキストから社会資源情報を抽出する専門家です。以下のテキストから、指定された項目を抽出してください。また、内容を要約した検索用のキーワードを5つ生成してください。",
+                ),
+                ("human", "{text}"),
+            ]
+        )
+        _chain = prompt | structured_llm
+    return _chain
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro-latest",
-        temperature=0,
-        google_api_key=os.getenv("GEMINI_API_KEY"),
-    )
-    structured_llm = llm.with_structured_output(SocialResource)
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "あなたは、テキストから社会資源情報を抽出する専門家です。以下のテキストから、指定された項目を抽出してください。また、内容を要約した検索用のキーワードを5つ生成してください。",
-            ),
-            ("human", "{text}"),
-        ]
-    )
+# 抽出 LLM 呼び出しの全体での同時実行数（一括抽出でも API のレート上限を超えないように）
+extraction_limiter = LLMCallLimiter(config.EXTRACT_LLM_CONCURRENCY, config.EXTRACT_LLM_TIMEOUT)
 
-    chain = prompt | structured_llm
-    result = await chain.ainvoke({"text": text[:16000]})  # トークン数制限を考慮
-    result.source_url = url  # add source url
+
+async def extract_resource_from_text(text: str, source_url: str) -> SocialResource:
+    result = await extraction_limiter.run(lambda: _get_chain().ainvoke({"text": text}))
+    result.source_url = source_url  # add source url
     return result
+
+
+async def extract_resource_from_url(url: str) -> SocialResource:
+    """
+    URLから社会資源情報を抽出する。
+    PDFとWebページに対応しています。
+    """
+    # ストリーミング取得 + サイズ/文字数上限付きの抽出（上限は config.EXTRACT_*）
+    text = await fetch_document_text(url)
+    return await extract_resource_from_text(text, url)
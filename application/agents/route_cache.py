@@ -0,0 +1,132 @@
+"""RouterAgent の判定キャッシュとキーワードによる事前分類。
+
+LLM に問い合わせる前に次の順で判定を試みる。
+1. 完全一致: 正規化したメッセージをキーとする LRU
+2. キーワード規則: 挨拶・お礼や「制度を教えて」など、片方のラベルにだけ該当する短文
+3. 意味的一致: 過去に LLM が判定したメッセージの埋め込みとのコサイン類似度が閾値以上
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+# 片方のラベルにだけ一致した場合のみ採用する
+_CONVERSATIONAL_PATTERNS = [
+    r"^(こんにちは|こんばんは|おはよう|はじめまして|よろしく|ありがとう|どうも|了解|りょうかい|承知|わかりました|分かりました|なるほど|はい|いいえ|ok|おk)",
+    r"(ありがとう|助かりました|助かります|お疲れ|すみません)[。!！]*$",
+    r"(って何|とは何|とは[?？]|ってなに|とはなん)",
+    r"^(詳しく|もう少し詳しく|具体的に)(教えて|説明して)",
+    r"(手続き|申請方法|必要書類|窓口)(は|を|について)",
+]
+_SUPPORT_PLAN_PATTERNS = [
+    r"(使える|利用できる|受けられる|活用できる|申請できる)(制度|サービス|支援|社会資源|手当|給付)",
+    r"(制度|サービス|支援|社会資源|手当|給付)(を|について)?(提案|紹介|探して|教えて|ありますか|ある[?？]?$)",
+    r"(支援|援助)(策|方法|プラン|計画)(を|は)",
+    r"どう(いう|いった|やって)支援",
+]
+_CONVERSATIONAL_RE = [re.compile(p) for p in _CONVERSATIONAL_PATTERNS]
+_SUPPORT_PLAN_RE = [re.compile(p) for p in _SUPPORT_PLAN_PATTERNS]
+RULE_MAX_CHARS = 60
+
+
+def normalize_message(message: str) -> str:
+    text = unicodedata.normalize("NFKC", message or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def classify_by_rules(normalized: str) -> Optional[str]:
+    """キーワード規則で判定できる場合はラベルを返す。両方/どちらにも該当しない場合は None。"""
+    if not normalized or len(normalized) > RULE_MAX_CHARS:
+        return None
+    conversational = any(p.search(normalized) for p in _CONVERSATIONAL_RE)
+    support_plan = any(p.search(normalized) for p in _SUPPORT_PLAN_RE)
+    if conversational == support_plan:
+        return None
+    return "conversational" if conversational else "support_plan"
+
+
+class RouteCache:
+    def __init__(self, max_items: int = 2000, similarity_threshold: float = 0.93):
+        self.max_items = max(1, max_items)
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._exact: OrderedDict[str, str] = OrderedDict()
+        # 意味的一致用。行は _keys と対応する正規化済みベクトル
+        self._keys: list[str] = []
+        self._labels: list[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self.counters = {"exact_hits": 0, "rule_hits": 0, "semantic_hits": 0, "llm_calls": 0, "llm_errors": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def get_exact(self, key: str) -> Optional[str]:
+        with self._lock:
+            label = self._exact.get(key)
+            if label is not None:
+                self._exact.move_to_end(key)
+                self.counters["exact_hits"] += 1
+            return label
+
+    def get_similar(self, vec: Optional[list[float]]) -> Optional[tuple[str, float]]:
+        q = _unit(vec)
+        with self._lock:
+            if q is None or self._matrix is None or self._matrix.shape[1] != q.size:
+                return None
+            sims = self._matrix @ q
+            i = int(np.argmax(sims))
+            score = float(sims[i])
+            if score < self.similarity_threshold:
+                return None
+            self.counters["semantic_hits"] += 1
+            return self._labels[i], score
+
+    def put(self, key: str, label: str, vec: Optional[list[float]] = None) -> None:
+        q = _unit(vec)
+        with self._lock:
+            self._exact[key] = label
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_items:
+                self._exact.popitem(last=False)
+            if q is None or key in self._keys:
+                return
+            if self._matrix is not None and self._matrix.shape[1] != q.size:
+                return
+            self._keys.append(key)
+            self._labels.append(label)
+            self._matrix = q[None, :] if self._matrix is None else np.vstack([self._matrix, q[None, :]])
+            if len(self._keys) > self.max_items:
+                # 古いものから捨てる
+                drop = len(self._keys) - self.max_items
+                self._keys = self._keys[drop:]
+                self._labels = self._labels[drop:]
+                self._matrix = self._matrix[drop:]
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self.counters)
+            total = c["exact_hits"] + c["rule_hits"] + c["semantic_hits"] + c["llm_calls"]
+            answered = total - c["llm_calls"]
+            return {
+                **c,
+                "total": total,
+                "hit_rate": round(answered / total, 4) if total else 0.0,
+                "exact_items": len(self._exact),
+                "semantic_items": len(self._keys),
+            }
+
+
+def _unit(vec: Optional[list[float]]) -> Optional[np.ndarray]:
+    if not vec:
+        return None
+    arr = np.asarray(vec, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(arr))
+    if not np.isfinite(norm) or norm == 0.0:
+        return None
+    return arr / norm
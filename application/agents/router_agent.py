@@ -1,10 +1,15 @@
+import asyncio
 import logging
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Literal, Optional
+
+import config
+from infra.embedding import embedding_service
+from .route_cache import RouteCache, classify_by_rules, normalize_message
 
 # loggingの設定
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -40,7 +45,7 @@ ROUTER_PROMPT = """
 
 
 class RouterAgent:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[RouteCache] = None):
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-1.5-flash",
             google_api_key=api_key,
@@ -52,13 +57,48 @@ class RouterAgent:
             partial_variables={"format_instructions": self.parser.get_format_instructions()},
         )
         self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        self.cache = cache or RouteCache()
 
     async def route(self, message: str) -> AgentRoute:
+        """キャッシュ・キーワード規則・埋め込み類似で判定できない場合のみ LLM に問い合わせる。"""
+        key = normalize_message(message)
+        label = self.cache.get_exact(key)
+        if label is not None:
+            return AgentRoute(next_agent=label)
+        label = classify_by_rules(key)
+        if label is not None:
+            self.cache.count("rule_hits")
+            return AgentRoute(next_agent=label)
+
+        vec = None
+        if key:
+            # 埋め込み API の障害時にリトライやバックオフで応答が遅れないよう、1回だけ短い時間で打ち切る
+            try:
+                vec = (
+                    await asyncio.wait_for(
+                        embedding_service.aembed([key], max_attempts=1), timeout=config.ROUTER_EMBED_TIMEOUT or None
+                    )
+                )[0]
+            except asyncio.TimeoutError:
+                logging.warning("ルーティング用埋め込みの取得がタイムアウトしました")
+            except Exception as e:
+                logging.warning(f"ルーティング用埋め込みの取得に失敗しました: {e}")
+            similar = self.cache.get_similar(vec)
+            if similar is not None:
+                return AgentRoute(next_agent=similar[0])
+
+        self.cache.count("llm_calls")
         try:
             output = await self.chain.ainvoke({"input": message})
             parsed_output = self.parser.parse(output["text"])
-            return parsed_output
         except Exception as e:
             logging.error(f"ルーティングエラー: {e}", exc_info=True)
-            # デフォルトでは会話エージェントにフォールバック
+            self.cache.count("llm_errors")
+            # デフォルトでは会話エージェントにフォールバック（キャッシュはしない）
             return AgentRoute(next_agent="conversational")
+        if key:
+            self.cache.put(key, parsed_output.next_agent, vec)
+        return parsed_output
+
+    def stats(self) -> dict:
+        return self.cache.stats()
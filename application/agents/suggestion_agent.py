@@ -1,20 +1,27 @@
+import asyncio
 import google.generativeai as genai
-import json
 import logging
 
+from utils.assessment_digest import assessment_digest
+from .llm_utils import LLMCallLimiter, parse_json_response
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
 
 class SuggestionAgent:
-    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gemini-1.5-flash",
+        max_concurrency: int = 4,
+        timeout: float = 60.0,
+    ):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
+        self.limiter = LLMCallLimiter(max_concurrency, timeout)
 
-    def generate_suggestions(self, assessment_data: dict) -> dict:
-        try:
-            assessment_json = json.dumps(assessment_data, ensure_ascii=False, indent=2)
-        except Exception:
-            assessment_json = str(assessment_data)
+    def _build_prompt(self, assessment_data: dict) -> str:
+        assessment_json = assessment_digest(assessment_data).context(max_chars=None)
 
         prompt = f"""
         あなたは社会福祉士の業務を支援するAIアシスタントです。
@@ -35,32 +42,26 @@ class SuggestionAgent:
         JSONのみを返してください。説明や前置きは不要です。
         """
 
-        try:
-            resp = self.model.generate_content(prompt)
-            text = ""
-            if getattr(resp, "candidates", None):
-                c0 = resp.candidates[0]
-                parts = getattr(getattr(c0, "content", None), "parts", [])
-                if parts:
-                    text = getattr(parts[0], "text", "").strip()
-
-            if not text:
-                return {"error": "Geminiからの応答がありませんでした。"}
+        return prompt
 
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
+    def generate_suggestions(self, assessment_data: dict) -> dict:
+        """同期版。イベントループ外（スレッド・バッチ処理）から呼ぶこと。"""
+        try:
+            resp = self.model.generate_content(self._build_prompt(assessment_data))
+            return parse_json_response(resp)
+        except Exception as e:
+            logging.error(f"generate_suggestions failed: {e}", exc_info=True)
+            return {"error": f"Gemini API呼び出しエラー: {e}"}
 
-            try:
-                return json.loads(text)
-            except Exception:
-                start = text.find("{")
-                end = text.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    return json.loads(text[start : end + 1])
-                return {"error": "Gemini応答のJSON解析に失敗しました。", "raw": text}
+    async def agenerate_suggestions(self, assessment_data: dict) -> dict:
+        """非同期版。同時実行数とタイムアウトは self.limiter で制御する。"""
+        prompt = self._build_prompt(assessment_data)
+        try:
+            resp = await self.limiter.run(lambda: self.model.generate_content_async(prompt))
+            return parse_json_response(resp)
+        except asyncio.TimeoutError:
+            logging.warning(f"generate_suggestions timed out ({self.limiter.timeout}s)")
+            return {"error": "Gemini API呼び出しがタイムアウトしました。"}
         except Exception as e:
             logging.error(f"generate_suggestions failed: {e}", exc_info=True)
             return {"error": f"Gemini API呼び出しエラー: {e}"}
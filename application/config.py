@@ -39,3 +39,117 @@ RAG_CORPUS_RESOURCE: str = _require("RAG_CORPUS_RESOURCE")  # projects/{project}
 # Optional
 RAG_LOCATION: str = os.getenv("RAG_LOCATION", "global")
 RAG_MODEL: str = os.getenv("RAG_MODEL", "gemini-2.5-flash-lite")
+# RAG 回答キャッシュ (RAG_CACHE_PATH を空にするとメモリのみ / RAG_CACHE_SIMILARITY に 0.95 等を指定すると類似ヒット有効。既定は無効)
+RAG_CACHE_TTL: float = float(os.getenv("RAG_CACHE_TTL", str(24 * 3600)))
+RAG_CACHE_MAX_ITEMS: int = int(os.getenv("RAG_CACHE_MAX_ITEMS", "500"))
+RAG_CACHE_PATH: str = os.getenv("RAG_CACHE_PATH", str(Path(__file__).parent / ".cache" / "rag_cache.sqlite3"))
+RAG_CACHE_SIMILARITY: float = float(os.getenv("RAG_CACHE_SIMILARITY", "0"))
+# 類似ヒット判定用の埋め込みのタイムアウト秒数（リトライなし。失敗時は類似判定を省略する）
+RAG_CACHE_EMBED_TIMEOUT: float = float(os.getenv("RAG_CACHE_EMBED_TIMEOUT", "2"))
+
+# --- Google 検索ツール ---
+GOOGLE_SEARCH_CACHE_TTL: float = float(os.getenv("GOOGLE_SEARCH_CACHE_TTL", str(6 * 3600)))
+# 0件の結果は一時的な不調の可能性があるため短い TTL で保持する（0 でキャッシュしない）
+GOOGLE_SEARCH_EMPTY_CACHE_TTL: float = float(os.getenv("GOOGLE_SEARCH_EMPTY_CACHE_TTL", "600"))
+GOOGLE_SEARCH_CACHE_PATH: str = os.getenv(
+    "GOOGLE_SEARCH_CACHE_PATH", str(Path(__file__).parent / ".cache" / "search_cache.sqlite3")
+)
+# トークンバケット: 平均 RATE_PER_SEC 回/秒、最大 BURST 回まで連続実行、WAIT_SECONDS 以上待つ場合は諦める
+GOOGLE_SEARCH_RATE_PER_SEC: float = float(os.getenv("GOOGLE_SEARCH_RATE_PER_SEC", "1"))
+GOOGLE_SEARCH_BURST: float = float(os.getenv("GOOGLE_SEARCH_BURST", "5"))
+GOOGLE_SEARCH_WAIT_SECONDS: float = float(os.getenv("GOOGLE_SEARCH_WAIT_SECONDS", "10"))
+
+# --- URL からの資源情報抽出 ---
+EXTRACT_MAX_BYTES: int = int(os.getenv("EXTRACT_MAX_BYTES", str(20 * 1024 * 1024)))
+EXTRACT_MAX_CHARS: int = int(os.getenv("EXTRACT_MAX_CHARS", "16000"))
+EXTRACT_MAX_PDF_PAGES: int = int(os.getenv("EXTRACT_MAX_PDF_PAGES", "60"))
+# PDF は途中までだと解析できないため、EXTRACT_MAX_BYTES を超える分は一時ファイルに書き出してこの上限まで受け取る
+EXTRACT_MAX_PDF_BYTES: int = int(os.getenv("EXTRACT_MAX_PDF_BYTES", str(200 * 1024 * 1024)))
+EXTRACT_CONNECT_TIMEOUT: float = float(os.getenv("EXTRACT_CONNECT_TIMEOUT", "5"))
+EXTRACT_READ_TIMEOUT: float = float(os.getenv("EXTRACT_READ_TIMEOUT", "20"))
+# 一括抽出: 共有 HTTP プールの接続数、ホスト単位の同時取得数、抽出 LLM の同時実行数、同時に処理する URL 数
+EXTRACT_MAX_CONNECTIONS: int = int(os.getenv("EXTRACT_MAX_CONNECTIONS", "32"))
+EXTRACT_PER_HOST_CONCURRENCY: int = int(os.getenv("EXTRACT_PER_HOST_CONCURRENCY", "2"))
+EXTRACT_LLM_CONCURRENCY: int = int(os.getenv("EXTRACT_LLM_CONCURRENCY", "4"))
+EXTRACT_LLM_TIMEOUT: float = float(os.getenv("EXTRACT_LLM_TIMEOUT", "120"))
+EXTRACT_BATCH_MAX_URLS: int = int(os.getenv("EXTRACT_BATCH_MAX_URLS", "500"))
+EXTRACT_BATCH_CONCURRENCY: int = int(os.getenv("EXTRACT_BATCH_CONCURRENCY", "16"))
+
+# --- Resource vector index ---
+# "exact" (全件内積) or "ivf" (クラスタ分割による近似検索)
+VECTOR_INDEX_MODE: str = os.getenv("VECTOR_INDEX_MODE", "exact").lower()
+VECTOR_INDEX_NLIST: int = int(os.getenv("VECTOR_INDEX_NLIST", "0"))  # 0 = sqrt(N) を自動採用
+VECTOR_INDEX_NPROBE: int = int(os.getenv("VECTOR_INDEX_NPROBE", "4"))
+
+# --- Embedding ---
+EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_MAX_CONCURRENCY: int = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_ATTEMPTS: int = int(os.getenv("EMBED_MAX_ATTEMPTS", "3"))
+# 埋め込みキャッシュ (空文字でディスク層を無効化)
+EMBED_CACHE_PATH: str = os.getenv("EMBED_CACHE_PATH", str(Path(__file__).parent / ".cache" / "embeddings.sqlite3"))
+EMBED_CACHE_MEMORY_ITEMS: int = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "2048"))
+EMBED_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+# 起動時に、ベクトル未生成・EMBED_MODEL 変更・テキスト変更のある資源を再埋め込みするジョブを投入する
+# Firestore に保存するベクトルの形式 (float16 / int8)。変更すると起動時のバックフィルで順次変換される
+EMBED_STORAGE_DTYPE: str = os.getenv("EMBED_STORAGE_DTYPE", "float16")
+EMBED_BACKFILL_ON_STARTUP: bool = os.getenv("EMBED_BACKFILL_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+EMBED_BACKFILL_PAGE_SIZE: int = int(os.getenv("EMBED_BACKFILL_PAGE_SIZE", "500"))
+
+# --- Resource suggest (LLM re-ranking) ---
+# ハイブリッドスコア = 埋め込み類似度 * EMBEDDING_WEIGHT + キーワードスコア * KEYWORD_WEIGHT（閾値以下は除外）
+# キーワードスコアは一致したキーワードの重みの合計。重み = min(1, 文字数 / KEYWORD_FULL_LENGTH) × 正規化 IDF
+SUGGEST_EMBEDDING_WEIGHT: float = float(os.getenv("SUGGEST_EMBEDDING_WEIGHT", "0.7"))
+SUGGEST_KEYWORD_WEIGHT: float = float(os.getenv("SUGGEST_KEYWORD_WEIGHT", "0.3"))
+SUGGEST_SCORE_THRESHOLD: float = float(os.getenv("SUGGEST_SCORE_THRESHOLD", "0.2"))
+SUGGEST_KEYWORD_FULL_LENGTH: int = int(os.getenv("SUGGEST_KEYWORD_FULL_LENGTH", "4"))
+# キーワード照合のトークナイザ: auto (janome/fugashi があれば形態素解析、なければ ngram) / janome / fugashi / ngram / regex
+SUGGEST_TOKENIZER: str = os.getenv("SUGGEST_TOKENIZER", "auto")
+SUGGEST_NGRAM_MAX: int = int(os.getenv("SUGGEST_NGRAM_MAX", "6"))
+SUGGEST_TOKEN_CACHE_ITEMS: int = int(os.getenv("SUGGEST_TOKEN_CACHE_ITEMS", "256"))
+# 1資源あたりのキーワードスコアと matched_keywords の件数の上限
+SUGGEST_MAX_KEYWORD_MATCHES: int = int(os.getenv("SUGGEST_MAX_KEYWORD_MATCHES", "12"))
+SUGGEST_LLM_MAX_CANDIDATES: int = int(os.getenv("SUGGEST_LLM_MAX_CANDIDATES", "16"))
+SUGGEST_LLM_CONCURRENCY: int = int(os.getenv("SUGGEST_LLM_CONCURRENCY", "8"))
+SUGGEST_LLM_TIMEOUT: float = float(os.getenv("SUGGEST_LLM_TIMEOUT", "20"))
+
+# --- LLM エージェント (アセスメントのマッピング/サジェスト生成) ---
+LLM_AGENT_MAX_CONCURRENCY: int = int(os.getenv("LLM_AGENT_MAX_CONCURRENCY", "4"))
+LLM_AGENT_TIMEOUT: float = float(os.getenv("LLM_AGENT_TIMEOUT", "60"))
+
+# --- RouterAgent の判定キャッシュ ---
+ROUTER_CACHE_MAX_ITEMS: int = int(os.getenv("ROUTER_CACHE_MAX_ITEMS", "2000"))
+ROUTER_CACHE_SIMILARITY: float = float(os.getenv("ROUTER_CACHE_SIMILARITY", "0.93"))
+# 類似判定用の埋め込み取得の上限秒数（リトライなし、0 で無制限）。超えたら類似判定を飛ばして LLM に問い合わせる
+ROUTER_EMBED_TIMEOUT: float = float(os.getenv("ROUTER_EMBED_TIMEOUT", "0.3"))
+# ルーティングと会話応答を並列に開始し、support_plan と判定されたら会話応答を破棄する
+ROUTER_SPECULATIVE: bool = os.getenv("ROUTER_SPECULATIVE", "false").lower() in ("1", "true", "yes")
+
+# --- バックグラウンドジョブ ---
+JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", str(Path(__file__).parent / ".cache" / "jobs.sqlite3"))
+JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# --- /resources/import-local ---
+# Firestore の WriteBatch は1回の commit で最大 500 操作
+IMPORT_WRITE_BATCH_SIZE: int = min(500, int(os.getenv("IMPORT_WRITE_BATCH_SIZE", "500")))
+# 既存ドキュメントの有無を db.get_all でまとめて確認する件数
+IMPORT_LOOKUP_CHUNK_SIZE: int = int(os.getenv("IMPORT_LOOKUP_CHUNK_SIZE", "300"))
+# ファイルはこの件数ずつ読み込んで登録し、チャンクごとに再開位置（チェックポイント）を保存する
+IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_CHECKPOINT_PATH: str = os.getenv(
+    "IMPORT_CHECKPOINT_PATH", str(Path(__file__).parent / ".cache" / "import_checkpoints.sqlite3")
+)
+IMPORT_CHECKPOINT_TTL: float = float(os.getenv("IMPORT_CHECKPOINT_TTL", str(7 * 24 * 3600)))
+
+# --- アセスメントのダイジェスト（平坦化テキスト・トークン・埋め込み）を内容ハッシュ単位で保持する件数 ---
+ASSESSMENT_DIGEST_CACHE_ITEMS: int = int(os.getenv("ASSESSMENT_DIGEST_CACHE_ITEMS", "256"))
+
+# --- アセスメント更新時のサジェスト再生成 ---
+# 同じクライアントへの編集がこの秒数途切れるまで生成を待つ
+SUGGESTION_DEBOUNCE_SECONDS: float = float(os.getenv("SUGGESTION_DEBOUNCE_SECONDS", "30"))
+# 前回生成時からの変更文字数がこれ未満（項目の増減・数字の変更なし）なら再生成しない
+SUGGESTION_MIN_CHANGED_CHARS: int = int(os.getenv("SUGGESTION_MIN_CHANGED_CHARS", "10"))
+
+# --- Firestore ---
+# 同期クライアント呼び出しを退避するスレッド数
+FIRESTORE_MAX_WORKERS: int = int(os.getenv("FIRESTORE_MAX_WORKERS", "16"))
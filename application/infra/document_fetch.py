@@ -0,0 +1,166 @@
+"""URL からの文書取得とテキスト抽出。
+
+- レスポンスはストリーミングで読み、max_bytes を超えた時点で打ち切る
+- PDF は途中までだと解析できないため打ち切らず、max_bytes を超えた分は一時ファイルに書き出す
+  （EXTRACT_MAX_PDF_BYTES を超える場合は DocumentTooLargeError）
+- PDF はページ単位で抽出し、ページ数・文字数の上限に達したら残りのページは読まない
+- HTML は lxml があればそれを使い、script/style やナビゲーション等の定型部分を除去する
+- 解析は CPU 処理のためスレッドで実行し、イベントループを塞がない
+"""
+
+import asyncio
+import importlib.util
+import io
+import logging
+import re
+import tempfile
+from typing import IO, NamedTuple, Optional, Union
+
+import httpx
+
+import config
+from infra.http_pool import extraction_http
+
+
+logger = logging.getLogger(__name__)
+
+# lxml は任意依存 (pip install .[fast-html])
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+_BOILERPLATE_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    # WebForms のサイトはページ全体が <form> で囲まれているため、form ではなく入力部品のみ除去する
+    "input",
+    "select",
+    "button",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+]
+
+
+class DocumentTooLargeError(ValueError):
+    pass
+
+
+class FetchedDocument(NamedTuple):
+    url: str  # リダイレクト後の最終 URL
+    content_type: str
+    text: str
+    truncated: bool
+
+
+async def _download(
+    client: httpx.AsyncClient, url: str, max_bytes: int, pdf_max_bytes: int, allow_truncate: bool = True
+) -> tuple[IO[bytes], str, bool, str]:
+    """(本文のファイル, content-type, 打ち切ったか, 最終URL) を返す。
+
+    本文は max_bytes まではメモリ、それを超える分（PDF のみ）は一時ファイルに保持する。呼び出し側で close すること。
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_bytes)
+    try:
+        async with client.stream("GET", url, follow_redirects=True) as response:
+            response.raise_for_status()
+            final_url = str(response.url)
+            content_type = response.headers.get("content-type", "")
+            is_pdf = _is_pdf(content_type, final_url)
+            limit = max(pdf_max_bytes, max_bytes) if is_pdf else max_bytes
+            strict = is_pdf or not allow_truncate
+            length = response.headers.get("content-length")
+            if length and length.isdigit() and int(length) > limit and strict:
+                raise DocumentTooLargeError(f"文書サイズが上限を超えています ({int(length)} > {limit} bytes)")
+            size = 0
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                if size + len(chunk) > limit:
+                    if strict:
+                        raise DocumentTooLargeError(f"文書サイズが上限を超えています (> {limit} bytes)")
+                    spool.write(chunk[: limit - size])
+                    truncated = True
+                    break
+                if size + len(chunk) > max_bytes:
+                    # 一時ファイルへの書き込みはイベントループを塞がないようスレッドで行う
+                    await asyncio.to_thread(spool.write, chunk)
+                else:
+                    spool.write(chunk)
+                size += len(chunk)
+        spool.seek(0)
+        return spool, content_type, truncated, final_url
+    except BaseException:
+        spool.close()
+        raise
+
+
+async def fetch_bytes(
+    client: httpx.AsyncClient, url: str, max_bytes: int, allow_truncate: bool = True
+) -> tuple[bytes, str, bool, str]:
+    """(本文, content-type, 打ち切ったか, 最終URL) を返す。allow_truncate=False と PDF は上限超過時に DocumentTooLargeError。"""
+    spool, content_type, truncated, final_url = await _download(client, url, max_bytes, max_bytes, allow_truncate)
+    with spool:
+        return spool.read(), content_type, truncated, final_url
+
+
+def _is_pdf(content_type: str, url: str) -> bool:
+    return "application/pdf" in content_type or url.lower().split("?")[0].endswith(".pdf")
+
+
+def extract_pdf_text(data: Union[bytes, IO[bytes]], max_chars: int, max_pages: int) -> str:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data)
+    parts: list[str] = []
+    total = 0
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages or total >= max_chars:
+            break
+        try:
+            t = page.extract_text() or ""
+        except Exception as e:
+            logger.warning(f"pdf page {i} extraction failed: {e}")
+            continue
+        parts.append(t)
+        total += len(t)
+    return "\n".join(parts)[:max_chars]
+
+
+def extract_html_text(data: bytes, max_chars: int) -> str:
+    from bs4 import BeautifulSoup
+
+    # bytes のまま渡し、meta charset (Shift_JIS 等) の判定は BeautifulSoup に任せる
+    soup = BeautifulSoup(data, HTML_PARSER)
+    for tag in soup(_BOILERPLATE_TAGS):
+        tag.decompose()
+    root = soup.find("main") or soup.find("article") or soup.body or soup
+    lines = (re.sub(r"[ \t　]+", " ", line).strip() for line in root.get_text("\n").splitlines())
+    return "\n".join(line for line in lines if line)[:max_chars]
+
+
+async def fetch_document(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    max_bytes: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> FetchedDocument:
+    """URL の文書（PDF/HTML）を取得し、max_chars までのテキストを返す。client 未指定時は共有プールを使う。"""
+    max_bytes = max_bytes or config.EXTRACT_MAX_BYTES
+    max_chars = max_chars or config.EXTRACT_MAX_CHARS
+    client = client or extraction_http.client
+    body, content_type, truncated, final_url = await _download(client, url, max_bytes, config.EXTRACT_MAX_PDF_BYTES)
+    with body:
+        if truncated:
+            logger.info(f"document truncated at {max_bytes} bytes: {url}")
+        if _is_pdf(content_type, final_url):
+            text = await asyncio.to_thread(extract_pdf_text, body, max_chars, config.EXTRACT_MAX_PDF_PAGES)
+        else:
+            text = await asyncio.to_thread(extract_html_text, body.read(), max_chars)
+    return FetchedDocument(final_url, content_type, text, truncated)
+
+
+async def fetch_document_text(url: str, client: Optional[httpx.AsyncClient] = None) -> str:
+    return (await fetch_document(url, client)).text
@@ -0,0 +1,175 @@
+"""Gemini 埋め込み API のクライアント。
+
+テキストをバッチにまとめて batch embedding API を呼び、
+非同期版では同時実行数を制限しつつバッチ単位でリトライする。
+非同期版ではキャッシュの SQLite の読み書きをスレッドで行い、イベントループを止めない。
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+import config
+from infra.embedding_cache import EmbeddingCache, embedding_cache_key
+
+
+logger = logging.getLogger(__name__)
+
+MAX_EMBED_CHARS = 8000
+
+
+def _extract_embeddings(resp, expected: int) -> list[list[float]]:
+    if isinstance(resp, dict):
+        emb = resp.get("embedding", [])
+    else:
+        emb = getattr(resp, "embedding", [])
+    if expected == 1 and emb and not isinstance(emb[0], list):
+        emb = [emb]
+    if not isinstance(emb, list) or len(emb) != expected:
+        raise ValueError(f"unexpected embedding response size: {len(emb) if isinstance(emb, list) else type(emb)}")
+    return [e if isinstance(e, list) else [] for e in emb]
+
+
+class EmbeddingService:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model: str,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        max_attempts: int = 3,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.api_key = api_key
+        self.cache = cache
+        self.model = model
+        self.batch_size = max(1, min(batch_size, 100))  # API の上限は1リクエスト100件
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self._genai = None
+        self._configure_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _client(self):
+        if self._genai is None:
+            with self._configure_lock:
+                if self._genai is None:
+                    import google.generativeai as genai  # type: ignore
+
+                    if self.api_key:
+                        genai.configure(api_key=self.api_key)
+                    self._genai = genai
+        return self._genai
+
+    def _plan(self, texts: list[str]) -> tuple[list[list[float]], list[list[tuple[list[int], str, str]]]]:
+        """空文字とキャッシュ済みのテキストを除外し、残りを (元の位置, テキスト, キー) のバッチに分割する。"""
+        results: list[list[float]] = [[] for _ in texts]
+        positions: dict[str, list[int]] = {}
+        truncated_by_key: dict[str, str] = {}
+        for i, t in enumerate(texts):
+            truncated = (t or "")[:MAX_EMBED_CHARS]
+            if not truncated.strip():
+                continue
+            key = embedding_cache_key(self.model, truncated)
+            positions.setdefault(key, []).append(i)
+            truncated_by_key[key] = truncated
+        if self.cache is not None and positions:
+            for key, vec in self.cache.get_many(list(positions)).items():
+                for i in positions.pop(key):
+                    results[i] = vec
+        pending = [(idx, truncated_by_key[key], key) for key, idx in positions.items()]
+        batches = [pending[i : i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        return results, batches
+
+    def _collect(self, results: list[list[float]], batch: list, vecs: list[list[float]]) -> None:
+        for (idx, _, _), v in zip(batch, vecs):
+            for i in idx:
+                results[i] = v
+        if self.cache is not None:
+            self.cache.put_many({key: v for (_, _, key), v in zip(batch, vecs) if v})
+
+    # --- sync ---
+    def embed(
+        self, texts: list[str], max_attempts: Optional[int] = None, timeout: Optional[float] = None
+    ) -> list[list[float]]:
+        """同期版。スレッドやスクリプトなどイベントループ外から呼ぶこと。
+
+        max_attempts=1 と timeout（1リクエストあたりの秒数）で、応答時間を優先した呼び出しにできる。
+        """
+        results, batches = self._plan(texts)
+        attempts = max(1, max_attempts or self.max_attempts)
+        for batch in batches:
+            self._collect(results, batch, self._embed_batch_sync([t for _, t, _ in batch], attempts, timeout))
+        return results
+
+    def _embed_batch_sync(
+        self, batch: list[str], max_attempts: int, timeout: Optional[float] = None
+    ) -> list[list[float]]:
+        options = {"request_options": {"timeout": timeout}} if timeout else {}
+        delay = 1.0
+        for attempt in range(max_attempts):
+            try:
+                resp = self._client().embed_content(model=self.model, content=batch, **options)
+                return _extract_embeddings(resp, len(batch))
+            except Exception as e:
+                if attempt == max_attempts - 1:
+                    logger.warning(f"embedding batch failed (size={len(batch)}): {e}")
+                    return [[] for _ in batch]
+                time.sleep(delay + random.uniform(0, 0.5))
+                delay = min(delay * 2, 16.0)
+        return [[] for _ in batch]
+
+    # --- async ---
+    async def _cache_io(self, func, *args):
+        """キャッシュがディスクを使う場合はスレッドで実行する（メモリのみならそのまま呼ぶ）。"""
+        if self.cache is not None and self.cache.disk_enabled:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def aembed(self, texts: list[str], max_attempts: Optional[int] = None) -> list[list[float]]:
+        """max_attempts を指定するとその回数だけ試行する（1 でリトライなし。応答時間を優先する呼び出し用）。"""
+        results, batches = await self._cache_io(self._plan, texts)
+        if not batches:
+            return results
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        attempts = max(1, max_attempts or self.max_attempts)
+        vec_lists = await asyncio.gather(*[self._embed_batch_async([t for _, t, _ in b], attempts) for b in batches])
+        await self._cache_io(self._collect_all, results, batches, vec_lists)
+        return results
+
+    def _collect_all(self, results: list[list[float]], batches: list, vec_lists: list) -> None:
+        for batch, vecs in zip(batches, vec_lists):
+            self._collect(results, batch, vecs)
+
+    async def _embed_batch_async(self, batch: list[str], max_attempts: int) -> list[list[float]]:
+        delay = 1.0
+        for attempt in range(max_attempts):
+            try:
+                async with self._semaphore:
+                    resp = await self._client().embed_content_async(model=self.model, content=batch)
+                return _extract_embeddings(resp, len(batch))
+            except Exception as e:
+                if attempt == max_attempts - 1:
+                    logger.warning(f"embedding batch failed (size={len(batch)}): {e}")
+                    return [[] for _ in batch]
+                await asyncio.sleep(delay + random.uniform(0, 0.5))
+                delay = min(delay * 2, 16.0)
+        return [[] for _ in batch]
+
+
+embedding_service = EmbeddingService(
+    api_key=config.GEMINI_API_KEY,
+    model=config.EMBED_MODEL,
+    batch_size=config.EMBED_BATCH_SIZE,
+    max_concurrency=config.EMBED_MAX_CONCURRENCY,
+    max_attempts=config.EMBED_MAX_ATTEMPTS,
+    cache=EmbeddingCache(
+        path=config.EMBED_CACHE_PATH,
+        memory_items=config.EMBED_CACHE_MEMORY_ITEMS,
+        max_entries=config.EMBED_CACHE_MAX_ENTRIES,
+    ),
+)
@@ -0,0 +1,149 @@
+"""埋め込みベクトルのコンテンツアドレス型キャッシュ。
+
+キーは sha256(モデル名 + 切り詰め後テキスト)。
+メモリ上の LRU と、ローカル SQLite の2段構成で、SQLite 側も件数上限で古いものから削除する。
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _pack(vec: list[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+
+def _unpack(blob: bytes) -> list[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+
+class EmbeddingCache:
+    def __init__(self, path: Optional[str], memory_items: int = 2048, max_entries: int = 50000):
+        self.memory_items = max(0, memory_items)
+        self.max_entries = max(1, max_entries)
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings"
+                    " (key TEXT PRIMARY KEY, vec BLOB NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed_at)")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"embedding cache: disk tier disabled ({path}): {e}")
+                self._conn = None
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self._conn is not None
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        disk_keys = []
+        with self._lock:
+            for k in keys:
+                v = self._memory.get(k)
+                if v is not None:
+                    self._memory.move_to_end(k)
+                    found[k] = v
+                    self.memory_hits += 1
+                else:
+                    disk_keys.append(k)
+            if disk_keys and self._conn is not None:
+                try:
+                    now = time.time()
+                    for i in range(0, len(disk_keys), 500):
+                        chunk = disk_keys[i : i + 500]
+                        rows = self._conn.execute(
+                            f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                        ).fetchall()
+                        for k, blob in rows:
+                            vec = _unpack(blob)
+                            found[k] = vec
+                            self._remember(k, vec)
+                        if rows:
+                            self._conn.executemany(
+                                "UPDATE embeddings SET accessed_at = ? WHERE key = ?", [(now, k) for k, _ in rows]
+                            )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"embedding cache read failed: {e}")
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        items = {k: v for k, v in items.items() if v}
+        if not items:
+            return
+        with self._lock:
+            for k, v in items.items():
+                self._remember(k, v)
+            if self._conn is None:
+                return
+            try:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vec, accessed_at) VALUES (?, ?, ?)",
+                    [(k, _pack(v), now) for k, v in items.items()],
+                )
+                self._writes_since_evict += len(items)
+                if self._writes_since_evict >= max(1, self.max_entries // 100):
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"embedding cache write failed: {e}")
+
+    def _remember(self, key: str, vec: list[float]) -> None:
+        if self.memory_items == 0:
+            return
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        self._writes_since_evict = 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_items": len(self._memory),
+            "disk_enabled": self.disk_enabled,
+        }
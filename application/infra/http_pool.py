@@ -0,0 +1,71 @@
+"""外部サイト取得用の共有 HTTP クライアント。
+
+接続プール（keep-alive）を使い回し、ホスト単位の同時接続数を制限する。
+自治体サイトへ大量の URL を取得しに行く際に、1つのホストへ負荷を集中させないため。
+ホストごとのセマフォは使用中（取得中または待機中）の間だけ保持し、誰も使っていないホストの分は破棄する。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import config
+
+
+class _HostSlot:
+    def __init__(self, per_host: int):
+        self.semaphore = asyncio.Semaphore(per_host)
+        self.users = 0
+
+
+class HostLimitedHttpClient:
+    def __init__(self, max_connections: int, per_host: int, timeout: httpx.Timeout):
+        self.max_connections = max(1, max_connections)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: dict[str, _HostSlot] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                ),
+                headers={"User-Agent": "fukushia-resource-extractor/0.1"},
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def host_limit(self, url: str) -> AsyncIterator[None]:
+        """ホスト単位の同時接続数の枠を取得する（async with で使う）。"""
+        host = urlsplit(url).netloc.lower()
+        slot = self._host_limits.get(host)
+        if slot is None:
+            slot = self._host_limits[host] = _HostSlot(self.per_host)
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0 and self._host_limits.get(host) is slot:
+                del self._host_limits[host]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_limits.clear()
+
+
+extraction_http = HostLimitedHttpClient(
+    max_connections=config.EXTRACT_MAX_CONNECTIONS,
+    per_host=config.EXTRACT_PER_HOST_CONCURRENCY,
+    timeout=httpx.Timeout(config.EXTRACT_READ_TIMEOUT, connect=config.EXTRACT_CONNECT_TIMEOUT),
+)
@@ -0,0 +1,373 @@
+"""バックグラウンドジョブのローカル永続キューとワーカー。
+
+リクエスト処理から LLM 呼び出しなどの重い後処理を切り離すために使う。
+- キューはローカル SQLite に保存し、再起動時は実行中だったジョブを queued に戻して再実行する
+- 同じ (kind, subject, version, payload) のジョブは重複排除する。同じ subject の queued ジョブがあれば
+  後から投入された内容で上書きし、連続した編集を1回の実行にまとめる（delay 指定時は実行時刻も後ろへずらす）
+- 失敗したジョブは max_attempts まで指数バックオフで再試行する
+- ハンドラは progress コールバックで途中経過を記録でき、GET /jobs/{id} から参照できる
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[dict], None]
+JobHandler = Callable[[dict, ProgressCallback], Awaitable[Optional[dict]]]
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_COLUMNS = (
+    "id, kind, subject, version, payload, status, attempts, coalesced, result, error, "
+    "created_at, updated_at, available_at, progress"
+)
+
+
+def _row_to_job(row) -> dict:
+    (
+        job_id,
+        kind,
+        subject,
+        version,
+        payload,
+        status,
+        attempts,
+        coalesced,
+        result,
+        error,
+        created_at,
+        updated_at,
+        _available_at,
+        progress,
+    ) = row
+    return {
+        "id": job_id,
+        "kind": kind,
+        "subject": subject,
+        "version": version,
+        "payload": json.loads(payload) if payload else {},
+        "status": status,
+        "attempts": attempts,
+        "coalesced": coalesced,
+        "result": json.loads(result) if result else None,
+        "progress": json.loads(progress) if progress else None,
+        "error": error,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+class JobQueue:
+    def __init__(self, path: str, max_attempts: int = 3, retention_seconds: float = 7 * 24 * 3600):
+        self.max_attempts = max(1, max_attempts)
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[], None]] = []
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                payload TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                coalesced INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                progress TEXT
+            )
+            """
+        )
+        try:
+            # progress 列追加前に作られたキュー
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_subject ON jobs(kind, subject, status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at)")
+        self._conn.commit()
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """ジョブが投入されたときに呼ばれるコールバックを登録する（ワーカーの起床用）。"""
+        self._listeners.append(callback)
+
+    # --- 投入 ---
+    def enqueue(
+        self,
+        kind: str,
+        subject: str,
+        version: int = 0,
+        payload: Optional[dict] = None,
+        delay: float = 0.0,
+    ) -> dict:
+        """ジョブを投入する。重複排除された場合は既存のジョブを返す。
+
+        delay > 0 の場合は now + delay 以降に実行する。同じ subject の queued ジョブへ再投入されるたびに
+        実行時刻を延ばすため、delay の間に投入が途切れたところで1回だけ実行される（デバウンス）。
+        """
+        now = time.time()
+        available_at = now + max(0.0, delay)
+        payload_json = json.dumps(payload or {}, ensure_ascii=False, default=str, sort_keys=True)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE kind = ? AND subject = ? AND version = ? AND payload = ?"
+                " AND status != ? ORDER BY created_at DESC LIMIT 1",
+                (kind, subject, version, payload_json, STATUS_FAILED),
+            ).fetchone()
+            if row is not None and not (row[5] == STATUS_QUEUED and delay > 0):
+                return _row_to_job(row)
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE kind = ? AND subject = ? AND status = ?"
+                " ORDER BY created_at DESC LIMIT 1",
+                (kind, subject, STATUS_QUEUED),
+            ).fetchone()
+            if row is not None:
+                # 未実行のジョブを最新の内容で置き換える（連続編集を1回にまとめる）
+                self._conn.execute(
+                    "UPDATE jobs SET version = ?, payload = ?, coalesced = coalesced + 1, updated_at = ?,"
+                    " available_at = ?, attempts = 0, error = NULL WHERE id = ?",
+                    (version, payload_json, now, available_at, row[0]),
+                )
+                job_id = row[0]
+            else:
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    f"INSERT INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, 0, 0, NULL, NULL, ?, ?, ?, NULL)",
+                    (job_id, kind, subject, version, payload_json, STATUS_QUEUED, now, now, available_at),
+                )
+            self._conn.commit()
+            job = _row_to_job(self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"job queue listener failed: {e}")
+        return job
+
+    # --- ワーカー側 ---
+    def claim(self, kinds: Optional[list[str]] = None) -> Optional[dict]:
+        """実行可能な最も古いジョブを running にして返す。"""
+        now = time.time()
+        sql = f"SELECT {_COLUMNS} FROM jobs WHERE status = ? AND available_at <= ?"
+        params: list[Any] = [STATUS_QUEUED, now]
+        if kinds is not None:
+            if not kinds:
+                return None
+            sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY available_at LIMIT 1"
+        with self._lock:
+            while True:
+                row = self._conn.execute(sql, params).fetchone()
+                if row is None:
+                    return None
+                # 同じキューを別プロセスも参照しうるため、queued のままの場合のみ取得する
+                cur = self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?"
+                    " WHERE id = ? AND status = ? AND available_at <= ?",
+                    (STATUS_RUNNING, now, row[0], STATUS_QUEUED, now),
+                )
+                self._conn.commit()
+                if cur.rowcount == 1:
+                    break
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (row[0],)).fetchone()
+        return _row_to_job(row)
+
+    def complete(self, job_id: str, result: Optional[dict] = None) -> None:
+        result_json = json.dumps(result, ensure_ascii=False, default=str) if result else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (STATUS_DONE, result_json, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def set_progress(self, job_id: str, progress: dict) -> None:
+        """実行中ジョブの途中経過を記録する（ワーカー以外のスレッドから呼んでもよい）。"""
+        progress_json = json.dumps(progress, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?", (progress_json, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def fail(self, job_id: str, error: str, attempts: int) -> bool:
+        """失敗を記録する。再試行する場合は True を返す。"""
+        now = time.time()
+        retry = attempts < self.max_attempts
+        with self._lock:
+            if retry:
+                delay = min(2**attempts, 300)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, available_at = ? WHERE id = ?",
+                    (STATUS_QUEUED, error, now, now + delay, job_id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_FAILED, error, now, job_id),
+                )
+            self._conn.commit()
+        return retry
+
+    def recover(self) -> int:
+        """起動時処理。前回プロセスで running のまま残ったジョブを queued に戻し、古い完了ジョブを削除する。"""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, updated_at = ? WHERE status = ?",
+                (STATUS_QUEUED, now, now, STATUS_RUNNING),
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_DONE, STATUS_FAILED, now - self.retention_seconds),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def next_available_at(self) -> Optional[float]:
+        with self._lock:
+            (ts,) = self._conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()
+        return ts
+
+    # --- 参照 ---
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(
+        self,
+        kind: Optional[str] = None,
+        subject: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+    ) -> list[dict]:
+        sql = f"SELECT {_COLUMNS} FROM jobs WHERE 1 = 1"
+        params: list[Any] = []
+        for column, value in (("kind", kind), ("subject", subject), ("status", status)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class JobRunner:
+    """イベントループ上で JobQueue のジョブを処理するワーカー群。"""
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2, poll_interval: float = 5.0):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self._handlers: dict[str, JobHandler] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        queue.add_listener(self._notify)
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"job runner: requeued {recovered} interrupted jobs")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _notify(self) -> None:
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # ループ終了後の投入は次回起動時に処理される
+            pass
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            # claim より前に clear し、その間の投入通知を取りこぼさないようにする
+            self._wakeup.clear()
+            job = self.queue.claim(list(self._handlers))
+            if job is None:
+                await self._wait_for_work()
+                continue
+            await self._run(job)
+
+    async def _wait_for_work(self) -> None:
+        timeout = self.poll_interval
+        next_at = self.queue.next_available_at()
+        if next_at is not None:
+            timeout = min(timeout, max(0.0, next_at - time.time()))
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, job: dict) -> None:
+        handler = self._handlers[job["kind"]]
+        started = time.perf_counter()
+        try:
+            result = await handler(job["payload"], functools.partial(self.queue.set_progress, job["id"]))
+        except asyncio.CancelledError:
+            # シャットダウン時は次回起動時に recover() で再実行される
+            raise
+        except Exception as e:
+            retry = self.queue.fail(job["id"], str(e), job["attempts"])
+            logger.warning(
+                f"job {job['kind']}:{job['subject']} v{job['version']} failed "
+                f"(attempt {job['attempts']}, retry={retry}): {e}"
+            )
+            return
+        self.queue.complete(job["id"], result)
+        logger.info(
+            f"job {job['kind']}:{job['subject']} v{job['version']} done in {time.perf_counter() - started:.2f}s"
+        )
+
+
+job_queue = JobQueue(config.JOB_QUEUE_PATH, max_attempts=config.JOB_MAX_ATTEMPTS)
+job_runner = JobRunner(job_queue, concurrency=config.JOB_WORKERS)
@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -6,10 +8,19 @@ from fastapi.middleware.cors import CORSMiddleware
 from agents.assessment_mapping_agent import AssessmentMappingAgent
 from agents.interactive_support_plan_agent import InteractiveSupportPlanAgent
 from agents.conversational_agent import ConversationalAgent
+from agents.route_cache import RouteCache
 from agents.router_agent import RouterAgent
 from agents.suggestion_agent import SuggestionAgent
 from agents.task_execution_agent import TaskExecutionAgent
+from infra.http_pool import extraction_http
+from infra.job_queue import job_runner
 from routes import register_routes
+from routes.assessments.router import SUGGESTION_JOB_KIND, run_suggestion_job
+from routes.resources.imports.router import RESOURCE_IMPORT_JOB_KIND, run_resource_import_job
+from routes.resources.embeddings.backfill import EMBEDDING_BACKFILL_JOB_KIND, run_embedding_backfill
+from routes.resources.embeddings.router import enqueue_embedding_backfill
+from routes.resources.catalog import resource_catalog
+from routes.resources.search_index import resource_search_index
 import config
 
 
@@ -19,17 +30,44 @@ async def lifespan(app: FastAPI):
     if not config.GEMINI_API_KEY or not config.GOOGLE_CSE_ID:
         raise ValueError("APIキーまたはCSE IDが設定されていません。")
 
-    app.state.assessment_agent = AssessmentMappingAgent(api_key=config.GEMINI_API_KEY)
+    app.state.assessment_agent = AssessmentMappingAgent(
+        api_key=config.GEMINI_API_KEY,
+        max_concurrency=config.LLM_AGENT_MAX_CONCURRENCY,
+        timeout=config.LLM_AGENT_TIMEOUT,
+    )
     app.state.support_plan_agent = InteractiveSupportPlanAgent(
         api_key=config.GEMINI_API_KEY, google_cse_id=config.GOOGLE_CSE_ID
     )
     app.state.conversational_agent = ConversationalAgent(api_key=config.GEMINI_API_KEY)
-    app.state.router_agent = RouterAgent(api_key=config.GEMINI_API_KEY)
-    app.state.suggestion_agent = SuggestionAgent(api_key=config.GEMINI_API_KEY)
+    app.state.router_agent = RouterAgent(
+        api_key=config.GEMINI_API_KEY,
+        cache=RouteCache(max_items=config.ROUTER_CACHE_MAX_ITEMS, similarity_threshold=config.ROUTER_CACHE_SIMILARITY),
+    )
+    app.state.suggestion_agent = SuggestionAgent(
+        api_key=config.GEMINI_API_KEY,
+        max_concurrency=config.LLM_AGENT_MAX_CONCURRENCY,
+        timeout=config.LLM_AGENT_TIMEOUT,
+    )
     app.state.task_execution_agent = TaskExecutionAgent(
         api_key=config.GEMINI_API_KEY, google_cse_id=config.GOOGLE_CSE_ID
     )
+    try:
+        await asyncio.to_thread(resource_search_index.load_memos_from_firestore)
+        await asyncio.to_thread(resource_catalog.start)
+    except Exception as e:
+        # 読込に失敗しても初回の検索/suggest 呼び出し時に再試行する
+        logging.warning(f"resource catalog load failed: {e}")
+    job_runner.register(SUGGESTION_JOB_KIND, functools.partial(run_suggestion_job, app.state.suggestion_agent))
+    job_runner.register(RESOURCE_IMPORT_JOB_KIND, run_resource_import_job)
+    job_runner.register(EMBEDDING_BACKFILL_JOB_KIND, run_embedding_backfill)
+    job_runner.start()
+    if config.EMBED_BACKFILL_ON_STARTUP:
+        # EMBED_MODEL ごとに1回。モデルを変更した起動時に既存資源を段階的に再埋め込みする
+        await asyncio.to_thread(enqueue_embedding_backfill)
     yield
+    await job_runner.stop()
+    await extraction_http.aclose()
+    resource_catalog.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -40,6 +78,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Page-Token", "X-Total-Count"],
 )
 
 
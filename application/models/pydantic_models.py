@@ -76,7 +76,6 @@ class ResourceBase(BaseModel):
     source_url: Optional[str] = None
     keywords: Optional[List[str]] = []
     last_verified_at: Optional[float] = None
-    embedding: Optional[List[float]] = None
 
 
 class ResourceCreate(ResourceBase):
@@ -100,13 +99,17 @@ class ResourceUpdate(BaseModel):
     source_url: Optional[str] = None
     keywords: Optional[List[str]] = None
     last_verified_at: Optional[float] = None
-    embedding: Optional[List[float]] = None
 
 
 class Resource(ResourceBase):
     id: str
 
 
+class ResourceWithEmbedding(Resource):
+    # 埋め込みベクトルは GET /resources/{id}?include_embedding=true のときのみ返す
+    embedding: Optional[List[float]] = None
+
+
 # --- Advanced suggestion models ---
 class Client(BaseModel):
     id: str
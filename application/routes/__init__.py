@@ -7,11 +7,14 @@ from .resources.router import router as resources_router
 from .resources.memos.router import router as resource_memos_router
 from .resources.imports.router import router as resource_imports_router
 from .resources.advanced.router import router as resources_advanced_router
+from .resources.extract.router import router as resource_extract_router
+from .resources.embeddings.router import router as resource_embeddings_router
 from .interactive_support_plan.router import router as interactive_support_plan_router
 from .clients.router import router as clients_router
 from .notes.router import router as notes_router
 from .assessments.router import router as assessments_router
 from .interview_records.router import router as interview_records_router
+from .jobs.router import router as jobs_router
 
 
 def register_routes(app: FastAPI) -> None:
@@ -22,10 +25,13 @@ def register_routes(app: FastAPI) -> None:
     app.include_router(resource_memos_router)
     app.include_router(resource_imports_router)
     app.include_router(resources_advanced_router)
+    app.include_router(resource_extract_router)
+    app.include_router(resource_embeddings_router)
     app.include_router(interactive_support_plan_router)
     app.include_router(clients_router)
     app.include_router(notes_router)
     app.include_router(assessments_router)
+    app.include_router(jobs_router)
     app.include_router(
         interview_records_router,
         prefix="/interview_records",
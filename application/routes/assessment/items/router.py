@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from ...common import db
+from ...common import db, run_firestore
 
 
 router = APIRouter(prefix="/assessment_items", tags=["assessment"])
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/assessment_items", tags=["assessment"])
 async def get_assessment_items():
     try:
         items_ref = db.collection("assessment_items").order_by("created_at")
-        docs = items_ref.stream()
+        docs = await run_firestore(lambda: list(items_ref.stream()))
         items = [{"id": doc.id, **doc.to_dict()} for doc in docs]
         return {"assessment_items": items}
     except Exception as e:
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/assessment", tags=["assessment"])
 async def map_assessment(req: AssessmentMappingRequest, request: Request):
     assessment_agent = request.app.state.assessment_agent
     try:
-        mapped_data = assessment_agent.map_to_assessment_items(req.text_content, req.assessment_items)
+        mapped_data = await assessment_agent.amap_to_assessment_items(req.text_content, req.assessment_items)
         return mapped_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"アセスメントマッピング中にエラーが発生しました: {str(e)}")
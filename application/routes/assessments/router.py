@@ -1,13 +1,28 @@
 """Assessments API router."""
 
+import asyncio
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from google.cloud.firestore import SERVER_TIMESTAMP
-from ..common import db, logger, exponential_backoff
+from google.api_core.exceptions import FailedPrecondition
+from ..common import (
+    db,
+    logger,
+    async_exponential_backoff,
+    decode_page_token,
+    encode_page_token,
+    page_response,
+    paginate_query,
+    parse_fields,
+    run_firestore,
+)
 import config
 from google.cloud.firestore_v1.base_query import FieldFilter
+from infra.job_queue import job_queue
+from utils.assessment_diff import assessment_content_hash, is_trivial_change
+from utils.assessment_digest import assessment_digest
 
 
 router = APIRouter(prefix="/assessments", tags=["assessments"])
@@ -40,6 +55,7 @@ class AssessmentResponse(BaseModel):
     created_at: datetime = Field(..., description="Creation timestamp")
     updated_at: datetime = Field(..., description="Last update timestamp")
     version: int = Field(..., description="Version number")
+    suggestion_job_id: Optional[str] = Field(None, description="Background suggestion job ID (GET /jobs/{id})")
 
 
 def assessments_collection():
@@ -64,19 +80,156 @@ def clients_collection():
     )
 
 
+def _created_at_key(doc):
+    created = (doc.to_dict() or {}).get("createdAt")
+    return created.timestamp() if isinstance(created, datetime) else 0.0
+
+
+def _paginate_sorted(docs: list, page_size: Optional[int], page_token: Optional[str]):
+    """ソート済みのドキュメント列に対して paginate_query と同じ形式のカーソルを適用する。"""
+    if page_token:
+        after = decode_page_token(page_token)
+        ids = [d.id for d in docs]
+        if after not in ids:
+            raise HTTPException(status_code=400, detail="page_token のカーソルが見つかりません")
+        docs = docs[ids.index(after) + 1 :]
+    if page_size and len(docs) > page_size:
+        docs = docs[:page_size]
+        return docs, encode_page_token(docs[-1].id)
+    return docs, None
+
+
+def suggestions_collection():
+    """サジェスト生成結果（アセスメント内容のハッシュをキーとする）への参照を取得"""
+    return (
+        db.collection("artifacts")
+        .document(config.TARGET_FIREBASE_APP_ID)
+        .collection("users")
+        .document(config.TARGET_FIREBASE_USER_ID)
+        .collection("assessment_suggestions")
+    )
+
+
+SUGGESTION_JOB_KIND = "assessment_suggestion"
+
+
+def _enqueue_suggestion(client_name: str, assessment_id: str, version: int) -> Optional[str]:
+    """クライアント単位でデバウンスしてサジェスト生成ジョブを投入する。"""
+    try:
+        return job_queue.enqueue(
+            SUGGESTION_JOB_KIND,
+            client_name,
+            version,
+            {"assessment_id": assessment_id, "version": version},
+            delay=config.SUGGESTION_DEBOUNCE_SECONDS,
+        )["id"]
+    except Exception as e:
+        # ジョブ投入に失敗してもアセスメントの保存自体は成功として返す
+        logger.error(f"サジェストジョブの投入に失敗しました: {e}")
+        return None
+
+
+async def run_suggestion_job(suggestion_agent, payload: dict, progress=None) -> dict:
+    """アセスメントからサジェストを生成し、クライアントドキュメントへ保存する（ジョブハンドラ）。
+
+    - 前回生成時と同じ内容、または軽微な差分しかない場合は再生成しない
+    - 生成結果は内容ハッシュをキーに保存し、同じ内容のアセスメントでは再利用する
+    """
+    assessment_id = payload["assessment_id"]
+    doc = await run_firestore(assessments_collection().document(assessment_id).get)
+    if not doc.exists:
+        return {"skipped": "assessment_not_found"}
+    data = doc.to_dict() or {}
+    assessment = data.get("assessment") or {}
+    content_hash = assessment_digest(assessment).hash  # プロンプト生成時も同じダイジェストを再利用する
+
+    client_name = data.get("clientName", "")
+    client_ref = clients_collection().where(filter=FieldFilter("name", "==", client_name)).limit(1)
+    client_docs = await run_firestore(lambda: list(client_ref.stream()))
+    client_doc = client_docs[0] if client_docs else None
+    prev_hash = (client_doc.to_dict() or {}).get("suggestionHash") if client_doc else None
+    if prev_hash == content_hash:
+        return {"skipped": "unchanged", "content_hash": content_hash}
+
+    if prev_hash:
+        prev = await run_firestore(suggestions_collection().document(prev_hash).get)
+        if prev.exists:
+            prev_source = (prev.to_dict() or {}).get("source")
+            if is_trivial_change(prev_source, assessment, config.SUGGESTION_MIN_CHANGED_CHARS):
+                return {"skipped": "trivial_change", "content_hash": content_hash}
+
+    stored = await run_firestore(suggestions_collection().document(content_hash).get)
+    if stored.exists:
+        suggestions = (stored.to_dict() or {}).get("suggestions") or {}
+        reused = True
+    else:
+        suggestions = await suggestion_agent.agenerate_suggestions(assessment)
+        if "error" in suggestions:
+            raise RuntimeError(suggestions["error"])
+        reused = False
+        await run_firestore(
+            suggestions_collection().document(content_hash).set,
+            {
+                "suggestions": suggestions,
+                "source": assessment,
+                "assessmentId": assessment_id,
+                "clientName": client_name,
+                "createdAt": SERVER_TIMESTAMP,
+            },
+        )
+
+    if client_doc is None:
+        return {"client_updated": False, "content_hash": content_hash, "reused": reused}
+    await run_firestore(client_doc.reference.update, {"suggestion": suggestions, "suggestionHash": content_hash})
+    logger.info(f"クライアント {client_name} にサジェストを保存しました。(reused={reused})")
+    return {"client_updated": True, "client_id": client_doc.id, "content_hash": content_hash, "reused": reused}
+
+
+# API フィールド名 -> Firestore フィールド名
+ASSESSMENT_FIELD_MAP = {
+    "client_name": "clientName",
+    "assessment": "assessment",
+    "original_script": "originalScript",
+    "support_plan": "supportPlan",
+    "created_at": "createdAt",
+    "updated_at": "updatedAt",
+    "version": "version",
+}
+
+
 @router.get("/", response_model=List[AssessmentResponse])
 async def get_assessments(
+    response: Response,
     client_name: Optional[str] = Query(None, description="Filter by client name"),
+    page_size: Optional[int] = Query(None, ge=1, le=500, description="Page size for cursor pagination"),
+    page_token: Optional[str] = Query(None, description="Opaque cursor returned in X-Next-Page-Token"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
 ) -> List[AssessmentResponse]:
     """Get all assessments, optionally filtered by client name."""
+    selected = parse_fields(fields, ASSESSMENT_FIELD_MAP)
     try:
 
         def fetch_assessments():
             ref = assessments_collection()
-            query = ref.order_by("createdAt", direction="DESCENDING")
-            return query.stream()
-
-        docs = exponential_backoff(fetch_assessments)
+            query = ref
+            if client_name:
+                query = query.where(filter=FieldFilter("clientName", "==", client_name))
+            query = query.order_by("createdAt", direction="DESCENDING")
+            select = [ASSESSMENT_FIELD_MAP[f] for f in selected] if selected else None
+            try:
+                return paginate_query(query, ref, page_size, page_token, select)
+            except FailedPrecondition as e:
+                if not client_name:
+                    raise
+                # 複合インデックス (clientName ASC, createdAt DESC) 未作成時はクライアント側でソートする
+                logger.warning(f"assessments: missing composite index, fallback to client sort ({e})")
+                fallback = ref.where(filter=FieldFilter("clientName", "==", client_name))
+                if select:
+                    fallback = fallback.select(list(dict.fromkeys([*select, "createdAt"])))
+                docs = sorted(fallback.stream(), key=_created_at_key, reverse=True)
+                return _paginate_sorted(docs, page_size, page_token)
+
+        docs, next_token = await async_exponential_backoff(fetch_assessments)
 
         result = []
         for doc in docs:
@@ -84,8 +237,11 @@ async def get_assessments(
             if not data:
                 continue
 
-            # Filter by client name if provided
-            if client_name and data.get("clientName") != client_name:
+            if selected:
+                item = {"id": doc.id}
+                for f in selected:
+                    item[f] = data.get(ASSESSMENT_FIELD_MAP[f])
+                result.append(item)
                 continue
 
             try:
@@ -106,15 +262,60 @@ async def get_assessments(
                 continue
 
         logger.info(f"アセスメント一覧を取得しました: {len(result)}件")
-        return result
+        return page_response(result, response, next_token, projected=bool(selected))
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"アセスメント一覧取得エラー: {str(e)}")
         raise HTTPException(status_code=500, detail=f"アセスメント一覧の取得中にエラーが発生しました: {str(e)}")
 
 
+@router.get("/latest", response_model=AssessmentResponse)
+async def get_latest_assessment(
+    client_name: str = Query(..., description="Client name"),
+) -> AssessmentResponse:
+    """Get the most recent assessment of a client (reads a single document)."""
+    try:
+
+        def fetch_latest():
+            query = (
+                assessments_collection()
+                .where(filter=FieldFilter("clientName", "==", client_name))
+                .order_by("createdAt", direction="DESCENDING")
+                .limit(1)
+            )
+            try:
+                return next(iter(query.stream()), None)
+            except FailedPrecondition as e:
+                logger.warning(f"assessments latest: missing composite index, fallback to client sort ({e})")
+                docs = assessments_collection().where(filter=FieldFilter("clientName", "==", client_name)).stream()
+                return max(docs, key=_created_at_key, default=None)
+
+        doc = await async_exponential_backoff(fetch_latest)
+        if doc is None:
+            raise HTTPException(status_code=404, detail="アセスメントが見つかりません")
+        data = doc.to_dict() or {}
+        return AssessmentResponse(
+            id=doc.id,
+            client_name=data.get("clientName", ""),
+            assessment=data.get("assessment", {}),
+            original_script=data.get("originalScript"),
+            support_plan=data.get("supportPlan"),
+            created_at=data.get("createdAt", datetime.now()),
+            updated_at=data.get("updatedAt", datetime.now()),
+            version=data.get("version", 1),
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"最新アセスメント取得エラー: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"最新アセスメントの取得中にエラーが発生しました: {str(e)}")
+
+
 @router.post("/", response_model=AssessmentResponse)
-async def create_assessment(req: AssessmentCreateRequest, request: Request) -> AssessmentResponse:
+async def create_assessment(req: AssessmentCreateRequest) -> AssessmentResponse:
     """Create a new assessment."""
     try:
         if not req.client_name.strip():
@@ -134,13 +335,13 @@ async def create_assessment(req: AssessmentCreateRequest, request: Request) -> A
             doc_ref = ref.add(doc_data)
             return doc_ref[1]  # ドキュメント参照を返す
 
-        doc_ref = exponential_backoff(create_assessment_doc)
+        doc_ref = await async_exponential_backoff(create_assessment_doc)
 
         # 作成されたドキュメントを取得
         def get_created_doc():
             return doc_ref.get()
 
-        doc = exponential_backoff(get_created_doc)
+        doc = await async_exponential_backoff(get_created_doc)
         data = doc.to_dict()
 
         result = AssessmentResponse(
@@ -154,22 +355,10 @@ async def create_assessment(req: AssessmentCreateRequest, request: Request) -> A
             version=data.get("version", 1),
         )
 
-        # サジェストを生成して保存
-        try:
-            suggestion_agent = request.app.state.suggestion_agent
-            suggestions = suggestion_agent.generate_suggestions(req.assessment)
-            if "error" not in suggestions:
-                client_ref = (
-                    clients_collection().where(filter=FieldFilter("name", "==", req.client_name.strip())).limit(1)
-                )
-                client_docs = list(client_ref.stream())
-                if client_docs:
-                    client_doc_ref = client_docs[0].reference
-                    client_doc_ref.update({"suggestion": suggestions})
-                    logger.info(f"クライアント {req.client_name} にサジェストを保存しました。")
-        except Exception as e:
-            logger.error(f"サジェストの保存中にエラーが発生しました: {e}")
-            # ここではエラーを発生させず、処理を続行する
+        # サジェスト生成はバックグラウンドジョブで行う
+        result.suggestion_job_id = await asyncio.to_thread(
+            _enqueue_suggestion, result.client_name, result.id, result.version
+        )
 
         logger.info(f"アセスメントを作成しました: {result.client_name} (ID: {result.id})")
         return result
@@ -182,7 +371,7 @@ async def create_assessment(req: AssessmentCreateRequest, request: Request) -> A
 
 
 @router.put("/{assessment_id}", response_model=AssessmentResponse)
-async def update_assessment(assessment_id: str, req: AssessmentUpdateRequest, request: Request) -> AssessmentResponse:
+async def update_assessment(assessment_id: str, req: AssessmentUpdateRequest) -> AssessmentResponse:
     """Update an existing assessment."""
     try:
 
@@ -190,7 +379,7 @@ async def update_assessment(assessment_id: str, req: AssessmentUpdateRequest, re
             ref = assessments_collection().document(assessment_id)
             return ref.get()
 
-        doc = exponential_backoff(get_existing_assessment)
+        doc = await async_exponential_backoff(get_existing_assessment)
         if not doc.exists:
             raise HTTPException(status_code=404, detail="アセスメントが見つかりません")
 
@@ -210,14 +399,14 @@ async def update_assessment(assessment_id: str, req: AssessmentUpdateRequest, re
             ref = assessments_collection().document(assessment_id)
             ref.update(update_data)
 
-        exponential_backoff(update_doc)
+        await async_exponential_backoff(update_doc)
 
         # 更新されたドキュメントを取得
         def get_updated_doc():
             ref = assessments_collection().document(assessment_id)
             return ref.get()
 
-        updated_doc = exponential_backoff(get_updated_doc)
+        updated_doc = await async_exponential_backoff(get_updated_doc)
         updated_data = updated_doc.to_dict()
 
         result = AssessmentResponse(
@@ -231,25 +420,13 @@ async def update_assessment(assessment_id: str, req: AssessmentUpdateRequest, re
             version=updated_data.get("version", 1),
         )
 
-        # サジェストを生成して保存
-        if req.assessment:
-            try:
-                suggestion_agent = request.app.state.suggestion_agent
-                suggestions = suggestion_agent.generate_suggestions(req.assessment)
-                if "error" not in suggestions:
-                    client_ref = (
-                        clients_collection()
-                        .where(filter=FieldFilter("name", "==", updated_data.get("clientName", "")))
-                        .limit(1)
-                    )
-                    client_docs = list(client_ref.stream())
-                    if client_docs:
-                        client_doc_ref = client_docs[0].reference
-                        client_doc_ref.update({"suggestion": suggestions})
-                        logger.info(f"クライアント {updated_data.get('clientName', '')} にサジェストを保存しました。")
-            except Exception as e:
-                logger.error(f"サジェストの保存中にエラーが発生しました: {e}")
-                # ここではエラーを発生させず、処理を続行する
+        # サジェスト生成はバックグラウンドジョブで行う（内容が変わっていなければ投入しない）
+        if req.assessment and assessment_content_hash(req.assessment) != assessment_content_hash(
+            existing_data.get("assessment") or {}
+        ):
+            result.suggestion_job_id = await asyncio.to_thread(
+                _enqueue_suggestion, result.client_name, assessment_id, result.version
+            )
 
         logger.info(f"アセスメントを更新しました: ID {assessment_id}")
         return result
@@ -270,7 +447,7 @@ async def get_assessment(assessment_id: str) -> AssessmentResponse:
             ref = assessments_collection().document(assessment_id)
             return ref.get()
 
-        doc = exponential_backoff(get_assessment_doc)
+        doc = await async_exponential_backoff(get_assessment_doc)
         if not doc.exists:
             raise HTTPException(status_code=404, detail="アセスメントが見つかりません")
 
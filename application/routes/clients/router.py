@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
 from google.cloud.firestore import SERVER_TIMESTAMP
-from ..common import db, logger, exponential_backoff
+from ..common import db, logger, async_exponential_backoff, page_response, paginate_query, parse_fields
 from models.pydantic_models import ClientResource, ClientResourceCreate, ClientResourceUpdate
 import config
 import time
@@ -50,27 +50,43 @@ def client_resources_collection():
     )
 
 
+CLIENT_FIELDS = ["name", "createdAt"]
+
+
 @router.get("/", response_model=List[ClientResponse])
-async def get_clients():
-    """クライアント一覧を取得"""
+async def get_clients(
+    response: Response,
+    page_size: Optional[int] = Query(None, ge=1, le=500),
+    page_token: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """クライアント一覧を取得（page_size 指定でカーソルページング）"""
+    selected = parse_fields(fields, CLIENT_FIELDS)
     try:
 
         def fetch_clients():
             ref = clients_collection()
             query = ref.order_by("createdAt", direction="ASCENDING")
-            return query.stream()
+            # name で絞り込むため射影時も name は取得する
+            select = list(dict.fromkeys(["name", *selected])) if selected else None
+            return paginate_query(query, ref, page_size, page_token, select)
 
-        docs = exponential_backoff(fetch_clients)
+        docs, next_token = await async_exponential_backoff(fetch_clients)
 
         clients = []
         for doc in docs:
             data = doc.to_dict()
             if data and data.get("name"):
-                clients.append({"id": doc.id, "name": data["name"], "createdAt": data.get("createdAt", datetime.now())})
+                client = {"id": doc.id, "name": data["name"], "createdAt": data.get("createdAt", datetime.now())}
+                if selected:
+                    client = {k: client[k] for k in ["id", *selected]}
+                clients.append(client)
 
         logger.info(f"クライアント一覧を取得しました: {len(clients)}件")
-        return clients
+        return page_response(clients, response, next_token, projected=bool(selected))
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"クライアント一覧取得エラー: {str(e)}")
         raise HTTPException(status_code=500, detail=f"クライアント一覧の取得中にエラーが発生しました: {str(e)}")
@@ -88,13 +104,13 @@ async def create_client(request: ClientCreateRequest):
             doc_ref = ref.add({"name": request.name.strip(), "createdAt": SERVER_TIMESTAMP})
             return doc_ref[1]  # ドキュメント参照を返す
 
-        doc_ref = exponential_backoff(create_client_doc)
+        doc_ref = await async_exponential_backoff(create_client_doc)
 
         # 作成されたドキュメントを取得
         def get_created_doc():
             return doc_ref.get()
 
-        doc = exponential_backoff(get_created_doc)
+        doc = await async_exponential_backoff(get_created_doc)
         data = doc.to_dict()
 
         result = {"id": doc.id, "name": data["name"], "createdAt": data.get("createdAt", datetime.now())}
@@ -118,9 +134,9 @@ async def get_client_resources(client_name: str):
             ref = client_resources_collection()
             # 複合インデックスを避けるため、order_byを削除してフィルタのみ使用
             query = ref.where(filter=FieldFilter("client_name", "==", client_name))
-            return query.stream()
+            return list(query.stream())
 
-        docs = exponential_backoff(fetch_resources)
+        docs = await async_exponential_backoff(fetch_resources)
 
         resources = []
         for doc in docs:
@@ -170,13 +186,13 @@ async def add_client_resource(client_name: str, request: ClientResourceCreate):
             )
             return doc_ref[1]  # ドキュメント参照を返す
 
-        doc_ref = exponential_backoff(create_resource)
+        doc_ref = await async_exponential_backoff(create_resource)
 
         # 作成されたドキュメントを取得
         def get_created_doc():
             return doc_ref.get()
 
-        doc = exponential_backoff(get_created_doc)
+        doc = await async_exponential_backoff(get_created_doc)
         data = doc.to_dict()
 
         result = {
@@ -213,7 +229,7 @@ async def update_client_resource(client_name: str, usage_id: str, request: Clien
             ref.update(update_data)
             return ref
 
-        exponential_backoff(update_resource)
+        await async_exponential_backoff(update_resource)
 
         logger.info(f"クライアント {client_name} のリソース利用状況を更新: {usage_id}")
         return {"message": "更新しました"}
@@ -232,7 +248,7 @@ async def delete_client_resource(client_name: str, usage_id: str):
             ref = client_resources_collection().document(usage_id)
             ref.delete()
 
-        exponential_backoff(delete_resource)
+        await async_exponential_backoff(delete_resource)
 
         logger.info(f"クライアント {client_name} のリソース利用を削除: {usage_id}")
         return {"message": "削除しました"}
@@ -257,7 +273,7 @@ async def get_and_clear_suggestion(client_name: str):
         def fetch_client_docs():
             return list(client_ref.stream())
 
-        client_docs = exponential_backoff(fetch_client_docs)
+        client_docs = await async_exponential_backoff(fetch_client_docs)
 
         if not client_docs:
             raise HTTPException(status_code=404, detail="Client not found")
@@ -273,7 +289,7 @@ async def get_and_clear_suggestion(client_name: str):
         def clear_suggestion_from_db():
             client_doc.reference.update({"suggestion": None})
 
-        exponential_backoff(clear_suggestion_from_db)
+        await async_exponential_backoff(clear_suggestion_from_db)
 
         logger.info(f"クライアント {client_name} のサジェストを取得・削除しました。")
         return Suggestion(**suggestion_data)
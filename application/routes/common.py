@@ -1,5 +1,15 @@
+import asyncio
+import base64
+import functools
+import json
 import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
 
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from google.cloud import firestore
 from google.api_core.exceptions import NotFound as FirestoreNotFound
 
@@ -54,15 +64,115 @@ def resource_memo_collection():
     )
 
 
+# Firestore の同期クライアント呼び出しを退避する専用スレッドプール
+_firestore_executor = ThreadPoolExecutor(max_workers=config.FIRESTORE_MAX_WORKERS, thread_name_prefix="firestore")
+
+
+async def run_firestore(func, *args, **kwargs):
+    """同期の Firestore 呼び出しを専用スレッドプールで実行し、イベントループをブロックしない。
+
+    ストリームはスレッド内で list 化してから返すこと（ジェネレータを返すとループ側で I/O が走る）。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_firestore_executor, functools.partial(func, *args, **kwargs))
+
+
+async def async_exponential_backoff(func, max_attempts: int = 5, initial_delay: float = 1.0, max_delay: float = 16.0):
+    """exponential_backoff の非同期版。func はスレッドプールで実行し、待機は asyncio.sleep で行う。"""
+    delay = initial_delay
+    for attempt in range(max_attempts):
+        try:
+            return await run_firestore(func)
+        except HTTPException:
+            raise
+        except Exception:
+            if attempt == max_attempts - 1:
+                raise
+            await asyncio.sleep(delay + random.uniform(0, 0.5))
+            delay = min(delay * 2, max_delay)
+
+
 def exponential_backoff(func, max_attempts: int = 5, initial_delay: float = 1.0, max_delay: float = 16.0):
-    import time, random
+    import time
 
     delay = initial_delay
     for attempt in range(max_attempts):
         try:
             return func()
+        except HTTPException:
+            raise
         except Exception:
             if attempt == max_attempts - 1:
                 raise
             time.sleep(delay + random.uniform(0, 0.5))
             delay = min(delay * 2, max_delay)
+
+
+# --- Cursor pagination / field projection ---
+NEXT_PAGE_TOKEN_HEADER = "X-Next-Page-Token"
+
+
+def encode_page_token(last_id: str) -> str:
+    raw = json.dumps({"after": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_page_token(token: str) -> str:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+        if not isinstance(last_id, str) or not last_id:
+            raise ValueError("empty cursor")
+        return last_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="page_token が不正です")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[list[str]]:
+    """`fields=a,b` を検証してリストで返す。未指定なら None。"""
+    if not fields:
+        return None
+    allowed = set(allowed)
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    invalid = [f for f in requested if f not in allowed]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"指定できないフィールドです: {', '.join(invalid)}")
+    return requested or None
+
+
+def paginate_query(
+    query,
+    collection,
+    page_size: Optional[int] = None,
+    page_token: Optional[str] = None,
+    select: Optional[list[str]] = None,
+):
+    """クエリにカーソルと件数制限、射影を適用して (docs, next_page_token) を返す。
+
+    カーソルは前ページ最後のドキュメントIDで、start_after にはそのスナップショットを渡す
+    （order_by の値とドキュメント名の両方で位置が決まるため同値のタイムスタンプでも重複しない）。
+    """
+    if select:
+        query = query.select(select)
+    if page_token:
+        cursor = collection.document(decode_page_token(page_token)).get()
+        if not cursor.exists:
+            raise HTTPException(status_code=400, detail="page_token のカーソルが見つかりません")
+        query = query.start_after(cursor)
+    if page_size:
+        query = query.limit(page_size + 1)
+    docs = list(query.stream())
+    next_token = None
+    if page_size and len(docs) > page_size:
+        docs = docs[:page_size]
+        next_token = encode_page_token(docs[-1].id)
+    return docs, next_token
+
+
+def page_response(items: list, response, next_token: Optional[str], projected: bool = False):
+    """射影時は response_model の検証を通さずに JSON を返す。"""
+    headers = {NEXT_PAGE_TOKEN_HEADER: next_token} if next_token else {}
+    if projected:
+        return JSONResponse(content=jsonable_encoder(items), headers=headers)
+    response.headers.update(headers)
+    return items
@@ -1,31 +1,93 @@
+import asyncio
+import time
+
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 
+import config
+from agent.tools.google_search_tool import google_search_store
+from agent.tools.rag_search_social_support_tool import rag_answer_cache
 from .models.interactive import InteractiveSupportPlanRequest, InteractiveSupportPlanResponse
+from .speculative import PrefetchedStream, latency_metrics, measure_first_chunk
 
 
 router = APIRouter(tags=["interactive"])
 
 
+async def _support_plan_stream(req: InteractiveSupportPlanRequest, request: Request):
+    support_plan_agent = request.app.state.support_plan_agent
+    return await support_plan_agent.generate_interactive_support_plan_stream(
+        client_name=req.client_name,
+        assessment_data=req.assessment_data,
+        message=req.message,
+    )
+
+
+async def _conversational_stream(req: InteractiveSupportPlanRequest, request: Request):
+    conversational_agent = request.app.state.conversational_agent
+    return await conversational_agent.generate_response_stream(
+        client_name=req.client_name,
+        assessment_data=req.assessment_data,
+        message=req.message,
+        chat_history=req.chat_history or [],
+    )
+
+
+async def _speculative_stream(req: InteractiveSupportPlanRequest, request: Request, started: float):
+    """ルーティングと会話応答を同時に開始し、ルーティング結果に応じて会話応答を採用/破棄する。"""
+    router_agent = request.app.state.router_agent
+    route_task = asyncio.create_task(router_agent.route(req.message))
+    prefetch = PrefetchedStream(await _conversational_stream(req, request))
+    try:
+        route = await route_task
+        latency_metrics.record("route", time.perf_counter() - started)
+        if route.next_agent != "support_plan":
+            async for chunk in measure_first_chunk(prefetch, latency_metrics, "ttft_speculative_hit", started):
+                yield chunk
+            return
+        await prefetch.cancel()
+        stream = await _support_plan_stream(req, request)
+        async for chunk in measure_first_chunk(stream, latency_metrics, "ttft_speculative_miss", started):
+            yield chunk
+    finally:
+        # クライアント切断時もバックグラウンドの生成を止める（採用後の切断を含む。cancel は二重に呼んでもよい）
+        if not route_task.done():
+            route_task.cancel()
+        await prefetch.cancel()
+
+
 @router.post("/interactive_support_plan", response_model=InteractiveSupportPlanResponse)
 async def interactive_support_plan(req: InteractiveSupportPlanRequest, request: Request):
+    started = time.perf_counter()
+    if config.ROUTER_SPECULATIVE:
+        return StreamingResponse(_speculative_stream(req, request, started), media_type="text/event-stream")
+
     router_agent = request.app.state.router_agent
     route = await router_agent.route(req.message)
+    latency_metrics.record("route", time.perf_counter() - started)
 
     if route.next_agent == "support_plan":
-        support_plan_agent = request.app.state.support_plan_agent
-        stream = await support_plan_agent.generate_interactive_support_plan_stream(
-            client_name=req.client_name,
-            assessment_data=req.assessment_data,
-            message=req.message,
-        )
+        stream = await _support_plan_stream(req, request)
     else:  # conversational
-        conversational_agent = request.app.state.conversational_agent
-        stream = await conversational_agent.generate_response_stream(
-            client_name=req.client_name,
-            assessment_data=req.assessment_data,
-            message=req.message,
-            chat_history=req.chat_history or [],
-        )
+        stream = await _conversational_stream(req, request)
 
+    stream = measure_first_chunk(stream, latency_metrics, f"ttft_sequential_{route.next_agent}", started)
     return StreamingResponse(stream, media_type="text/event-stream")
+
+
+@router.get("/interactive_support_plan/router/stats")
+async def router_stats(request: Request):
+    """ルーティング判定のキャッシュ/規則ヒット率と LLM フォールバック回数。"""
+    return request.app.state.router_agent.stats()
+
+
+@router.get("/interactive_support_plan/metrics")
+async def interactive_metrics():
+    """ルーティング時間と TTFT の集計（モード別、直近の計測値）。"""
+    return {"speculative": config.ROUTER_SPECULATIVE, "latency": latency_metrics.stats()}
+
+
+@router.get("/interactive_support_plan/tools/stats")
+async def tool_cache_stats():
+    """エージェントが使うツール（RAG 検索・Google 検索）の結果キャッシュ統計。"""
+    return {"rag_search_social_support": rag_answer_cache.stats(), "google_search": google_search_store.stats()}
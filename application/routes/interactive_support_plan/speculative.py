@@ -0,0 +1,97 @@
+"""ルーティングと会話応答の投機的並列実行、および TTFT (最初のチャンクまでの時間) の計測。"""
+
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+
+_END = object()
+
+
+class PrefetchedStream:
+    """非同期ジェネレータを裏で読み進め、チャンクをバッファしておく。
+
+    cancel() でバックグラウンドの読み出しタスクをキャンセルし、元のジェネレータも閉じる
+    （LangChain の astream まで CancelledError が伝播し、LLM へのストリーミング接続が切られる）。
+    """
+
+    def __init__(self, source: AsyncIterator[str], buffer_size: int = 256):
+        self._source = source
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self._error: Optional[BaseException] = None
+        self._task = asyncio.create_task(self._pump())
+
+    async def _pump(self) -> None:
+        try:
+            async for item in self._source:
+                await self._queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        await self._queue.put(_END)
+
+    async def __aiter__(self):
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                break
+            yield item
+        if self._error is not None:
+            raise self._error
+
+    async def cancel(self) -> None:
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        aclose = getattr(self._source, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass
+
+
+class LatencyMetrics:
+    """モード別の TTFT / ルーティング時間を直近 window 件で集計する。"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._counts: dict[str, int] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    def stats(self) -> dict:
+        out = {}
+        for name, samples in self._samples.items():
+            values = sorted(samples)
+            n = len(values)
+            out[name] = {
+                "count": self._counts.get(name, 0),
+                "avg_ms": round(sum(values) / n * 1000, 1),
+                "p50_ms": round(values[n // 2] * 1000, 1),
+                "p95_ms": round(values[min(n - 1, int(n * 0.95))] * 1000, 1),
+            }
+        return out
+
+
+async def measure_first_chunk(
+    stream: AsyncIterator[str], metrics: LatencyMetrics, name: str, started: float
+) -> AsyncIterator[str]:
+    """最初のチャンクを返した時点で started からの経過時間を記録する。"""
+    first = True
+    async for chunk in stream:
+        if first:
+            metrics.record(name, time.perf_counter() - started)
+            first = False
+        yield chunk
+
+
+latency_metrics = LatencyMetrics()
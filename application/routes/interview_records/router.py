@@ -1,41 +1,59 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
 from models.pydantic_models import InterviewRecord
 from infra.firestore import get_firestore_client
 import config
 from google.cloud.firestore_v1.base_query import FieldFilter
+from ..common import page_response, paginate_query, parse_fields
 
 router = APIRouter()
 db = get_firestore_client()
 
 
+INTERVIEW_RECORD_FIELDS = ["clientName", "content", "speaker", "timestamp"]
+
+
 @router.get(
     "/",
     response_model=List[InterviewRecord],
     summary="Get all interview records for a client",
 )
-def get_all_interview_records(client_name: str):
+def get_all_interview_records(
+    client_name: str,
+    response: Response,
+    page_size: Optional[int] = Query(None, ge=1, le=500),
+    page_token: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """
     指定されたクライアントのすべての面談記録を取得します。
+    page_size を指定するとカーソルページングし、次ページのトークンを X-Next-Page-Token で返します。
     """
+    selected = parse_fields(fields, INTERVIEW_RECORD_FIELDS)
     try:
-        records_ref = (
+        collection = (
             db.collection("artifacts")
             .document(config.TARGET_FIREBASE_APP_ID)
             .collection("users")
             .document(config.TARGET_FIREBASE_USER_ID)
             .collection("interview_records")
-            .where(filter=FieldFilter("clientName", "==", client_name))
-            .order_by("timestamp", direction="DESCENDING")
         )
-        docs = records_ref.stream()
+        records_ref = collection.where(filter=FieldFilter("clientName", "==", client_name)).order_by(
+            "timestamp", direction="DESCENDING"
+        )
+        docs, next_token = paginate_query(records_ref, collection, page_size, page_token, selected)
 
         records = []
         for doc in docs:
             record_data = doc.to_dict()
             record_data["id"] = doc.id
-            records.append(InterviewRecord(**record_data))
+            if selected:
+                records.append({k: record_data.get(k) for k in ["id", *selected]})
+            else:
+                records.append(InterviewRecord(**record_data))
 
-        return records
+        return page_response(records, response, next_token, projected=bool(selected))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
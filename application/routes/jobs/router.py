@@ -0,0 +1,35 @@
+"""Background jobs API router."""
+
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from infra.job_queue import job_queue
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/")
+async def list_jobs(
+    kind: Optional[str] = Query(None, description="ジョブ種別 (例: assessment_suggestion, resource_import)"),
+    subject: Optional[str] = Query(None, description="対象ID (例: アセスメントID)"),
+    status: Optional[str] = Query(None, description="queued / running / done / failed"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """ジョブ一覧を新しい順に返す。"""
+    return await asyncio.to_thread(job_queue.list, kind=kind, subject=subject, status=status, limit=limit)
+
+
+@router.get("/stats")
+async def job_stats():
+    """ステータス別の件数。"""
+    return await asyncio.to_thread(job_queue.stats)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
@@ -1,10 +1,10 @@
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
 from google.cloud.firestore import SERVER_TIMESTAMP
 from google.cloud.firestore_v1.base_query import FieldFilter
-from ..common import db, logger, exponential_backoff
+from ..common import db, logger, async_exponential_backoff, page_response, paginate_query, parse_fields
 import config
 
 
@@ -50,9 +50,19 @@ def notes_collection():
     )
 
 
+NOTE_FIELDS = ["clientName", "content", "speaker", "timestamp", "todoItems"]
+
+
 @router.get("/", response_model=List[NoteResponse])
-async def get_notes(client_name: Optional[str] = None):
-    """ノート一覧を取得（クライアント名で絞り込み可能）"""
+async def get_notes(
+    response: Response,
+    client_name: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=500),
+    page_token: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """ノート一覧を取得（クライアント名で絞り込み可能、page_size 指定でカーソルページング）"""
+    selected = parse_fields(fields, NOTE_FIELDS)
     try:
 
         def fetch_notes():
@@ -63,9 +73,9 @@ async def get_notes(client_name: Optional[str] = None):
                 )
             else:
                 query = ref.order_by("timestamp", direction="DESCENDING")
-            return query.stream()
+            return paginate_query(query, ref, page_size, page_token, selected)
 
-        docs = exponential_backoff(fetch_notes)
+        docs, next_token = await async_exponential_backoff(fetch_notes)
 
         notes = []
         for doc in docs:
@@ -93,11 +103,15 @@ async def get_notes(client_name: Optional[str] = None):
                     "timestamp": data.get("timestamp", datetime.now()),
                     "todoItems": mapped_todo_items,
                 }
+                if selected:
+                    note = {k: note[k] for k in ["id", *selected]}
                 notes.append(note)
 
         logger.info(f"ノート一覧を取得しました: {len(notes)}件 (client: {client_name})")
-        return notes
+        return page_response(notes, response, next_token, projected=bool(selected))
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"ノート一覧取得エラー: {str(e)}")
         raise HTTPException(status_code=500, detail=f"ノート一覧の取得中にエラーが発生しました: {str(e)}")
@@ -125,13 +139,13 @@ async def create_note(request: NoteCreateRequest):
             )
             return doc_ref[1]  # ドキュメント参照を返す
 
-        doc_ref = exponential_backoff(create_note_doc)
+        doc_ref = await async_exponential_backoff(create_note_doc)
 
         # 作成されたドキュメントを取得
         def get_created_doc():
             return doc_ref.get()
 
-        doc = exponential_backoff(get_created_doc)
+        doc = await async_exponential_backoff(get_created_doc)
         data = doc.to_dict()
 
         result = {
@@ -161,7 +175,7 @@ async def get_note(note_id: str):
         def get_note_doc():
             return notes_collection().document(note_id).get()
 
-        doc = exponential_backoff(get_note_doc)
+        doc = await async_exponential_backoff(get_note_doc)
         if not doc.exists:
             raise HTTPException(status_code=404, detail="ノートが見つかりません")
 
@@ -208,7 +222,7 @@ async def update_note(note_id: str, request: NoteUpdateRequest):
         def get_note_doc():
             return notes_collection().document(note_id).get()
 
-        doc = exponential_backoff(get_note_doc)
+        doc = await async_exponential_backoff(get_note_doc)
         if not doc.exists:
             raise HTTPException(status_code=404, detail="ノートが見つかりません")
 
@@ -240,7 +254,7 @@ async def update_note(note_id: str, request: NoteUpdateRequest):
             notes_collection().document(note_id).update(update_data)
             return notes_collection().document(note_id).get()
 
-        updated_doc = exponential_backoff(update_note_doc)
+        updated_doc = await async_exponential_backoff(update_note_doc)
         data = updated_doc.to_dict()
 
         # TodoItemsのフィールド名をFirestoreのisCompletedから
@@ -284,14 +298,14 @@ async def delete_note(note_id: str):
         def get_note_doc():
             return notes_collection().document(note_id).get()
 
-        doc = exponential_backoff(get_note_doc)
+        doc = await async_exponential_backoff(get_note_doc)
         if not doc.exists:
             raise HTTPException(status_code=404, detail="ノートが見つかりません")
 
         def delete_note_doc():
             notes_collection().document(note_id).delete()
 
-        exponential_backoff(delete_note_doc)
+        await async_exponential_backoff(delete_note_doc)
 
         logger.info(f"ノートを削除しました: ID {note_id}")
         return {"message": "ノートを削除しました"}
@@ -1,93 +1,134 @@
+import asyncio
+import json
+from typing import Optional
+
+import numpy as np
 from fastapi import APIRouter, Request
 
-from ...common import resource_collection, logger
-from ..service import resource_doc_to_model
-from ..utils import embed_texts, cosine
-from models.pydantic_models import ResourceSuggestRequest, ResourceSuggestResponse, SuggestedResource
+from ...common import logger, run_firestore
+from ..catalog import resource_catalog
+from ..vector_index import resource_vector_index
+from ..keyword_index import resource_keyword_index
+from ..tokenizer import suggest_tokenizer
+from utils.assessment_digest import assessment_digest, assessment_digests
+from models.pydantic_models import Client, Resource, ResourceSuggestRequest, ResourceSuggestResponse, SuggestedResource
+import config
 
 
 router = APIRouter(prefix="/resources/advanced", tags=["resources"])
 
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def _check_eligibility(
+    support_plan_agent, base_text: str, client: Optional[Client], res: Resource
+) -> Optional[tuple[bool, Optional[str], Optional[str]]]:
+    """資源ごとのLLM適合判定。失敗・タイムアウト時は None を返す。"""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(config.SUGGEST_LLM_CONCURRENCY)
+    resource_context = (
+        f"名称: {res.service_name}\n概要: {res.description}\n対象者: {res.target_users}\n利用要件: {res.eligibility}"
+    )
+    async with _llm_semaphore:
+        try:
+            llm_response_str = await asyncio.wait_for(
+                support_plan_agent.asummarize_for_resource_match(
+                    base_text, client=client, resource_context=resource_context
+                ),
+                timeout=config.SUGGEST_LLM_TIMEOUT,
+            )
+            text = llm_response_str.strip()
+            if text.startswith("```json"):
+                text = text[7:]
+            if text.endswith("```"):
+                text = text[:-3]
+            llm_response = json.loads(text.strip())
+            return (
+                bool(llm_response.get("is_match", False)),
+                llm_response.get("reason"),
+                llm_response.get("task_suggestion"),
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM eligibility check timed out for resource {res.id}")
+        except Exception as e:
+            logger.warning(f"LLM eligibility check failed for resource {res.id}: {e}")
+    return None
+
 
 @router.post("/suggest", response_model=ResourceSuggestResponse)
 async def suggest_resources(req: ResourceSuggestRequest, request: Request):
     assessment = req.assessment_data.get("assessment") if isinstance(req.assessment_data, dict) else None
-    texts: list[str] = []
-    if isinstance(assessment, dict):
-        for form_val in assessment.values():
-            if isinstance(form_val, dict):
-                for cat_val in form_val.values():
-                    if isinstance(cat_val, str):
-                        texts.append(cat_val)
-                    elif isinstance(cat_val, dict):
-                        for sub_val in cat_val.values():
-                            if isinstance(sub_val, str):
-                                texts.append(sub_val)
-    base_text = "\n".join(texts)[:20000]
+    # Flattened text, tokens and embedding are memoized per assessment content hash
+    digest = assessment_digest(assessment if isinstance(assessment, dict) else {})
+    base_text = digest.text
     summary_text = base_text
     used_summary = False
     if logger.isEnabledFor(10):  # DEBUG
-        logger.debug(f"[suggest_debug] raw_text_len={len(base_text)} snippets={len(texts)}")
-
-    # LLM summary is now used inside the loop for each resource if enabled
-    import re
-    import json
+        logger.debug(
+            f"[suggest_debug] raw_text_len={len(base_text)} snippets={len(digest.items)} hash={digest.hash[:12]}"
+        )
 
-    # Tokenize the base text once for keyword matching
-    tokens = [t.lower() for t in re.split(r"[\s、。,.；;:\n\r\t/()『』「」【】\[\]{}]+", base_text) if len(t) > 1][
-        :1000
-    ]
+    # Tokenize the base text once for keyword matching (analyzers can be slow, so off the event loop)
+    tokenized = await asyncio.to_thread(
+        digest.derive, f"tokens:{suggest_tokenizer.name}", lambda: suggest_tokenizer.tokenize(base_text)
+    )
+    tokens = list(tokenized.words)
+    token_set = tokenized.terms
     if logger.isEnabledFor(10):
-        logger.debug(f"[suggest_debug] token_count={len(tokens)} first_tokens={tokens[:15]}")
+        logger.debug(
+            f"[suggest_debug] tokenizer={suggest_tokenizer.name} token_count={len(tokens)} "
+            f"term_count={len(token_set)} first_tokens={tokens[:15]}"
+        )
     # Embed the base text for cosine similarity calculation
-    q_vec = embed_texts([base_text])[0]
+    q_vec = await digest.aembedding()
     scored: list[tuple[str, float, list[str], object, Optional[str], Optional[str]]] = []
     debug_components: list[dict] = []
     try:
-        docs = list(resource_collection().stream())
-        resources = []
-        for d in docs:
-            try:
-                resources.append(resource_doc_to_model(d))
-            except ValueError:
+        if not resource_catalog.ready:
+            await run_firestore(resource_catalog.ensure_started)
+        # Stage 1: cheap hybrid score for the whole catalog in one vectorized pass
+        # Embedding scores come from one matrix product, keyword matches from one bincount over the sparse index
+        emb_scores = resource_vector_index.scores(q_vec)
+        ids, kw_scores = resource_keyword_index.match_scores(token_set, tokenized.text)
+        kw = np.minimum(kw_scores, config.SUGGEST_MAX_KEYWORD_MATCHES).astype(np.float32)
+        emb = np.fromiter((emb_scores.get(i, 0.0) for i in ids), dtype=np.float32, count=len(ids))
+        final = emb * config.SUGGEST_EMBEDDING_WEIGHT + kw * config.SUGGEST_KEYWORD_WEIGHT
+        passed = np.flatnonzero(final > config.SUGGEST_SCORE_THRESHOLD)
+        order = passed[np.argsort(-final[passed], kind="stable")]
+        candidates: list[tuple[Resource, float, list[str], float, float]] = []
+        for i in order:
+            res = resource_keyword_index.get(ids[i])
+            if res is None:
                 continue
+            overlap = resource_keyword_index.overlap(res.id, token_set, tokenized.text)
+            candidates.append(
+                (res, float(final[i]), overlap[: config.SUGGEST_MAX_KEYWORD_MATCHES], float(kw[i]), float(emb[i]))
+            )
 
-        for res in resources:
-            # Keyword-based score
-            overlap = list({kw.lower() for kw in (res.keywords or []) if kw.lower() in tokens})[:12]
-            kw_score = len(overlap)
-
-            # Embedding-based score from pre-calculated value
-            emb = res.embedding or []
-            emb_score = cosine(q_vec, emb) if q_vec and emb else 0.0
-
-            # Combine scores
-            final_score = emb_score * 0.7 + kw_score * 0.3
-            if final_score <= 0.2:  # Increase threshold to filter out irrelevant results
-                continue
+        # Stage 2: LLM eligibility checks for the top candidates only, run concurrently
+        use_llm = bool(req.use_llm_summary and base_text)
+        verdicts: list[Optional[tuple[bool, Optional[str], Optional[str]]]] = [None] * len(candidates)
+        if use_llm:
+            candidates = candidates[: max(req.top_k, config.SUGGEST_LLM_MAX_CANDIDATES)]
+            support_plan_agent = request.app.state.support_plan_agent
+            verdicts = await asyncio.gather(
+                *[_check_eligibility(support_plan_agent, base_text, req.client, c[0]) for c in candidates]
+            )
+            used_summary = any(v is not None for v in verdicts)
 
+        # Stage 3: merge
+        for (res, final_score, overlap, kw_score, emb_score), verdict in zip(candidates, verdicts):
             reason = None
             task_suggestion = None
             is_match = True  # Default to true if LLM check is not used
-
-            if req.use_llm_summary and base_text:
-                try:
-                    support_plan_agent = request.app.state.support_plan_agent
-                    resource_context = f"名称: {res.service_name}\n概要: {res.description}\n対象者: {res.target_users}\n利用要件: {res.eligibility}"
-                    llm_response_str = support_plan_agent.summarize_for_resource_match(
-                        base_text, client=req.client, resource_context=resource_context
-                    )
-                    llm_response = json.loads(llm_response_str)
-                    is_match = llm_response.get("is_match", False)
-                    reason = llm_response.get("reason")
-                    task_suggestion = llm_response.get("task_suggestion")
-                    used_summary = True
-                    if not is_match:
-                        continue  # Skip if LLM determines it's not a match
-                except Exception as e:
-                    logger.warning(f"LLM eligibility check failed for resource {res.id}: {e}")
+            if use_llm:
+                if verdict is None:
                     # Fallback to not adding the resource if the check fails, to be safe
                     continue
+                is_match, reason, task_suggestion = verdict
+                if not is_match:
+                    continue  # Skip if LLM determines it's not a match
 
             scored.append((res.id, final_score, overlap, res, reason, task_suggestion))
 
@@ -97,7 +138,7 @@ async def suggest_resources(req: ResourceSuggestRequest, request: Request):
                         "id": res.id,
                         "name": res.service_name[:60],
                         "kw_overlap": overlap,
-                        "kw_score": kw_score,
+                        "kw_score": round(kw_score, 4),
                         "emb_score": round(emb_score, 4),
                         "final": round(final_score, 4),
                         "is_match": is_match,
@@ -113,9 +154,7 @@ async def suggest_resources(req: ResourceSuggestRequest, request: Request):
             f"[suggest_debug] candidates_considered={len(scored)} returning={len(top)} used_summary={used_summary}"
         )
         try:
-            import json as _json
-
-            logger.debug("[suggest_debug] score_components=" + _json.dumps(debug_components[:10], ensure_ascii=False))
+            logger.debug("[suggest_debug] score_components=" + json.dumps(debug_components[:10], ensure_ascii=False))
         except Exception:
             pass
     return ResourceSuggestResponse(
@@ -134,3 +173,17 @@ async def suggest_resources(req: ResourceSuggestRequest, request: Request):
         ],
         used_summary=used_summary,
     )
+
+
+@router.get("/tokenizer/stats")
+async def tokenizer_stats():
+    return {**suggest_tokenizer.stats(), "assessment_digest": assessment_digests.stats()}
+
+
+@router.get("/embedding-cache/stats")
+async def embedding_cache_stats():
+    from infra.embedding import embedding_service
+
+    if embedding_service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_service.cache.stats()}
@@ -0,0 +1,198 @@
+"""社会資源カタログのプロセス内キャッシュ。
+
+Firestore のコレクションリスナー (on_snapshot) で変更を受け取り、変換済みの `Resource` を保持する。
+ベクトル索引・全文索引はリスナーとして登録し、カタログの変更に追従する。
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Optional, Protocol
+
+from models.pydantic_models import Resource
+
+
+logger = logging.getLogger(__name__)
+
+# 後から登録されたリスナー (ベクトル索引) の再構築に必要な生データ
+_VECTOR_FIELDS = ("embedding_packed", "embedding", "embedding_model")
+
+
+class CatalogListener(Protocol):
+    def on_catalog_reset(self, entries: list[tuple[Resource, dict]]) -> None: ...
+
+    def on_catalog_upsert(self, resource: Resource, data: dict) -> None: ...
+
+    def on_catalog_remove(self, resource_id: str) -> None: ...
+
+
+class ResourceCatalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._resources: dict[str, Resource] = {}
+        self._update_times: dict[str, str] = {}
+        self._vectors: dict[str, dict] = {}
+        self._listeners: list[CatalogListener] = []
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._watch = None
+        self._etag: Optional[str] = None
+        self.version = 0
+        self.live = False
+
+    def subscribe(self, listener: CatalogListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+            if self._ready.is_set():
+                listener.on_catalog_reset(self._entries_for_reset())
+
+    # --- 起動 ---
+    def start(self, timeout: float = 60.0) -> None:
+        """リスナーを開始し、初回スナップショットを待つ。リスナーが使えない場合は一括読込のみ行う。
+
+        同時に呼ばれた場合、後続の呼び出しは先行の読込完了を待ってから戻る。
+        """
+        from ..common import resource_collection
+
+        with self._start_lock:
+            if self._ready.is_set():
+                return
+            if self._watch is None:
+                try:
+                    self._watch = resource_collection().on_snapshot(self._on_snapshot)
+                except Exception as e:
+                    logger.warning(f"resource catalog: listener unavailable, fallback to full read ({e})")
+                else:
+                    if self._ready.wait(timeout):
+                        self.live = True
+                        return
+                    logger.warning("resource catalog: initial snapshot timed out, fallback to full read")
+            # 一括読込に失敗した場合は ready にならないため、次回の呼び出しで再試行される
+            self.refresh()
+
+    def ensure_started(self) -> None:
+        if not self._ready.is_set():
+            self.start()
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"resource catalog: unsubscribe failed: {e}")
+            self._watch = None
+            self.live = False
+
+    def refresh(self) -> None:
+        """コレクション全体を読み直す（リスナー非稼働時や一括インポート後に使用）。"""
+        from ..common import resource_collection
+
+        self._reset(list(resource_collection().stream()))
+
+    # --- Firestore 変更の反映 ---
+    def _on_snapshot(self, col_snapshot, changes, read_time) -> None:
+        try:
+            if not self._ready.is_set():
+                self._reset(col_snapshot)
+                return
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    self.remove_local(doc.id)
+                else:
+                    self._apply_doc(doc)
+        except Exception as e:
+            logger.error(f"resource catalog: snapshot handling failed: {e}", exc_info=True)
+
+    def _reset(self, docs) -> None:
+        from .service import resource_doc_to_model
+
+        resources: dict[str, Resource] = {}
+        update_times: dict[str, str] = {}
+        raw: dict[str, dict] = {}
+        for d in docs:
+            try:
+                resources[d.id] = resource_doc_to_model(d)
+            except ValueError:
+                continue
+            raw[d.id] = d.to_dict() or {}
+            update_times[d.id] = str(getattr(d, "update_time", "") or "")
+        with self._lock:
+            self._resources = resources
+            self._update_times = update_times
+            self._vectors = {rid: _vector_fields(raw[rid]) for rid in resources}
+            self._bump()
+            entries = [(resources[rid], raw[rid]) for rid in resources]
+            for listener in self._listeners:
+                listener.on_catalog_reset(entries)
+            self._ready.set()
+        logger.info(f"resource catalog loaded: {len(resources)} resources (version={self.version})")
+
+    def _apply_doc(self, doc) -> None:
+        from .service import resource_doc_to_model
+
+        try:
+            model = resource_doc_to_model(doc)
+        except ValueError:
+            self.remove_local(doc.id)
+            return
+        self.upsert_local(model, doc.to_dict() or {}, update_time=str(getattr(doc, "update_time", "") or ""))
+
+    # --- ローカル書き込みの即時反映 (read-your-writes) ---
+    def upsert_local(self, resource: Resource, data: dict, update_time: Optional[str] = None) -> None:
+        with self._lock:
+            self._resources[resource.id] = resource
+            self._update_times[resource.id] = update_time or f"local:{self.version + 1}"
+            # ベクトルを含まない更新では既存のベクトルを維持する（ベクトル索引と同じ扱い）
+            if "embedding_packed" in data or "embedding" in data:
+                self._vectors[resource.id] = _vector_fields(data)
+            self._bump()
+            for listener in self._listeners:
+                listener.on_catalog_upsert(resource, data)
+
+    def remove_local(self, resource_id: str) -> None:
+        with self._lock:
+            if self._resources.pop(resource_id, None) is None:
+                return
+            self._update_times.pop(resource_id, None)
+            self._vectors.pop(resource_id, None)
+            self._bump()
+            for listener in self._listeners:
+                listener.on_catalog_remove(resource_id)
+
+    def _bump(self) -> None:
+        self.version += 1
+        self._etag = None
+
+    def _entries_for_reset(self) -> list[tuple[Resource, dict]]:
+        # 後から登録されたリスナー向け。保持しているベクトル関連フィールドのみを渡す
+        return [(r, dict(self._vectors.get(rid) or {})) for rid, r in self._resources.items()]
+
+    # --- 参照 ---
+    def get(self, resource_id: str) -> Optional[Resource]:
+        return self._resources.get(resource_id)
+
+    def list(self) -> list[Resource]:
+        with self._lock:
+            return sorted(self._resources.values(), key=lambda r: r.id)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def etag(self) -> str:
+        with self._lock:
+            if self._etag is None:
+                h = hashlib.sha1()
+                for rid in sorted(self._update_times):
+                    h.update(f"{rid}:{self._update_times[rid]}\n".encode())
+                self._etag = f'"{h.hexdigest()[:20]}"'
+            return self._etag
+
+
+def _vector_fields(data: dict) -> dict:
+    return {k: data[k] for k in _VECTOR_FIELDS if data.get(k)}
+
+
+resource_catalog = ResourceCatalog()
@@ -0,0 +1,98 @@
+"""資源の埋め込みベクトルの補完・再生成（バックフィル）。
+
+次の資源をページ単位で探し、まとめて埋め込みを生成して WriteBatch で書き戻す。
+- embedding_model が未設定（ベクトルがない、またはモデルを記録する前に生成されたもの）
+- embedding_model が現在の EMBED_MODEL と異なる
+- embedding_text_hash が現在のテキストと一致しない
+- 保存形式 (embedding_packed.dtype) が EMBED_STORAGE_DTYPE と異なる（旧形式の float 配列を含む）
+ベクトル本体は読まないため、走査は射影したフィールドのみで行う。
+"""
+
+from typing import Optional
+
+import config
+from ...common import resource_collection, run_firestore, exponential_backoff, logger
+from ..service import embedding_fields, resource_embedding_hash, resource_embedding_text
+from ..utils import aembed_texts
+from ..imports.service import commit_in_batches
+
+
+EMBEDDING_BACKFILL_JOB_KIND = "resource_embedding_backfill"
+
+_SCAN_FIELDS = [
+    "service_name",
+    "description",
+    "keywords",
+    "embedding_model",
+    "embedding_text_hash",
+    "embedding_packed.dtype",
+]
+
+
+def stale_reason(data: dict) -> Optional[str]:
+    """再埋め込みが必要なら理由 (missing / model / text / format) を返す。"""
+    model = data.get("embedding_model")
+    if not model:
+        return "missing"
+    if model != config.EMBED_MODEL:
+        return "model"
+    if data.get("embedding_text_hash") != resource_embedding_hash(data):
+        return "text"
+    if (data.get("embedding_packed") or {}).get("dtype") != config.EMBED_STORAGE_DTYPE:
+        return "format"
+    return None
+
+
+def _scan_page(after, page_size: int) -> list:
+    query = resource_collection().select(_SCAN_FIELDS).order_by("__name__").limit(page_size)
+    if after is not None:
+        query = query.start_after(after)
+    return exponential_backoff(lambda: list(query.stream()), max_attempts=3)
+
+
+async def run_embedding_backfill(payload: dict, progress=None) -> dict:
+    """ジョブハンドラ。dry_run=true では対象件数の集計のみ行う。"""
+    dry_run = bool(payload.get("dry_run"))
+    page_size = max(1, config.EMBED_BACKFILL_PAGE_SIZE)
+    counts = {
+        "model": config.EMBED_MODEL,
+        "scanned": 0,
+        "stale": {"missing": 0, "model": 0, "text": 0, "format": 0},
+        "embedded": 0,
+        "embed_failed": 0,
+        "write_failed": 0,
+        "errors": [],
+        "dry_run": dry_run,
+    }
+    after = None
+    while True:
+        docs = await run_firestore(_scan_page, after, page_size)
+        if not docs:
+            break
+        after = docs[-1]
+        counts["scanned"] += len(docs)
+        targets = []
+        for doc in docs:
+            data = doc.to_dict() or {}
+            reason = stale_reason(data)
+            if reason:
+                counts["stale"][reason] += 1
+                targets.append((doc.id, data))
+        if targets and not dry_run:
+            vectors = await aembed_texts([resource_embedding_text(data) for _, data in targets])
+            items = [
+                (doc_id, data.get("service_name") or doc_id, embedding_fields(data, vec, drop_legacy=True))
+                for (doc_id, data), vec in zip(targets, vectors)
+                if vec
+            ]
+            counts["embed_failed"] += len(targets) - len(items)
+            failed, errors = await run_firestore(commit_in_batches, items, None, True)
+            counts["embedded"] += len(items) - len(failed)
+            counts["write_failed"] += len(failed)
+            counts["errors"] = (counts["errors"] + errors)[:50]
+        if progress:
+            progress({k: v for k, v in counts.items() if k != "errors"})
+        if len(docs) < page_size:
+            break
+    logger.info(f"embedding backfill: {counts}")
+    return counts
@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+from fastapi import APIRouter
+
+import config
+from infra.job_queue import job_queue
+from .backfill import EMBEDDING_BACKFILL_JOB_KIND
+from ..vector_index import resource_vector_index
+
+
+router = APIRouter(prefix="/resources/embeddings", tags=["resources"])
+
+
+def enqueue_embedding_backfill(dry_run: bool = False, force: bool = False) -> dict:
+    """バックフィルジョブを投入する。force=False では同じモデルで投入済みのジョブがあればそれを返す。"""
+    return job_queue.enqueue(
+        EMBEDDING_BACKFILL_JOB_KIND,
+        subject=config.EMBED_MODEL,
+        version=int(time.time()) if force else 0,
+        payload={"dry_run": dry_run},
+    )
+
+
+@router.post("/backfill")
+async def backfill_embeddings(dry_run: bool = False):
+    """ベクトル未生成・モデル変更・テキスト変更のある資源を再埋め込みするジョブを投入する。
+
+    dry_run=true では対象件数の集計のみ行う。進捗は GET /jobs/{id} で確認できる。
+    """
+    return await asyncio.to_thread(enqueue_embedding_backfill, dry_run=dry_run, force=True)
+
+
+@router.get("/status")
+async def embedding_status():
+    """プロセス内インデックスのベクトル保持状況と、直近のバックフィルジョブ。"""
+    jobs = await asyncio.to_thread(job_queue.list, kind=EMBEDDING_BACKFILL_JOB_KIND, limit=5)
+    return {"model": config.EMBED_MODEL, "index": resource_vector_index.coverage(), "jobs": jobs}
@@ -0,0 +1,159 @@
+"""URL の一括取得と資源情報抽出。
+
+- 取得は共有 HTTP クライアント上でホストごとの同時接続数を制限して行う
+- 同時に処理する URL は concurrency 件までとし、残りはタスクを作らずに待たせる
+- 抽出 LLM は extraction_limiter の枠内で実行する
+- 入力 URL・リダイレクト後の最終 URL・抽出テキストのハッシュで重複を除外する（同時に処理中の別名 URL は先行の結果を待つ）
+"""
+
+import asyncio
+import hashlib
+import xml.etree.ElementTree as ET
+from itertools import islice
+from typing import AsyncIterator, Optional
+from urllib.parse import urldefrag
+
+import config
+from agents.resource_extraction_agent import extract_resource_from_text
+from infra.document_fetch import fetch_bytes, fetch_document
+from infra.http_pool import extraction_http
+from ...common import logger
+
+
+SITEMAP_MAX_BYTES = 10 * 1024 * 1024
+
+
+def normalize_url(url: str) -> str:
+    return urldefrag((url or "").strip())[0]
+
+
+def _sitemap_locs(data: bytes) -> tuple[list[str], list[str]]:
+    """(ページURL, 子サイトマップURL) を返す。"""
+    root = ET.fromstring(data)
+    pages: list[str] = []
+    children: list[str] = []
+    for el in root.iter():
+        if not el.tag.endswith("loc") or not el.text:
+            continue
+        # sitemapindex 配下の loc は子サイトマップ
+        (children if root.tag.endswith("sitemapindex") else pages).append(el.text.strip())
+    return pages, children
+
+
+async def expand_sitemap(sitemap_url: str, limit: int) -> list[str]:
+    """サイトマップ（sitemapindex は1階層まで展開）からページ URL を最大 limit 件返す。"""
+    client = extraction_http.client
+    data, _, _, _ = await fetch_bytes(client, sitemap_url, SITEMAP_MAX_BYTES, allow_truncate=False)
+    pages, children = _sitemap_locs(data)
+    for child in children:
+        if len(pages) >= limit:
+            break
+        try:
+            data, _, _, _ = await fetch_bytes(client, child, SITEMAP_MAX_BYTES, allow_truncate=False)
+            pages.extend(_sitemap_locs(data)[0])
+        except Exception as e:
+            logger.warning(f"sitemap fetch failed: {child}: {e}")
+    return pages[:limit]
+
+
+class BatchExtraction:
+    def __init__(self, concurrency: int = config.EXTRACT_BATCH_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        # 最終 URL / 本文ハッシュ -> 処理中または処理済みの URL（失敗時は None で解決して登録を外す）
+        self._final_urls: dict[str, asyncio.Future] = {}
+        self._content_hashes: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    async def _claim(registry: dict[str, asyncio.Future], key: str) -> tuple[Optional[str], Optional[asyncio.Future]]:
+        """key を処理中として登録する。同じ key を先に処理した URL があれば (その URL, None) を返す。
+
+        先行の処理が終わっていなければ完了を待ち、失敗した場合は改めて自分が登録する。
+        """
+        while key in registry:
+            owner = await asyncio.shield(registry[key])
+            if owner is not None:
+                return owner, None
+        fut = asyncio.get_running_loop().create_future()
+        registry[key] = fut
+        return None, fut
+
+    @staticmethod
+    def _release(registry: dict[str, asyncio.Future], key: str, fut: asyncio.Future, owner: Optional[str]) -> None:
+        """待機中の別名 URL に結果を伝える。失敗時は登録を外し、別名 URL に改めて処理させる。"""
+        if owner is None and registry.get(key) is fut:
+            del registry[key]
+        if not fut.done():
+            fut.set_result(owner)
+
+    async def _process(self, url: str) -> dict:
+        try:
+            async with extraction_http.host_limit(url):
+                doc = await fetch_document(url)
+        except Exception as e:
+            return {"url": url, "status": "error", "stage": "fetch", "error": str(e)}
+        final_url = normalize_url(doc.url)
+        duplicate_of, url_claim = await self._claim(self._final_urls, final_url)
+        if duplicate_of is not None:
+            return {"url": url, "final_url": final_url, "status": "duplicate", "duplicate_of": duplicate_of}
+        # LLM 抽出の完了前から登録しておき、同時に処理中の別名 URL はその結果を待つ
+        claims = [(self._final_urls, final_url, url_claim)]
+        owner: Optional[str] = None
+        try:
+            if not doc.text.strip():
+                return {
+                    "url": url,
+                    "final_url": final_url,
+                    "status": "error",
+                    "stage": "parse",
+                    "error": "本文が空です",
+                }
+            content_hash = hashlib.sha256(doc.text.encode("utf-8")).hexdigest()
+            duplicate_of, hash_claim = await self._claim(self._content_hashes, content_hash)
+            if duplicate_of is not None:
+                owner = duplicate_of
+                return {"url": url, "final_url": final_url, "status": "duplicate", "duplicate_of": duplicate_of}
+            claims.append((self._content_hashes, content_hash, hash_claim))
+            try:
+                resource = await extract_resource_from_text(doc.text, final_url)
+            except asyncio.TimeoutError:
+                return {"url": url, "final_url": final_url, "status": "error", "stage": "extract", "error": "timeout"}
+            except Exception as e:
+                return {"url": url, "final_url": final_url, "status": "error", "stage": "extract", "error": str(e)}
+            owner = url
+            return {
+                "url": url,
+                "final_url": final_url,
+                "status": "ok",
+                "content_hash": content_hash,
+                "truncated": doc.truncated,
+                "resource": resource.dict(),
+            }
+        finally:
+            for registry, key, fut in claims:
+                self._release(registry, key, fut, owner)
+
+    async def run(self, urls: list[str], max_urls: Optional[int] = None) -> AsyncIterator[dict]:
+        """完了した順に URL ごとの結果を返す。呼び出し側が途中で閉じた場合は残りのタスクをキャンセルする。"""
+        seen: set[str] = set()
+        unique: list[str] = []
+        for u in urls:
+            n = normalize_url(u)
+            if n and n not in seen:
+                seen.add(n)
+                unique.append(n)
+        if max_urls is not None:
+            unique = unique[:max_urls]
+        pending = iter(unique)
+        running: set[asyncio.Task] = set()
+        try:
+            while True:
+                for u in islice(pending, self.concurrency - len(running)):
+                    running.add(asyncio.create_task(self._process(u)))
+                if not running:
+                    break
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    yield t.result()
+        finally:
+            for t in running:
+                t.cancel()
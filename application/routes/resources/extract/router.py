@@ -0,0 +1,58 @@
+import json
+import time
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+import config
+from .crawler import BatchExtraction, expand_sitemap
+from ...common import logger
+
+
+router = APIRouter(prefix="/resources", tags=["resources"])
+
+
+class BatchExtractRequest(BaseModel):
+    urls: List[str] = Field(default_factory=list, description="抽出対象の URL 一覧")
+    sitemap_url: Optional[str] = Field(None, description="サイトマップ XML の URL（urls に追加される）")
+    max_urls: int = Field(200, ge=1, description="処理する URL 数の上限")
+    format: Literal["ndjson", "sse"] = "ndjson"
+
+
+@router.post("/extract-batch")
+async def extract_batch(req: BatchExtractRequest):
+    """複数 URL から社会資源情報を並行して抽出し、URL ごとの結果を完了順にストリーミングで返す。
+
+    各行（SSE の場合は各イベント）は {"url", "final_url", "status": ok|duplicate|error, "resource" | "error"}。
+    最後に {"summary": {...}} を返す。
+    """
+    max_urls = min(req.max_urls, config.EXTRACT_BATCH_MAX_URLS)
+    urls = list(req.urls)
+    if req.sitemap_url:
+        try:
+            urls.extend(await expand_sitemap(req.sitemap_url, max_urls))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"サイトマップの取得/解析に失敗しました: {e}")
+    if not urls:
+        raise HTTPException(status_code=400, detail="urls または sitemap_url を指定してください")
+
+    def encode(item: dict) -> str:
+        data = json.dumps(item, ensure_ascii=False, default=str)
+        return f"data: {data}\n\n" if req.format == "sse" else data + "\n"
+
+    async def stream():
+        started = time.perf_counter()
+        counts = {"ok": 0, "duplicate": 0, "error": 0}
+        async for result in BatchExtraction().run(urls, max_urls):
+            counts[result["status"]] += 1
+            yield encode(result)
+        summary = {**counts, "elapsed_sec": round(time.perf_counter() - started, 2)}
+        logger.info(f"extract-batch finished: {summary}")
+        yield encode({"summary": summary})
+        if req.format == "sse":
+            yield "event: done\ndata: [DONE]\n\n"
+
+    media_type = "text/event-stream" if req.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
@@ -0,0 +1,150 @@
+"""資源ファイルの逐次読み込み（JSON 配列 / JSON Lines / CSV）。
+
+ファイル全体を読み込まず1件ずつ返すため、県全体の資源一覧でもメモリ使用量は一定に収まる。
+ファイルの形式の誤りは ResourceFileFormatError で通知する。
+"""
+
+import csv
+import json
+import re
+from typing import IO, Iterator
+
+
+READ_CHUNK_CHARS = 64 * 1024
+SUPPORTED_EXTENSIONS = (".json", ".jsonl", ".ndjson", ".csv")
+# 数値の後ろにこれだけが続く場合は、数値がバッファ境界で切れている可能性がある
+_NUMBER_TAIL_RE = re.compile(r"[0-9.eE+\-]*")
+
+_CONTACT_COLUMNS = {
+    "contact_phone": "phone",
+    "contact_fax": "fax",
+    "contact_email": "email",
+    "contact_url": "url",
+}
+
+
+class ResourceFileFormatError(ValueError):
+    pass
+
+
+def iter_json_array(f: IO[str], chunk_chars: int = READ_CHUNK_CHARS) -> Iterator:
+    """トップレベル配列の要素を1つずつ返す。"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+    expect_comma = False
+
+    def fill() -> None:
+        nonlocal buf, pos, eof
+        data = f.read(chunk_chars)
+        if not data:
+            eof = True
+        buf = buf[pos:] + data
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ResourceFileFormatError("JSON 配列が途中で終わっています")
+            fill()
+            continue
+        ch = buf[pos]
+        if not started:
+            if ch != "[":
+                raise ResourceFileFormatError("トップレベルが配列ではありません")
+            started = True
+            pos += 1
+            continue
+        if ch == "]":
+            return
+        if expect_comma:
+            if ch != ",":
+                raise ResourceFileFormatError(f"JSON 配列の区切りが不正です: {buf[pos : pos + 20]!r}")
+            expect_comma = False
+            pos += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ResourceFileFormatError(f"JSON 解析失敗: {e}")
+            # 要素がバッファ境界をまたいでいる
+            fill()
+            continue
+        if (
+            not eof
+            and isinstance(item, (int, float))
+            and not isinstance(item, bool)
+            and _NUMBER_TAIL_RE.fullmatch(buf, end)
+        ):
+            # 数値はバッファ境界で切れている可能性がある（"1.5" が "1." で切れると 1 と解析される）ため、
+            # 区切り文字が現れるまで読み足してから確定する
+            fill()
+            continue
+        pos = end
+        expect_comma = True
+        yield item
+
+
+def iter_json_lines(f: IO[str]) -> Iterator:
+    for lineno, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ResourceFileFormatError(f"{lineno}行目の JSON 解析失敗: {e}")
+
+
+def csv_row_to_entry(row: dict) -> dict:
+    """CSV の1行を JSON と同じ形（contact_info 入れ子・keywords 配列）にする。"""
+    entry: dict = {}
+    contact: dict = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = key.strip()
+        value = (value or "").strip()
+        if not value:
+            continue
+        if key in _CONTACT_COLUMNS:
+            contact[_CONTACT_COLUMNS[key]] = value
+        elif key.startswith("contact_info."):
+            contact[key.split(".", 1)[1]] = value
+        elif key == "keywords":
+            entry["keywords"] = [k for k in re.split(r"[,、|;\s]+", value) if k]
+        else:
+            entry[key] = value
+    if contact:
+        entry["contact_info"] = contact
+    return entry
+
+
+def iter_csv(f: IO[str]) -> Iterator[dict]:
+    reader = csv.DictReader(f)
+    try:
+        for row in reader:
+            yield csv_row_to_entry(row)
+    except csv.Error as e:
+        raise ResourceFileFormatError(f"{reader.line_num}行目の CSV 解析失敗: {e}")
+
+
+def iter_resource_records(path: str) -> Iterator:
+    """拡張子に応じて1件ずつ返す。"""
+    lower = path.lower()
+    # Excel 出力の CSV は BOM 付きのことが多い
+    with open(path, "r", encoding="utf-8-sig", newline="" if lower.endswith(".csv") else None) as f:
+        try:
+            if lower.endswith(".csv"):
+                yield from iter_csv(f)
+            elif lower.endswith((".jsonl", ".ndjson")):
+                yield from iter_json_lines(f)
+            else:
+                yield from iter_json_array(f)
+        except UnicodeDecodeError as e:
+            raise ResourceFileFormatError(f"UTF-8 として読み込めません: {e}")
@@ -1,11 +1,14 @@
-import hashlib
-import json
+import asyncio
 import os
+import time
 from fastapi import APIRouter, HTTPException
 from google.api_core.exceptions import NotFound as FirestoreNotFound, FailedPrecondition, PermissionDenied
 
-from ...common import resource_collection
-from ..service import normalize_resource_input
+from infra.job_queue import job_queue
+from ...common import run_firestore, logger
+from ..catalog import resource_catalog
+from .reader import SUPPORTED_EXTENSIONS, ResourceFileFormatError, iter_resource_records
+from .service import import_checkpoints, import_resources
 
 
 router = APIRouter(prefix="/resources", tags=["resources"])
@@ -15,110 +18,93 @@ def _candidate_local_resource_paths():
     from pathlib import Path
 
     root = Path(__file__).resolve().parents[4]  # up to application/
-    return [
-        str(root / "data" / "local_resources.json"),
-        str(root.parent / "application" / "data" / "local_resources.json"),
-        str(root.parent / "data" / "local_resources.json"),
-    ]
+    dirs = [root / "data", root.parent / "application" / "data", root.parent / "data"]
+    return [str(d / f"local_resources{ext}") for d in dirs for ext in SUPPORTED_EXTENSIONS]
 
 
-def _load_local_resources_file():
+def _find_local_resources_file() -> str:
     for p in _candidate_local_resource_paths():
         if os.path.exists(p):
-            try:
-                with open(p, "r", encoding="utf-8") as f:
-                    return json.load(f), p
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"ローカル資源ファイル読込失敗: {p}: {e}")
-    raise HTTPException(status_code=404, detail="local_resources.json が見つかりませんでした")
+            return p
+    raise HTTPException(
+        status_code=404,
+        detail=f"local_resources ({' / '.join(SUPPORTED_EXTENSIONS)}) が見つかりませんでした",
+    )
+
+
+def _checkpoint_key(path: str, overwrite: bool) -> str:
+    """ファイルが変わったら別の取り込みとして最初から処理する。"""
+    st = os.stat(path)
+    return f"{path}:{st.st_size}:{st.st_mtime_ns}:overwrite={overwrite}"
+
+
+RESOURCE_IMPORT_JOB_KIND = "resource_import"
+
+
+def _refresh_catalog_after_import(result: dict) -> None:
+    if (result["created"] or result["updated"]) and not result["dry_run"] and not resource_catalog.live:
+        # リスナー稼働中は on_snapshot で反映されるため、非稼働時のみ読み直す
+        try:
+            resource_catalog.refresh()
+        except Exception as e:
+            logger.warning(f"resource catalog refresh after import failed: {e}")
+
+
+async def run_resource_import_job(payload: dict, progress=None) -> dict:
+    """ジョブハンドラ。処理済み件数は progress で GET /jobs/{id} に記録する。
+
+    プロセスが落ちても再起動後に再実行され、チェックポイントから続きを処理する。
+    """
+    path = _find_local_resources_file()
+    overwrite = payload.get("overwrite", False)
+    result = await import_resources(
+        iter_resource_records(path),
+        overwrite=overwrite,
+        dry_run=payload.get("dry_run", False),
+        progress=progress,
+        checkpoint_key=_checkpoint_key(path, overwrite),
+    )
+    await run_firestore(_refresh_catalog_after_import, result)
+    return {"source_path": path, **result}
 
 
 @router.post("/import-local")
-async def import_local_resources(overwrite: bool = False, dry_run: bool = False):
-    data, path = _load_local_resources_file()
-    if not isinstance(data, list):
-        raise HTTPException(status_code=400, detail="local_resources.json のトップレベルが配列ではありません")
-    created = 0
-    updated = 0
-    skipped = 0
-    batch_errors = []
-    skipped_invalid_service_name = 0
-
-    track_fields = [
-        "category",
-        "target_users",
-        "description",
-        "eligibility",
-        "application_process",
-        "cost",
-        "provider",
-        "location",
-        "contact_phone",
-        "contact_fax",
-        "contact_email",
-        "contact_url",
-    ]
-    missing_field_counts = {f: 0 for f in track_fields}
+async def import_local_resources(
+    overwrite: bool = False, dry_run: bool = False, background: bool = False, restart: bool = False
+):
+    """local_resources (.json / .jsonl / .csv) を一括登録する。
+
+    前回の取り込みが途中で止まっていれば続きから再開する（restart=true で最初から）。
+    background=true ではジョブとして投入し、ジョブ情報を返す。
+    """
+    path = _find_local_resources_file()
+    checkpoint_key = _checkpoint_key(path, overwrite)
+    if restart:
+        await asyncio.to_thread(import_checkpoints.delete, checkpoint_key)
+    if background:
+        return await asyncio.to_thread(
+            job_queue.enqueue,
+            RESOURCE_IMPORT_JOB_KIND,
+            subject="local_resources",
+            version=int(time.time()),
+            payload={"overwrite": overwrite, "dry_run": dry_run},
+        )
     try:
-        for entry in data:
-            if not isinstance(entry, dict):
-                batch_errors.append("非オブジェクト要素をスキップ")
-                continue
-            name = (entry.get("service_name") or "").strip()
-            if not name:
-                batch_errors.append("service_name 欠落要素をスキップ")
-                skipped_invalid_service_name += 1
-                continue
-            doc_id = hashlib.md5(name.lower().encode()).hexdigest()
-            doc_ref = resource_collection().document(doc_id)
-            try:
-                exists = doc_ref.get().exists
-            except FirestoreNotFound:
-                raise HTTPException(
-                    status_code=503,
-                    detail=(
-                        "Firestore データベースが未作成です。コンソールで 'Firestore データベースを作成' を実行し Native モードを選択してください。"
-                    ),
-                )
-            norm = normalize_resource_input(entry)
-            for f in track_fields:
-                v = norm.get(f)
-                if v is None or (isinstance(v, str) and v.strip() == ""):
-                    missing_field_counts[f] += 1
-            try:
-                if exists and not overwrite:
-                    skipped += 1
-                    continue
-                if exists and overwrite:
-                    if not dry_run:
-                        doc_ref.set(norm, merge=False)
-                    updated += 1
-                else:
-                    if not dry_run:
-                        doc_ref.set(norm)
-                    created += 1
-            except (FailedPrecondition, PermissionDenied) as e:
-                raise HTTPException(status_code=403, detail=f"Firestore 権限/状態エラー: {e}")
-            except Exception as e:
-                batch_errors.append(f"{name}: {e}")
-    except HTTPException:
-        raise
+        result = await import_resources(
+            iter_resource_records(path), overwrite=overwrite, dry_run=dry_run, checkpoint_key=checkpoint_key
+        )
+    except ResourceFileFormatError as e:
+        raise HTTPException(status_code=400, detail=f"ローカル資源ファイルの形式エラー: {path}: {e}")
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"ローカル資源ファイル読込失敗: {path}: {e}")
     except FirestoreNotFound:
         raise HTTPException(
             status_code=503,
             detail="Firestore データベース (default) が存在しません。Cloud Console で作成後に再実行してください。",
         )
+    except (FailedPrecondition, PermissionDenied) as e:
+        raise HTTPException(status_code=403, detail=f"Firestore 権限/状態エラー: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"インポート中に想定外エラー: {e}")
-    return {
-        "source_path": path,
-        "total_input": len(data),
-        "created": created,
-        "updated": updated,
-        "skipped": skipped,
-        "errors": batch_errors,
-        "overwrite": overwrite,
-        "dry_run": dry_run,
-        "missing_field_counts": missing_field_counts,
-        "skipped_invalid_service_name": skipped_invalid_service_name,
-    }
+    await run_firestore(_refresh_catalog_after_import, result)
+    return {"source_path": path, **result}
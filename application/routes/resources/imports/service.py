@@ -0,0 +1,225 @@
+"""ローカル資源ファイルの一括インポート。
+
+1件ずつ get/set すると数千件で数千往復になるため、
+- 既存ドキュメントの有無は db.get_all でまとめて確認する
+- 埋め込みは書き込み対象だけをまとめて生成する（embedding_service がバッチ化・並列化する）
+- 書き込みは WriteBatch で最大 500 操作ずつ commit する
+- 入力はイテレータで受け取り IMPORT_CHUNK_SIZE 件ずつ処理する。チャンク完了ごとにチェックポイントを保存し、
+  中断後の再実行ではその位置から再開する
+"""
+
+import asyncio
+import hashlib
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from google.api_core.exceptions import NotFound as FirestoreNotFound, FailedPrecondition, PermissionDenied
+
+import config
+from ...common import db, resource_collection, run_firestore, exponential_backoff, logger
+from ..service import embedding_fields, normalize_resource_input, resource_embedding_text
+from ..utils import aembed_texts
+from utils.ttl_cache import TTLCache
+
+
+ProgressCallback = Callable[[dict], None]
+
+import_checkpoints = TTLCache(
+    ttl=config.IMPORT_CHECKPOINT_TTL,
+    max_items=100,
+    path=config.IMPORT_CHECKPOINT_PATH or None,
+    namespace="resource_import",
+)
+
+TRACK_FIELDS = [
+    "category",
+    "target_users",
+    "description",
+    "eligibility",
+    "application_process",
+    "cost",
+    "provider",
+    "location",
+    "contact_phone",
+    "contact_fax",
+    "contact_email",
+    "contact_url",
+]
+
+
+def resource_doc_id(service_name: str) -> str:
+    return hashlib.md5(service_name.strip().lower().encode()).hexdigest()
+
+
+def prepare_entries(data: list, overwrite: bool) -> dict:
+    """入力を検証・正規化し、(doc_id, service_name, 正規化済みデータ) の一覧にする。
+
+    同じ service_name が複数ある場合、overwrite 時は後の要素、それ以外は最初の要素を使う。
+    """
+    entries: dict[str, tuple[str, str, dict]] = {}
+    errors: list[str] = []
+    skipped_invalid_service_name = 0
+    duplicates = 0
+    missing_field_counts = {f: 0 for f in TRACK_FIELDS}
+    for entry in data:
+        if not isinstance(entry, dict):
+            errors.append("非オブジェクト要素をスキップ")
+            continue
+        name = (entry.get("service_name") or "").strip()
+        if not name:
+            errors.append("service_name 欠落要素をスキップ")
+            skipped_invalid_service_name += 1
+            continue
+        norm = normalize_resource_input(entry)
+        for f in TRACK_FIELDS:
+            v = norm.get(f)
+            if v is None or (isinstance(v, str) and v.strip() == ""):
+                missing_field_counts[f] += 1
+        doc_id = resource_doc_id(name)
+        if doc_id in entries:
+            duplicates += 1
+            if not overwrite:
+                continue
+        entries[doc_id] = (doc_id, name, norm)
+    return {
+        "entries": list(entries.values()),
+        "errors": errors,
+        "duplicates": duplicates,
+        "skipped_invalid_service_name": skipped_invalid_service_name,
+        "missing_field_counts": missing_field_counts,
+    }
+
+
+def existing_doc_ids(doc_ids: list[str], chunk_size: Optional[int] = None) -> set[str]:
+    """db.get_all でまとめて存在確認する（本文は service_name のみ取得）。"""
+    chunk_size = max(1, chunk_size or config.IMPORT_LOOKUP_CHUNK_SIZE)
+    col = resource_collection()
+    found: set[str] = set()
+    for i in range(0, len(doc_ids), chunk_size):
+        refs = [col.document(d) for d in doc_ids[i : i + chunk_size]]
+        snapshots = exponential_backoff(lambda: list(db.get_all(refs, field_paths=["service_name"])), max_attempts=3)
+        found.update(s.id for s in snapshots if s.exists)
+    return found
+
+
+def commit_in_batches(
+    items: list[tuple[str, str, dict]], batch_size: Optional[int] = None, merge: bool = False
+) -> tuple[set[str], list[str]]:
+    """WriteBatch で書き込む。(失敗した doc_id, エラーメッセージ) を返す。merge=True では指定フィールドのみ更新する。
+
+    DB 未作成・権限エラーは以降のバッチも失敗するため、そのまま送出する。
+    """
+    batch_size = min(500, max(1, batch_size or config.IMPORT_WRITE_BATCH_SIZE))
+    col = resource_collection()
+    failed: set[str] = set()
+    errors: list[str] = []
+    for i in range(0, len(items), batch_size):
+        chunk = items[i : i + batch_size]
+        batch = db.batch()
+        for doc_id, _name, data in chunk:
+            batch.set(col.document(doc_id), data, merge=merge)
+        try:
+            exponential_backoff(batch.commit, max_attempts=3)
+        except (FirestoreNotFound, FailedPrecondition, PermissionDenied):
+            raise
+        except Exception as e:
+            failed.update(doc_id for doc_id, _, _ in chunk)
+            errors.append(f"{chunk[0][1]} 〜 {chunk[-1][1]} ({len(chunk)}件): {e}")
+            logger.warning(f"resource import batch {i // batch_size} failed: {e}")
+    return failed, errors
+
+
+async def _import_chunk(records: list, overwrite: bool, dry_run: bool) -> dict:
+    prepared = prepare_entries(records, overwrite)
+    entries = prepared["entries"]
+    errors = prepared["errors"]
+    existing = await run_firestore(existing_doc_ids, [e[0] for e in entries]) if entries else set()
+
+    to_write = [e for e in entries if overwrite or e[0] not in existing]
+    failed: set[str] = set()
+    if to_write and not dry_run:
+        vectors = await aembed_texts([resource_embedding_text(norm) for _, _, norm in to_write])
+        for (_, _, norm), vec in zip(to_write, vectors):
+            if vec:
+                norm.update(embedding_fields(norm, vec))
+        failed, write_errors = await run_firestore(commit_in_batches, to_write)
+        errors.extend(write_errors)
+
+    written = [e[0] for e in to_write if e[0] not in failed]
+    return {
+        "created": sum(1 for d in written if d not in existing),
+        "updated": sum(1 for d in written if d in existing),
+        "skipped": len(entries) - len(to_write) + (0 if overwrite else prepared["duplicates"]),
+        "errors": errors,
+        "skipped_invalid_service_name": prepared["skipped_invalid_service_name"],
+        "missing_field_counts": prepared["missing_field_counts"],
+    }
+
+
+def _take(iterator: Iterator, n: int) -> list:
+    return list(islice(iterator, n))
+
+
+async def import_resources(
+    records: Iterable,
+    overwrite: bool = False,
+    dry_run: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    checkpoint_key: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """資源データを Firestore へチャンク単位で登録し、件数の集計を返す。
+
+    checkpoint_key を指定すると、チャンク完了ごとに処理済み件数と集計を保存し、
+    同じキーで再実行したときは続きから処理する（dry_run では保存しない）。
+    """
+    chunk_size = max(1, chunk_size or config.IMPORT_CHUNK_SIZE)
+    use_checkpoint = bool(checkpoint_key) and not dry_run
+    saved = import_checkpoints.get(checkpoint_key) if use_checkpoint else None
+    offset = saved["offset"] if saved else 0
+    totals = (
+        saved["totals"]
+        if saved
+        else {
+            "total_input": 0,
+            "created": 0,
+            "updated": 0,
+            "skipped": 0,
+            "errors": [],
+            "skipped_invalid_service_name": 0,
+            "missing_field_counts": {f: 0 for f in TRACK_FIELDS},
+        }
+    )
+    if offset:
+        logger.info(f"resource import: resuming {checkpoint_key} from record {offset}")
+
+    iterator = iter(records)
+    # 処理済みの件数分を読み飛ばす（ファイルの読み込みはスレッドで行う）
+    skipped_records = 0
+    while skipped_records < offset:
+        n = len(await asyncio.to_thread(_take, iterator, min(chunk_size, offset - skipped_records)))
+        if n == 0:
+            break
+        skipped_records += n
+
+    while True:
+        chunk = await asyncio.to_thread(_take, iterator, chunk_size)
+        if not chunk:
+            break
+        counts = await _import_chunk(chunk, overwrite, dry_run)
+        offset += len(chunk)
+        totals["total_input"] += len(chunk)
+        for key in ("created", "updated", "skipped", "skipped_invalid_service_name"):
+            totals[key] += counts[key]
+        for f, c in counts["missing_field_counts"].items():
+            totals["missing_field_counts"][f] += c
+        # エラーは件数が膨らみうるため先頭の一部のみ保持する
+        totals["errors"] = (totals["errors"] + counts["errors"])[:200]
+        if use_checkpoint:
+            import_checkpoints.put(checkpoint_key, {"offset": offset, "totals": totals})
+        if progress:
+            progress({"processed": offset, **{k: totals[k] for k in ("created", "updated", "skipped")}})
+
+    if use_checkpoint:
+        import_checkpoints.delete(checkpoint_key)
+    return {**totals, "overwrite": overwrite, "dry_run": dry_run, "resumed_from": saved["offset"] if saved else 0}
@@ -0,0 +1,136 @@
+"""社会資源のキーワードを語彙（列番号）に変換して保持するプロセス内インデックス。
+
+資源カタログ (catalog.py) のリスナーとして登録され、資源の作成/更新/削除に追従する。
+資源ごとのキーワードを (行=資源, 列=語彙) の疎行列（COO 形式の行・列配列）として持ち、
+クエリのトークン集合をビットマップにして全資源のキーワードスコアを一度の重み付き bincount で求める。
+
+キーワードの重みは 文字数の係数 × IDF。n-gram 照合では2文字の語がどこにでも一致するため、
+短いキーワードや多くの資源が持つキーワードが1つ一致しただけでは候補に残らないようにする。
+SUGGEST_NGRAM_MAX より長いキーワードは照合語に現れないため、正規化済みテキストへの部分一致で照合する。
+"""
+
+import threading
+from typing import Iterable
+
+import numpy as np
+
+import config
+from models.pydantic_models import Resource
+from .catalog import resource_catalog
+from .tokenizer import normalize_text
+
+
+def _keyword_terms(resource: Resource) -> list[str]:
+    # トークナイザと同じ正規化 (NFKC + 小文字) で照合する
+    return list(dict.fromkeys(normalize_text(kw) for kw in (resource.keywords or []) if isinstance(kw, str) and kw))
+
+
+class ResourceKeywordIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._resources: dict[str, Resource] = {}
+        self._columns: dict[str, np.ndarray] = {}
+        self._vocab: dict[str, int] = {}
+        # 照会用のスナップショット。更新後の最初の照会で作り直す
+        self._ids: list[str] = []
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._cols = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._long_terms: list[tuple[str, int]] = []
+        self._dirty = True
+
+    def _encode(self, resource: Resource) -> np.ndarray:
+        cols = [self._vocab.setdefault(term, len(self._vocab)) for term in _keyword_terms(resource)]
+        return np.asarray(cols, dtype=np.int32)
+
+    # --- カタログからの変更通知 ---
+    def on_catalog_reset(self, entries: list[tuple[Resource, dict]]) -> None:
+        with self._lock:
+            self._vocab = {}
+            self._resources = {}
+            self._columns = {}
+            for resource, _data in entries:
+                self._resources[resource.id] = resource
+                self._columns[resource.id] = self._encode(resource)
+            self._dirty = True
+
+    def on_catalog_upsert(self, resource: Resource, data: dict) -> None:
+        with self._lock:
+            self._resources[resource.id] = resource
+            self._columns[resource.id] = self._encode(resource)
+            self._dirty = True
+
+    def on_catalog_remove(self, resource_id: str) -> None:
+        with self._lock:
+            if self._resources.pop(resource_id, None) is not None:
+                self._columns.pop(resource_id, None)
+                self._dirty = True
+
+    def _rebuild(self) -> None:
+        ids = list(self._resources)
+        lengths = [len(self._columns[rid]) for rid in ids]
+        self._rows = np.repeat(np.arange(len(ids), dtype=np.int32), lengths)
+        self._cols = (
+            np.concatenate([self._columns[rid] for rid in ids]) if ids else np.zeros(0, dtype=np.int32)
+        ).astype(np.int32, copy=False)
+        self._ids = ids
+        self._weights, self._long_terms = self._term_weights(len(ids))
+        self._dirty = False
+
+    def _term_weights(self, n_resources: int) -> tuple[np.ndarray, list[tuple[str, int]]]:
+        """語彙ごとの重み（文字数の係数 × 正規化 IDF）と、部分一致で照合する長いキーワードを求める。"""
+        terms = [""] * len(self._vocab)
+        for term, col in self._vocab.items():
+            terms[col] = term
+        df = np.bincount(self._cols, minlength=len(terms))
+        idf = np.log1p(n_resources / np.maximum(df, 1)) / np.log1p(max(n_resources, 1))
+        lengths = np.fromiter((len(t) for t in terms), dtype=np.float32, count=len(terms))
+        length_factor = np.minimum(lengths / max(1, config.SUGGEST_KEYWORD_FULL_LENGTH), 1.0)
+        # 削除済み資源のみが持っていた語彙 (df=0) は照合しない
+        long_terms = [(t, c) for c, t in enumerate(terms) if self._is_long(t) and df[c]]
+        return (length_factor * idf).astype(np.float32), long_terms
+
+    def _is_long(self, term: str) -> bool:
+        return len(term) > config.SUGGEST_NGRAM_MAX
+
+    # --- 参照 ---
+    def match_scores(self, tokens: Iterable[str], text: str = "") -> tuple[list[str], np.ndarray]:
+        """(資源ID一覧, 各資源のキーワードスコア) を返す。スコアは一致したキーワードの重みの合計。
+
+        text は正規化済みの全文で、SUGGEST_NGRAM_MAX より長いキーワードの部分一致に使う。
+        """
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            ids, rows, cols, weights = self._ids, self._rows, self._cols, self._weights
+            query = np.zeros(len(self._vocab), dtype=bool)
+            hit_cols = [self._vocab[t] for t in set(tokens) if t in self._vocab]
+            long_terms = self._long_terms
+        if text:
+            hit_cols.extend(c for t, c in long_terms if t in text)
+        query[hit_cols] = True
+        if not len(ids):
+            return ids, np.zeros(0, dtype=np.float32)
+        mask = query[cols]
+        scores = np.bincount(rows[mask], weights=weights[cols[mask]], minlength=len(ids))
+        return ids, scores.astype(np.float32)
+
+    def overlap(self, resource_id: str, tokens: set[str], text: str = "") -> list[str]:
+        resource = self._resources.get(resource_id)
+        if resource is None:
+            return []
+        return [
+            term
+            for term in _keyword_terms(resource)
+            if term in tokens or (text and self._is_long(term) and term in text)
+        ]
+
+    def get(self, resource_id: str):
+        return self._resources.get(resource_id)
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+
+resource_keyword_index = ResourceKeywordIndex()
+resource_catalog.subscribe(resource_keyword_index)
@@ -2,7 +2,8 @@ import json
 import time
 from fastapi import APIRouter, HTTPException
 
-from ...common import resource_collection, resource_memo_collection, logger
+from ...common import resource_collection, resource_memo_collection, logger, run_firestore
+from ..search_index import resource_search_index
 from models.pydantic_models import ResourceMemo, ResourceMemoCreate, ResourceMemoUpdate
 from google.api_core.exceptions import FailedPrecondition
 from google.cloud.firestore_v1.base_query import FieldFilter
@@ -24,13 +25,14 @@ def _resource_memo_doc_to_model(doc) -> ResourceMemo:
 
 @router.post("/{resource_id}/memos", response_model=ResourceMemo)
 async def create_resource_memo(resource_id: str, memo: ResourceMemoCreate):
-    if not resource_collection().document(resource_id).get().exists:
+    if not (await run_firestore(resource_collection().document(resource_id).get)).exists:
         raise HTTPException(status_code=404, detail="社会資源が見つかりません")
     now = time.time()
     doc_ref = resource_memo_collection().document()
     data = {"resource_id": resource_id, "content": memo.content, "created_at": now, "updated_at": now}
-    doc_ref.set(data)
-    return _resource_memo_doc_to_model(doc_ref.get())
+    await run_firestore(doc_ref.set, data)
+    resource_search_index.upsert_memo(doc_ref.id, resource_id, memo.content)
+    return _resource_memo_doc_to_model(await run_firestore(doc_ref.get))
 
 
 @router.get("/{resource_id}/memos", response_model=list[ResourceMemo])
@@ -41,11 +43,12 @@ async def list_resource_memos(resource_id: str):
             .where(filter=FieldFilter("resource_id", "==", resource_id))
             .order_by("created_at")
         )
-        docs = q.stream()
+        docs = await run_firestore(lambda: list(q.stream()))
         return [_resource_memo_doc_to_model(d) for d in docs]
     except FailedPrecondition as e:
         logger.warning(f"memo list: missing composite index, fallback to client sort ({e})")
-        docs = resource_memo_collection().where(filter=FieldFilter("resource_id", "==", resource_id)).stream()
+        fallback = resource_memo_collection().where(filter=FieldFilter("resource_id", "==", resource_id))
+        docs = await run_firestore(lambda: list(fallback.stream()))
         memos = [_resource_memo_doc_to_model(d) for d in docs]
         memos.sort(key=lambda m: m.created_at)
         return memos
@@ -54,13 +57,15 @@ async def list_resource_memos(resource_id: str):
 @router.patch("/memos/{memo_id}", response_model=ResourceMemo)
 async def update_resource_memo(memo_id: str, memo: ResourceMemoUpdate):
     doc_ref = resource_memo_collection().document(memo_id)
-    snap = doc_ref.get()
+    snap = await run_firestore(doc_ref.get)
     if not snap.exists:
         raise HTTPException(status_code=404, detail="メモが見つかりません")
     now = time.time()
     try:
-        doc_ref.update({"content": memo.content, "updated_at": now})
-        return _resource_memo_doc_to_model(doc_ref.get())
+        await run_firestore(doc_ref.update, {"content": memo.content, "updated_at": now})
+        updated = _resource_memo_doc_to_model(await run_firestore(doc_ref.get))
+        resource_search_index.upsert_memo(memo_id, updated.resource_id, updated.content)
+        return updated
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"資源メモ更新失敗: {e}")
 
@@ -68,10 +73,11 @@ async def update_resource_memo(memo_id: str, memo: ResourceMemoUpdate):
 @router.delete("/memos/{memo_id}")
 async def delete_resource_memo(memo_id: str):
     doc_ref = resource_memo_collection().document(memo_id)
-    if not doc_ref.get().exists:
+    if not (await run_firestore(doc_ref.get)).exists:
         raise HTTPException(status_code=404, detail="メモが見つかりません")
     try:
-        doc_ref.delete()
+        await run_firestore(doc_ref.delete)
+        resource_search_index.remove_memo(memo_id)
         return {"status": "deleted", "id": memo_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"資源メモ削除失敗: {e}")
@@ -1,19 +1,28 @@
-import json
+import bisect
 import time
-import re
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
 from agents.resource_extraction_agent import (
     extract_resource_from_url,
     SocialResource,
 )
-from ..common import logger, resource_collection, resource_memo_collection
-from models.pydantic_models import Resource, ResourceCreate, ResourceUpdate
-from .service import resource_doc_to_model
-from .utils import embed_texts
+from infra.document_fetch import DocumentTooLargeError
+from ..common import (
+    decode_page_token,
+    encode_page_token,
+    page_response,
+    parse_fields,
+    resource_collection,
+    run_firestore,
+)
+from models.pydantic_models import Resource, ResourceCreate, ResourceUpdate, ResourceWithEmbedding
+from .service import embedding_fields, resource_doc_to_model, resource_embedding, resource_embedding_text
+from .utils import aembed_texts
+from .catalog import resource_catalog
+from .search_index import resource_search_index
 
 
 router = APIRouter(prefix="/resources", tags=["resources"])
@@ -26,12 +35,9 @@ async def create_resource(resource: ResourceCreate):
         data = resource.dict(exclude_unset=True)
 
         # Calculate embedding
-        text_to_embed = (
-            f"{data.get('service_name', '')} {data.get('description', '')} {' '.join(data.get('keywords', []))}"
-        )
-        embedding = embed_texts([text_to_embed])[0]
+        embedding = (await aembed_texts([resource_embedding_text(data)]))[0]
         if embedding:
-            data["embedding"] = embedding
+            data.update(embedding_fields(data, embedding))
 
         for k in [
             "category",
@@ -57,104 +63,90 @@ async def create_resource(resource: ResourceCreate):
                     data[k] = str(v)
         if not data.get("last_verified_at"):
             data["last_verified_at"] = time.time()
-        doc_ref.set(data)
+        await run_firestore(doc_ref.set, data)
         created = Resource(id=doc_ref.id, **data)
+        resource_catalog.upsert_local(created, data)
         return created
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"社会資源登録失敗: {e}")
 
 
+RESOURCE_LIST_FIELDS = list(Resource.__fields__)
+
+
 @router.get("/", response_model=List[Resource])
-async def list_resources():
+async def list_resources(
+    request: Request,
+    response: Response,
+    page_size: Optional[int] = Query(None, ge=1, le=500),
+    page_token: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    selected = parse_fields(fields, RESOURCE_LIST_FIELDS)
     try:
-        docs = resource_collection().stream()
-        items = []
-        skipped_invalid = 0
-        for d in docs:
-            try:
-                items.append(resource_doc_to_model(d))
-            except ValueError:
-                skipped_invalid += 1
-        if skipped_invalid:
-            logger.warning(f"resources: skipped {skipped_invalid} docs missing service_name")
-        return items
+        if not resource_catalog.ready:
+            await run_firestore(resource_catalog.ensure_started)
+        etag = resource_catalog.etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        items = resource_catalog.list()  # id 昇順
+        if page_token:
+            after = decode_page_token(page_token)
+            items = items[bisect.bisect_right([r.id for r in items], after) :]
+        next_token = None
+        if page_size and len(items) > page_size:
+            items = items[:page_size]
+            next_token = encode_page_token(items[-1].id)
+        if selected:
+            include = set(selected) | {"id"}
+            items = [r.dict(include=include) for r in items]
+            resp = page_response(items, response, next_token, projected=True)
+            resp.headers["ETag"] = etag
+            return resp
+        return page_response(items, response, next_token)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"社会資源一覧取得失敗: {e}")
 
 
 @router.get("/search", response_model=List[Resource])
-async def search_resources(q: str, limit: int = 100):
-    tokens = [t.lower() for t in re.split(r"\s+", q.strip()) if t]
-    if not tokens:
+async def search_resources(q: str, response: Response, limit: int = 100, offset: int = 0):
+    if not q.strip():
         return []
     try:
-        memo_map: dict[str, str] = {}
-        try:
-            memo_docs = resource_memo_collection().stream()
-            for md in memo_docs:
-                data = md.to_dict() or {}
-                rid = data.get("resource_id")
-                if not rid:
-                    continue
-                content = data.get("content") or ""
-                if not isinstance(content, str):
-                    try:
-                        content = json.dumps(content, ensure_ascii=False)
-                    except Exception:
-                        content = str(content)
-                prev = memo_map.get(rid, "")
-                if prev:
-                    memo_map[rid] = prev + " \n" + content.lower()
-                else:
-                    memo_map[rid] = content.lower()
-        except Exception as me:
-            logger.warning(f"memo aggregation failed: {me}")
-
-        docs = resource_collection().stream()
-        results: list[Resource] = []
-        skipped_invalid = 0
-        for d in docs:
-            if len(results) >= limit:
-                break
-            try:
-                r = resource_doc_to_model(d)
-            except ValueError:
-                skipped_invalid += 1
-                continue
-            haystack_parts = [
-                r.service_name or "",
-                r.category or "",
-                r.description or "",
-                r.provider or "",
-                r.location or "",
-                r.target_users or "",
-                " ".join(r.keywords or []),
-                memo_map.get(r.id, ""),
-            ]
-            haystack = " \n".join(
-                [part.lower() if i < len(haystack_parts) - 1 else part for i, part in enumerate(haystack_parts)]
-            )
-            if all(tok in haystack for tok in tokens):
-                results.append(r)
-        if skipped_invalid:
-            logger.warning(f"resources search: skipped {skipped_invalid} invalid docs")
+        if not resource_search_index.memos_loaded:
+            await run_firestore(resource_catalog.ensure_started)
+            await run_firestore(resource_search_index.load_memos_from_firestore)
+        results, total = resource_search_index.search(q, limit=limit, offset=max(0, offset))
+        response.headers["X-Total-Count"] = str(total)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"社会資源検索失敗: {e}")
 
 
-@router.get("/{resource_id}", response_model=Resource)
-async def get_resource(resource_id: str):
-    doc = resource_collection().document(resource_id).get()
+@router.get("/{resource_id}", response_model=ResourceWithEmbedding)
+async def get_resource(resource_id: str, include_embedding: bool = False):
+    """include_embedding=true のときのみ、保存済みベクトルを float 配列に戻して返す。"""
+    if not include_embedding:
+        cached = resource_catalog.get(resource_id)
+        if cached is not None:
+            return cached
+    doc = await run_firestore(resource_collection().document(resource_id).get)
     if not doc.exists:
         raise HTTPException(status_code=404, detail="社会資源が見つかりません")
-    return resource_doc_to_model(doc)
+    model = resource_doc_to_model(doc)
+    if not include_embedding:
+        return model
+    vec = resource_embedding(doc.to_dict() or {})
+    return ResourceWithEmbedding(**model.dict(), embedding=vec.tolist() if vec is not None else None)
 
 
 @router.patch("/{resource_id}", response_model=Resource)
 async def update_resource(resource_id: str, resource: ResourceUpdate):
     doc_ref = resource_collection().document(resource_id)
-    doc = doc_ref.get()
+    doc = await run_firestore(doc_ref.get)
     if not doc.exists:
         raise HTTPException(status_code=404, detail="社会資源が見つかりません")
 
@@ -164,10 +156,9 @@ async def update_resource(resource_id: str, resource: ResourceUpdate):
     if any(k in update_data for k in ["service_name", "description", "keywords"]):
         existing_data = doc.to_dict()
         merged_data = {**existing_data, **update_data}
-        text_to_embed = f"{merged_data.get('service_name', '')} {merged_data.get('description', '')} {' '.join(merged_data.get('keywords', []))}"
-        embedding = embed_texts([text_to_embed])[0]
+        embedding = (await aembed_texts([resource_embedding_text(merged_data)]))[0]
         if embedding:
-            update_data["embedding"] = embedding
+            update_data.update(embedding_fields(merged_data, embedding, drop_legacy=True))
 
     if update_data and "last_verified_at" not in update_data:
         update_data["last_verified_at"] = time.time()
@@ -194,9 +185,10 @@ async def update_resource(resource_id: str, resource: ResourceUpdate):
             except Exception:
                 update_data[k] = str(v)
     try:
-        doc_ref.update(update_data)
-        updated = doc_ref.get()
+        await run_firestore(doc_ref.update, update_data)
+        updated = await run_firestore(doc_ref.get)
         model = resource_doc_to_model(updated)
+        resource_catalog.upsert_local(model, updated.to_dict() or {})
         return model
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"社会資源更新失敗: {e}")
@@ -205,10 +197,11 @@ async def update_resource(resource_id: str, resource: ResourceUpdate):
 @router.delete("/{resource_id}")
 async def delete_resource(resource_id: str):
     doc_ref = resource_collection().document(resource_id)
-    if not doc_ref.get().exists:
+    if not (await run_firestore(doc_ref.get)).exists:
         raise HTTPException(status_code=404, detail="社会資源が見つかりません")
     try:
-        doc_ref.delete()
+        await run_firestore(doc_ref.delete)
+        resource_catalog.remove_local(resource_id)
         return {"status": "deleted", "id": resource_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"社会資源削除失敗: {e}")
@@ -224,5 +217,7 @@ async def extract_from_url(request: ExtractRequest):
     try:
         resource = await extract_resource_from_url(request.url)
         return resource
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"URLからの情報抽出失敗: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"URLからの情報抽出失敗: {e}")
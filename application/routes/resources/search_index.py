@@ -0,0 +1,244 @@
+"""社会資源検索用のプロセス内転置インデックス。
+
+日本語は空白で単語が区切られないため、文字 bigram / trigram をポスティングとして持ち、
+BM25 でランキングする。n-gram の一致は部分一致の必要条件でしかないため、
+最終的な絞り込みは候補文書に対する部分文字列判定で行う。
+クエリと文書はどちらも NFKC 正規化・小文字化して比較するため、全角英数字や半角カナの表記揺れも一致する。
+"""
+
+import json
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Optional
+
+from models.pydantic_models import Resource
+from .catalog import resource_catalog
+
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _segment_ngrams(segment: str, n: int) -> list[str]:
+    if len(segment) < n:
+        return []
+    return [segment[i : i + n] for i in range(len(segment) - n + 1)]
+
+
+def index_terms(text: str) -> list[str]:
+    """正規化済みテキストから bigram と trigram を取り出す（語の境界はまたがない）。"""
+    terms: list[str] = []
+    for segment in re.split(r"\s+", text):
+        if not segment:
+            continue
+        terms.extend(_segment_ngrams(segment, 2))
+        terms.extend(_segment_ngrams(segment, 3))
+    return terms
+
+
+def query_terms(token: str) -> list[str]:
+    """クエリ語の検索に使う n-gram。3文字以上は trigram、2文字は bigram そのもの。"""
+    if len(token) >= 3:
+        return _segment_ngrams(token, 3)
+    if len(token) == 2:
+        return [token]
+    return []
+
+
+def _resource_text(r: Resource) -> str:
+    parts = [
+        r.service_name or "",
+        r.category or "",
+        r.description or "",
+        r.provider or "",
+        r.location or "",
+        r.target_users or "",
+        " ".join(r.keywords or []),
+    ]
+    return " \n".join(parts)
+
+
+class ResourceSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.loaded = False
+        self.memos_loaded = False
+
+    def _reset(self) -> None:
+        self._resources: dict[str, Resource] = {}
+        self._resource_text: dict[str, str] = {}
+        self._memos: dict[str, tuple[str, str]] = {}  # memo_id -> (resource_id, normalized content)
+        self._memo_ids_by_resource: dict[str, set[str]] = {}
+        self._haystack: dict[str, str] = {}
+        self._doc_terms: dict[str, Counter] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._total_len = 0
+
+    # --- 構築 ---
+    def load(self, resources: list[Resource], memos: list[tuple[str, str, str]]) -> None:
+        """memos は (memo_id, resource_id, content) のリスト。"""
+        with self._lock:
+            self._reset()
+            for memo_id, resource_id, content in memos:
+                self._memos[memo_id] = (resource_id, normalize_text(content))
+                self._memo_ids_by_resource.setdefault(resource_id, set()).add(memo_id)
+            for r in resources:
+                self._resources[r.id] = r
+                self._resource_text[r.id] = normalize_text(_resource_text(r))
+                self._reindex(r.id)
+            self.loaded = True
+        logger.info(f"search index loaded: resources={len(resources)} memos={len(memos)} terms={len(self._postings)}")
+
+    def load_memos_from_firestore(self) -> None:
+        from ..common import resource_memo_collection
+
+        memos = []
+        for md in resource_memo_collection().stream():
+            data = md.to_dict() or {}
+            rid = data.get("resource_id")
+            if rid:
+                memos.append((md.id, rid, _stringify(data.get("content"))))
+        with self._lock:
+            self.load(list(self._resources.values()), memos)
+            self.memos_loaded = True
+
+    # --- カタログからの変更通知 ---
+    def on_catalog_reset(self, entries: list[tuple[Resource, dict]]) -> None:
+        with self._lock:
+            memos = [(memo_id, rid, content) for memo_id, (rid, content) in self._memos.items()]
+            self.load([r for r, _ in entries], memos)
+
+    def on_catalog_upsert(self, resource: Resource, data: dict) -> None:
+        self.upsert_resource(resource)
+
+    def on_catalog_remove(self, resource_id: str) -> None:
+        self.remove_resource(resource_id)
+
+    # --- 更新 ---
+    def upsert_resource(self, r: Resource) -> None:
+        with self._lock:
+            self._resources[r.id] = r
+            self._resource_text[r.id] = normalize_text(_resource_text(r))
+            self._reindex(r.id)
+
+    def remove_resource(self, resource_id: str) -> None:
+        with self._lock:
+            self._resources.pop(resource_id, None)
+            self._resource_text.pop(resource_id, None)
+            for memo_id in self._memo_ids_by_resource.pop(resource_id, set()):
+                self._memos.pop(memo_id, None)
+            self._unindex(resource_id)
+
+    def upsert_memo(self, memo_id: str, resource_id: str, content) -> None:
+        with self._lock:
+            prev = self._memos.get(memo_id)
+            self._memos[memo_id] = (resource_id, normalize_text(_stringify(content)))
+            self._memo_ids_by_resource.setdefault(resource_id, set()).add(memo_id)
+            if prev and prev[0] != resource_id:
+                self._memo_ids_by_resource.get(prev[0], set()).discard(memo_id)
+                self._reindex(prev[0])
+            self._reindex(resource_id)
+
+    def remove_memo(self, memo_id: str) -> None:
+        with self._lock:
+            prev = self._memos.pop(memo_id, None)
+            if prev:
+                self._memo_ids_by_resource.get(prev[0], set()).discard(memo_id)
+                self._reindex(prev[0])
+
+    def _reindex(self, resource_id: str) -> None:
+        self._unindex(resource_id)
+        if resource_id not in self._resources:
+            return
+        memo_text = " \n".join(self._memos[m][1] for m in sorted(self._memo_ids_by_resource.get(resource_id, ())))
+        haystack = self._resource_text[resource_id] + " \n" + memo_text
+        terms = Counter(index_terms(haystack))
+        self._haystack[resource_id] = haystack
+        self._doc_terms[resource_id] = terms
+        self._total_len += sum(terms.values())
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[resource_id] = tf
+
+    def _unindex(self, resource_id: str) -> None:
+        terms = self._doc_terms.pop(resource_id, None)
+        self._haystack.pop(resource_id, None)
+        if not terms:
+            return
+        self._total_len -= sum(terms.values())
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(resource_id, None)
+            if not docs:
+                del self._postings[term]
+
+    # --- 検索 ---
+    def search(self, q: str, limit: int = 100, offset: int = 0) -> tuple[list[Resource], int]:
+        """全トークンを部分一致で含む資源を BM25 順に返す。戻り値は (ページ内の資源, 総ヒット数)。"""
+        tokens = [t for t in re.split(r"\s+", normalize_text(q).strip()) if t]
+        if not tokens:
+            return [], 0
+        with self._lock:
+            n_docs = len(self._haystack)
+            if n_docs == 0:
+                return [], 0
+            avg_len = (self._total_len / n_docs) or 1.0
+            candidates: Optional[set[str]] = None
+            for tok in tokens:
+                for term in query_terms(tok):
+                    docs = self._postings.get(term)
+                    if not docs:
+                        return [], 0
+                    ids = set(docs)
+                    candidates = ids if candidates is None else candidates & ids
+                    if not candidates:
+                        return [], 0
+            if candidates is None:
+                # 1文字のみのクエリは n-gram で絞れないため全件を検証する
+                candidates = set(self._haystack)
+            matched = [rid for rid in candidates if all(tok in self._haystack[rid] for tok in tokens)]
+
+            q_terms = [term for tok in tokens for term in query_terms(tok)]
+            scores: dict[str, float] = {}
+            for rid in matched:
+                doc_terms = self._doc_terms[rid]
+                doc_len = sum(doc_terms.values())
+                score = 0.0
+                for term in q_terms:
+                    tf = doc_terms.get(term, 0)
+                    if not tf:
+                        continue
+                    df = len(self._postings.get(term, ()))
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len))
+                scores[rid] = score
+            ranked = sorted(matched, key=lambda rid: (-scores[rid], rid))
+            page = ranked[offset : offset + limit]
+            return [self._resources[rid] for rid in page], len(ranked)
+
+
+def _stringify(content) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    try:
+        return json.dumps(content, ensure_ascii=False)
+    except Exception:
+        return str(content)
+
+
+resource_search_index = ResourceSearchIndex()
+resource_catalog.subscribe(resource_search_index)
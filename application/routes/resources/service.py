@@ -1,4 +1,12 @@
+import hashlib
+from typing import Optional
+
+import numpy as np
+from google.cloud import firestore
+
+import config
 from models.pydantic_models import Resource
+from utils.vector_codec import decode_vector, encode_vector
 
 
 def resource_to_corpus(r: Resource) -> str:
@@ -52,6 +60,39 @@ def resource_doc_to_model(doc) -> Resource:
     )
 
 
+def resource_embedding_text(data: dict) -> str:
+    """埋め込みベクトルの元になるテキスト（サービス名・説明・キーワード）。"""
+    return f"{data.get('service_name') or ''} {data.get('description') or ''} {' '.join(data.get('keywords') or [])}"
+
+
+def resource_embedding_hash(data: dict) -> str:
+    return hashlib.sha1(resource_embedding_text(data).encode("utf-8")).hexdigest()
+
+
+def embedding_fields(data: dict, embedding: list[float], drop_legacy: bool = False) -> dict:
+    """ベクトル（embedding_packed）と、モデル変更・テキスト変更の検出（再埋め込み）に使うフィールド。
+
+    drop_legacy=True では旧形式の float 配列 (embedding) を削除する（update / merge 書き込み用）。
+    """
+    fields = {
+        "embedding_packed": encode_vector(embedding, config.EMBED_STORAGE_DTYPE),
+        "embedding_model": config.EMBED_MODEL,
+        "embedding_text_hash": resource_embedding_hash(data),
+    }
+    if drop_legacy:
+        fields["embedding"] = firestore.DELETE_FIELD
+    return fields
+
+
+def resource_embedding(data: dict) -> Optional[np.ndarray]:
+    """保存済みベクトルを float32 配列で返す（旧形式の float 配列にも対応）。"""
+    packed = data.get("embedding_packed")
+    if packed:
+        return decode_vector(packed)
+    legacy = data.get("embedding")
+    return np.asarray(legacy, dtype=np.float32) if legacy else None
+
+
 def normalize_resource_input(raw: dict) -> dict:
     contact = raw.get("contact_info") or {}
     return {
@@ -0,0 +1,184 @@
+"""suggest のキーワード照合用トークナイザ。
+
+句読点で区切るだけでは「〜で就労支援を受けている」のような節がそのままトークンになり、
+資源のキーワード（就労支援 など）とほとんど一致しない。そこで
+- 形態素解析器 (janome / fugashi) がインストールされていれば名詞と連続する名詞の複合語を取り出す
+- なければ文字 n-gram (2〜SUGGEST_NGRAM_MAX 文字) を照合語に加える（キーワードの部分一致相当）
+結果はテキストのハッシュごとにキャッシュし、同じアセスメントの再提案ではトークナイズしない。
+n-gram より長いキーワードは、照合語ではなく正規化済みテキスト (TokenizedText.text) への部分一致で照合する（keyword_index.py）。
+"""
+
+import hashlib
+import importlib.util
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+_SPLIT_RE = re.compile(r"[\s、。,.；;:\n\r\t/()『』「」【】\[\]{}・！？!?]+")
+MAX_WORDS = 1000
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+class TokenizedText(NamedTuple):
+    words: tuple[str, ...]  # 表示・デバッグ用の語（節または形態素）
+    terms: frozenset[str]  # キーワード照合に使う語（words + n-gram / 複合語）
+    text: str = ""  # 正規化済みの全文（長いキーワードの部分一致用）
+
+
+def split_clauses(text: str) -> list[str]:
+    return [t for t in _SPLIT_RE.split(text) if len(t) > 1][:MAX_WORDS]
+
+
+def char_ngrams(segment: str, min_n: int, max_n: int) -> list[str]:
+    return [segment[i : i + n] for n in range(min_n, max_n + 1) for i in range(len(segment) - n + 1)]
+
+
+class RegexTokenizer:
+    """従来どおり句読点・空白で区切るだけ。"""
+
+    name = "regex"
+
+    def tokenize(self, text: str) -> TokenizedText:
+        normalized = normalize_text(text)
+        words = split_clauses(normalized)
+        return TokenizedText(tuple(words), frozenset(words), normalized)
+
+
+class NgramTokenizer:
+    """依存なし。節に加えて文字 n-gram を照合語にする。"""
+
+    name = "ngram"
+
+    def __init__(self, min_n: int = 2, max_n: int = 6):
+        self.min_n = max(1, min_n)
+        self.max_n = max(self.min_n, max_n)
+
+    def tokenize(self, text: str) -> TokenizedText:
+        normalized = normalize_text(text)
+        words = split_clauses(normalized)
+        terms = set(words)
+        for w in words:
+            terms.update(char_ngrams(w, self.min_n, self.max_n))
+        return TokenizedText(tuple(words), frozenset(terms), normalized)
+
+
+class MorphologicalTokenizer:
+    """janome または fugashi (MeCab) で名詞と名詞の連続（複合語）を取り出す。
+
+    解析器のインスタンスはスレッドセーフではないため、asyncio.to_thread のワーカースレッドごとに作る。
+    """
+
+    def __init__(self, backend: str):
+        self.name = backend
+        if backend == "janome":
+            from janome.tokenizer import Tokenizer  # type: ignore
+
+            self._factory = Tokenizer
+            self._parse = lambda analyzer, s: [
+                (t.surface, t.part_of_speech.split(",")[0]) for t in analyzer.tokenize(s)
+            ]
+        elif backend == "fugashi":
+            from fugashi import Tagger  # type: ignore
+
+            self._factory = Tagger
+            self._parse = lambda analyzer, s: [(w.surface, w.feature.pos1) for w in analyzer(s)]
+        else:
+            raise ValueError(f"unknown tokenizer backend: {backend}")
+        self._local = threading.local()
+        # 辞書が使えない場合はここで失敗させ、create_tokenizer で ngram にフォールバックする
+        self._analyzer()
+
+    def _analyzer(self):
+        analyzer = getattr(self._local, "analyzer", None)
+        if analyzer is None:
+            analyzer = self._local.analyzer = self._factory()
+        return analyzer
+
+    def _analyze(self, text: str) -> list[tuple[str, str]]:
+        return self._parse(self._analyzer(), text)
+
+    def tokenize(self, text: str) -> TokenizedText:
+        words: list[str] = []
+        terms: set[str] = set()
+        normalized = normalize_text(text)
+        for clause in split_clauses(normalized):
+            terms.add(clause)
+            run: list[str] = []
+            for surface, pos in self._analyze(clause) + [("", "")]:
+                if pos == "名詞":
+                    run.append(surface)
+                    continue
+                if run:
+                    compound = "".join(run)
+                    if len(compound) > 1:
+                        words.append(compound)
+                        terms.add(compound)
+                    terms.update(r for r in run if len(r) > 1)
+                    run = []
+        return TokenizedText(tuple(words[:MAX_WORDS]), frozenset(terms), normalized)
+
+
+def create_tokenizer(name: str = "auto"):
+    """name: auto / janome / fugashi / ngram / regex。auto はインストール済みの解析器、なければ ngram。"""
+    if name == "auto":
+        name = next((b for b in ("janome", "fugashi") if importlib.util.find_spec(b)), "ngram")
+    if name in ("janome", "fugashi"):
+        try:
+            return MorphologicalTokenizer(name)
+        except Exception as e:
+            logger.warning(f"tokenizer {name} unavailable, falling back to ngram: {e}")
+            name = "ngram"
+    if name == "regex":
+        return RegexTokenizer()
+    return NgramTokenizer(max_n=config.SUGGEST_NGRAM_MAX)
+
+
+class CachedTokenizer:
+    """テキストのハッシュをキーに結果を LRU で保持する。"""
+
+    def __init__(self, tokenizer, max_items: int = 256):
+        self.tokenizer = tokenizer
+        self.max_items = max(1, max_items)
+        self._cache: OrderedDict[str, TokenizedText] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def name(self) -> str:
+        return self.tokenizer.name
+
+    def tokenize(self, text: str) -> TokenizedText:
+        key = hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            cached: Optional[TokenizedText] = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        result = self.tokenizer.tokenize(text)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        return {"tokenizer": self.name, "hits": self.hits, "misses": self.misses, "items": len(self._cache)}
+
+
+suggest_tokenizer = CachedTokenizer(
+    create_tokenizer(config.SUGGEST_TOKENIZER), max_items=config.SUGGEST_TOKEN_CACHE_ITEMS
+)
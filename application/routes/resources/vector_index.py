@@ -0,0 +1,244 @@
+"""社会資源の埋め込みベクトルを保持するプロセス内インデックス。
+
+資源カタログ (catalog.py) のリスナーとして登録され、資源の作成/更新/削除に追従する。
+- exact: 正規化済み行列との内積で全件スコアを計算（数千件なら数ms）
+- ivf: k-means で粗いクラスタに分割し、近いクラスタのみを走査する近似検索
+"""
+
+import logging
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+import config
+from models.pydantic_models import Resource
+from .catalog import resource_catalog
+from .service import resource_embedding
+
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vec) -> Optional[np.ndarray]:
+    if vec is None:
+        return None
+    try:
+        arr = np.asarray(vec, dtype=np.float32).ravel()
+    except (TypeError, ValueError):
+        return None
+    if arr.size == 0:
+        return None
+    norm = float(np.linalg.norm(arr))
+    if not np.isfinite(norm) or norm == 0.0:
+        return None
+    return arr / norm
+
+
+def _current_model_vector(data: dict):
+    """別モデルで生成されたベクトルはクエリと比較できないため、再埋め込みされるまで無いものとして扱う。"""
+    model = data.get("embedding_model")
+    if model and model != config.EMBED_MODEL:
+        return None
+    return resource_embedding(data)
+
+
+class ResourceVectorIndex:
+    """資源IDと正規化済み埋め込み行列を対応付けて保持する。
+
+    埋め込みを持たない資源も `resources()` で列挙できるよう登録しておき、
+    ベクトルスコアのみ 0 として扱う。
+    """
+
+    def __init__(self, mode: str = "exact", nlist: int = 0, nprobe: int = 4, ivf_min_size: int = 2000):
+        self.mode = mode if mode in ("exact", "ivf") else "exact"
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.ivf_min_size = ivf_min_size
+        self._lock = threading.RLock()
+        self._resources: dict[str, Resource] = {}
+        self._ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._dim = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assign: Optional[np.ndarray] = None
+        self._ivf_built_size = 0
+        self.loaded = False
+
+    # --- 構築 ---
+    def load(self, items: Iterable[tuple[Resource, Optional[list[float]]]]) -> None:
+        resources: dict[str, Resource] = {}
+        ids: list[str] = []
+        rows: list[np.ndarray] = []
+        dim = 0
+        for res, emb in items:
+            resources[res.id] = res
+            vec = _normalize(emb)
+            if vec is None:
+                continue
+            if dim == 0:
+                dim = vec.size
+            if vec.size != dim:
+                logger.warning(f"vector index: skip {res.id} (dim {vec.size} != {dim})")
+                continue
+            ids.append(res.id)
+            rows.append(vec)
+        with self._lock:
+            self._resources = resources
+            self._ids = ids
+            self._pos = {rid: i for i, rid in enumerate(ids)}
+            self._dim = dim
+            self._matrix = np.vstack(rows) if rows else np.zeros((0, dim), dtype=np.float32)
+            self._centroids = None
+            self._assign = None
+            self._maybe_build_ivf()
+            self.loaded = True
+        logger.info(f"vector index loaded: resources={len(resources)} vectors={len(ids)} dim={dim} mode={self.mode}")
+
+    # --- カタログからの変更通知 ---
+    def on_catalog_reset(self, entries: list[tuple[Resource, dict]]) -> None:
+        self.load((r, _current_model_vector(data)) for r, data in entries)
+
+    def on_catalog_upsert(self, resource: Resource, data: dict) -> None:
+        has_vector = "embedding_packed" in data or "embedding" in data
+        self.upsert(resource, _current_model_vector(data), keep_vector=not has_vector)
+
+    def on_catalog_remove(self, resource_id: str) -> None:
+        self.remove(resource_id)
+
+    # --- 更新 ---
+    def upsert(self, resource: Resource, embedding: Optional[list[float]] = None, keep_vector: bool = False) -> None:
+        """資源を登録/更新する。keep_vector=True の場合、embedding 未指定なら既存ベクトルを維持する。"""
+        vec = _normalize(embedding)
+        with self._lock:
+            self._resources[resource.id] = resource
+            if vec is None:
+                if not keep_vector:
+                    self._remove_vector(resource.id)
+                return
+            if self._dim == 0:
+                self._dim = vec.size
+                self._matrix = np.zeros((0, self._dim), dtype=np.float32)
+            if vec.size != self._dim:
+                logger.warning(f"vector index: skip {resource.id} (dim {vec.size} != {self._dim})")
+                return
+            i = self._pos.get(resource.id)
+            if i is not None:
+                self._matrix[i] = vec
+                if self._assign is not None:
+                    self._assign[i] = self._nearest_centroid(vec)
+                return
+            self._pos[resource.id] = len(self._ids)
+            self._ids.append(resource.id)
+            self._matrix = np.vstack([self._matrix, vec[None, :]])
+            if self._assign is not None:
+                self._assign = np.append(self._assign, self._nearest_centroid(vec))
+            self._maybe_build_ivf()
+
+    def remove(self, resource_id: str) -> None:
+        with self._lock:
+            self._resources.pop(resource_id, None)
+            self._remove_vector(resource_id)
+
+    def _remove_vector(self, resource_id: str) -> None:
+        i = self._pos.pop(resource_id, None)
+        if i is None:
+            return
+        last = len(self._ids) - 1
+        if i != last:
+            # 末尾の行を空いた位置へ移して行列の連続性を保つ
+            moved = self._ids[last]
+            self._ids[i] = moved
+            self._pos[moved] = i
+            self._matrix[i] = self._matrix[last]
+            if self._assign is not None:
+                self._assign[i] = self._assign[last]
+        self._ids.pop()
+        self._matrix = self._matrix[:last]
+        if self._assign is not None:
+            self._assign = self._assign[:last]
+
+    # --- 参照 ---
+    def get(self, resource_id: str) -> Optional[Resource]:
+        return self._resources.get(resource_id)
+
+    def resources(self) -> list[Resource]:
+        with self._lock:
+            return list(self._resources.values())
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def coverage(self) -> dict:
+        with self._lock:
+            return {"resources": len(self._resources), "vectors": len(self._ids), "dim": self._dim}
+
+    def scores(self, query: Optional[list[float]], candidates: int = 200) -> dict[str, float]:
+        """クエリとのコサイン類似度を {resource_id: score} で返す。
+
+        exact モードでは全ベクトル、ivf モードでは近傍クラスタ内の上位 `candidates` 件のみを返す。
+        """
+        q = _normalize(query)
+        with self._lock:
+            if q is None or not self._ids or q.size != self._dim:
+                return {}
+            if self._centroids is None:
+                sims = self._matrix @ q
+                return dict(zip(self._ids, sims.tolist()))
+            probe = np.argsort(-(self._centroids @ q))[: self.nprobe]
+            rows = np.flatnonzero(np.isin(self._assign, probe))
+            if rows.size == 0:
+                return {}
+            sims = self._matrix[rows] @ q
+            if rows.size > candidates:
+                top = np.argpartition(-sims, candidates - 1)[:candidates]
+                rows, sims = rows[top], sims[top]
+            return {self._ids[r]: float(s) for r, s in zip(rows.tolist(), sims.tolist())}
+
+    def search(self, query: Optional[list[float]], k: int = 10) -> list[tuple[str, float]]:
+        scored = self.scores(query, candidates=max(k, 1))
+        return sorted(scored.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    # --- IVF ---
+    def _maybe_build_ivf(self) -> None:
+        n = len(self._ids)
+        if self.mode != "ivf" or n < self.ivf_min_size:
+            self._centroids = None
+            self._assign = None
+            return
+        # 件数が前回構築時から倍増した場合のみ再クラスタリングする
+        if self._centroids is not None and n < self._ivf_built_size * 2:
+            return
+        nlist = self.nlist or max(8, int(np.sqrt(n)))
+        self._centroids, self._assign = self._kmeans(self._matrix, nlist)
+        self._ivf_built_size = n
+
+    def _nearest_centroid(self, vec: np.ndarray) -> int:
+        return int(np.argmax(self._centroids @ vec))
+
+    @staticmethod
+    def _kmeans(x: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(seed)
+        k = min(k, x.shape[0])
+        centroids = x[rng.choice(x.shape[0], size=k, replace=False)].copy()
+        assign = np.zeros(x.shape[0], dtype=np.int64)
+        for _ in range(iters):
+            assign = np.argmax(x @ centroids.T, axis=1)
+            for c in range(k):
+                members = x[assign == c]
+                if members.size == 0:
+                    continue
+                mean = members.mean(axis=0)
+                norm = np.linalg.norm(mean)
+                if norm > 0:
+                    centroids[c] = mean / norm
+        return centroids, assign
+
+
+resource_vector_index = ResourceVectorIndex(
+    mode=config.VECTOR_INDEX_MODE,
+    nlist=config.VECTOR_INDEX_NLIST,
+    nprobe=config.VECTOR_INDEX_NPROBE,
+)
+resource_catalog.subscribe(resource_vector_index)
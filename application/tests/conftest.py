@@ -0,0 +1,66 @@
+"""テスト共通設定。
+
+config は必須の環境変数がないと import 時に失敗するため、ダミー値を入れてから application を import パスに追加する。
+Firestore クライアントは import 時に作られるので、使い捨ての鍵で作ったサービスアカウントとエミュレータ設定を渡し、
+実際には接続しないクライアントを作らせる。
+SQLite のキャッシュ・ジョブキューはテスト用の一時ディレクトリに作る。
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_APP_DIR = Path(__file__).resolve().parent.parent
+_CACHE_DIR = Path(tempfile.mkdtemp(prefix="fukushia-tests-"))
+
+
+def _dummy_service_account() -> str:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return json.dumps(
+        {
+            "type": "service_account",
+            "project_id": "test",
+            "private_key_id": "test",
+            "private_key": pem,
+            "client_email": "test@test.iam.gserviceaccount.com",
+            "client_id": "0",
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }
+    )
+
+
+if "FIREBASE_SERVICE_ACCOUNT" not in os.environ:
+    os.environ["FIREBASE_SERVICE_ACCOUNT"] = _dummy_service_account()
+
+for _name in (
+    "GEMINI_API_KEY",
+    "GOOGLE_CSE_ID",
+    "TARGET_FIREBASE_APP_ID",
+    "TARGET_FIREBASE_USER_ID",
+    "RAG_PROJECT_ID",
+    "RAG_CORPUS_RESOURCE",
+):
+    os.environ.setdefault(_name, "test")
+
+os.environ.setdefault("FIRESTORE_EMULATOR_HOST", "localhost:8080")
+os.environ.setdefault("FIREBASE_PROJECT_ID", "test")
+
+for _name, _file in (
+    ("RAG_CACHE_PATH", "rag_cache.sqlite3"),
+    ("GOOGLE_SEARCH_CACHE_PATH", "search_cache.sqlite3"),
+    ("EMBED_CACHE_PATH", "embeddings.sqlite3"),
+    ("JOB_QUEUE_PATH", "jobs.sqlite3"),
+    ("IMPORT_CHECKPOINT_PATH", "import_checkpoints.sqlite3"),
+):
+    os.environ.setdefault(_name, str(_CACHE_DIR / _file))
+
+if str(_APP_DIR) not in sys.path:
+    sys.path.insert(0, str(_APP_DIR))
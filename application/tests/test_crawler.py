@@ -0,0 +1,130 @@
+import asyncio
+
+from routes.resources.extract.crawler import BatchExtraction
+
+
+def test_run_bounds_in_flight_urls():
+    batch = BatchExtraction(concurrency=3)
+    state = {"active": 0, "peak": 0}
+
+    async def process(url):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return {"url": url, "status": "ok"}
+
+    batch._process = process
+
+    urls = [f"https://example.jp/{i}" for i in range(10)] + ["https://example.jp/0#top"]
+
+    async def main():
+        return [r async for r in batch.run(urls)]
+
+    results = asyncio.run(main())
+    assert sorted(r["url"] for r in results) == sorted(urls[:10])
+    assert state["peak"] == 3
+
+
+def test_closing_run_cancels_running_tasks():
+    batch = BatchExtraction(concurrency=2)
+    cancelled = []
+
+    async def process(url):
+        try:
+            await asyncio.sleep(0 if url.endswith("/0") else 10)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        return {"url": url, "status": "ok"}
+
+    batch._process = process
+
+    async def main():
+        gen = batch.run([f"https://example.jp/{i}" for i in range(5)])
+        first = await gen.__anext__()
+        await gen.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(main())["url"] == "https://example.jp/0"
+    assert cancelled == ["https://example.jp/1"]
+
+
+def test_alias_of_failed_page_is_retried(monkeypatch):
+    from infra.document_fetch import FetchedDocument
+    from routes.resources.extract import crawler
+
+    calls = []
+
+    async def fetch_document(url):
+        # どちらの URL も同じページにリダイレクトされる
+        return FetchedDocument("https://example.jp/page", "text/html", "本文", False)
+
+    async def extract_resource_from_text(text, url):
+        calls.append(url)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return type("R", (), {"dict": lambda self: {"service_name": "x"}})()
+
+    monkeypatch.setattr(crawler, "fetch_document", fetch_document)
+    monkeypatch.setattr(crawler, "extract_resource_from_text", extract_resource_from_text)
+
+    async def main():
+        batch = BatchExtraction(concurrency=1)
+        return [r async for r in batch.run(["https://example.jp/a", "https://example.jp/b", "https://example.jp/c"])]
+
+    statuses = [r["status"] for r in asyncio.run(main())]
+    assert statuses == ["error", "ok", "duplicate"]
+
+
+def test_concurrent_aliases_wait_for_in_flight_extraction(monkeypatch):
+    from infra.document_fetch import FetchedDocument
+    from routes.resources.extract import crawler
+
+    calls = []
+
+    async def fetch_document(url):
+        # /a と /b は同じページへのリダイレクト、/c は別 URL だが本文が同じ
+        final = "https://example.jp/other" if url.endswith("/c") else "https://example.jp/page"
+        return FetchedDocument(final, "text/html", "本文", False)
+
+    async def extract_resource_from_text(text, url):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return type("R", (), {"dict": lambda self: {"service_name": "x"}})()
+
+    monkeypatch.setattr(crawler, "fetch_document", fetch_document)
+    monkeypatch.setattr(crawler, "extract_resource_from_text", extract_resource_from_text)
+
+    async def main():
+        batch = BatchExtraction(concurrency=4)
+        urls = [f"https://example.jp/{c}" for c in "abcd"]
+        return [r async for r in batch.run(urls)]
+
+    results = asyncio.run(main())
+    # 最初の抽出が失敗した後、待っていた別名 URL のうち1件だけが改めて抽出する
+    assert len(calls) == 2
+    assert sorted(r["status"] for r in results) == ["duplicate", "duplicate", "error", "ok"]
+    ok = next(r for r in results if r["status"] == "ok")
+    assert all(r["duplicate_of"] == ok["url"] for r in results if r["status"] == "duplicate")
+
+
+def test_host_limit_evicts_idle_hosts():
+    import httpx
+
+    from infra.http_pool import HostLimitedHttpClient
+
+    pool = HostLimitedHttpClient(max_connections=4, per_host=1, timeout=httpx.Timeout(1))
+
+    async def fetch(url):
+        async with pool.host_limit(url):
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(fetch(f"https://host{i % 3}.example.jp/{i}") for i in range(9)))
+
+    asyncio.run(main())
+    assert pool._host_limits == {}
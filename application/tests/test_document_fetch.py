@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+
+import config
+from infra.document_fetch import DocumentTooLargeError, extract_html_text, fetch_bytes, fetch_document
+
+
+WEBFORMS_PAGE = """
+<html><head><title>子育て支援</title><script>var x = 1;</script></head>
+<body>
+<form id="form1" method="post" action="./page.aspx">
+  <input type="hidden" name="__VIEWSTATE" value="dDwtMTIzNDU2Nzg5Ozs+" />
+  <header>市役所トップ</header>
+  <nav><a href="/">ホーム</a></nav>
+  <div id="contents">
+    <h1>ひとり親家庭医療費助成</h1>
+    <p>対象：18歳未満の児童を養育するひとり親家庭</p>
+    <select name="lang"><option>日本語</option><option>English</option></select>
+    <button type="submit">検索</button>
+  </div>
+  <footer>Copyright</footer>
+</form>
+</body></html>
+"""
+
+
+def test_page_wrapped_in_form_keeps_content():
+    text = extract_html_text(WEBFORMS_PAGE.encode("utf-8"), 1000)
+    assert text.splitlines() == ["ひとり親家庭医療費助成", "対象：18歳未満の児童を養育するひとり親家庭"]
+
+
+def test_prefers_main_and_honours_meta_charset():
+    html = (
+        '<html><head><meta charset="shift_jis"></head><body><div>メニュー</div>'
+        "<main><p>生活保護の相談窓口</p></main></body></html>"
+    ).encode("shift_jis")
+    assert extract_html_text(html, 1000) == "生活保護の相談窓口"
+
+
+def test_truncates_to_max_chars():
+    html = "<html><body><p>" + "あ" * 50 + "</p></body></html>"
+    assert extract_html_text(html.encode("utf-8"), 10) == "あ" * 10
+
+
+def _pdf(pages: list[str]) -> bytes:
+    """ASCII テキストを1行ずつ載せた最小限の PDF。"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R"
+            " /Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def _client(body: bytes, content_type: str) -> httpx.AsyncClient:
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": content_type}, content=body)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_pdf_larger_than_max_bytes_is_spooled_and_extracted(monkeypatch):
+    data = _pdf([f"page {i}" for i in range(5)])
+    monkeypatch.setattr(config, "EXTRACT_MAX_PDF_PAGES", 3)
+    monkeypatch.setattr(config, "EXTRACT_MAX_PDF_BYTES", len(data) * 2)
+
+    async def main():
+        async with _client(data, "application/pdf") as client:
+            return await fetch_document("https://example.jp/guide.pdf", client, max_bytes=256)
+
+    doc = asyncio.run(main())
+    assert not doc.truncated
+    assert doc.text.split("\n") == ["page 0", "page 1", "page 2"]
+
+
+def test_pdf_over_pdf_limit_is_rejected(monkeypatch):
+    data = _pdf(["page"])
+    monkeypatch.setattr(config, "EXTRACT_MAX_PDF_BYTES", len(data) - 1)
+
+    async def main():
+        async with _client(data, "application/pdf") as client:
+            return await fetch_document("https://example.jp/guide.pdf", client, max_bytes=256)
+
+    with pytest.raises(DocumentTooLargeError):
+        asyncio.run(main())
+
+
+def test_html_is_truncated_at_max_bytes():
+    body = ("<html><body><p>" + "a" * 1000 + "</p></body></html>").encode()
+
+    async def main():
+        async with _client(body, "text/html") as client:
+            return await fetch_document("https://example.jp/", client, max_bytes=100)
+
+    doc = asyncio.run(main())
+    assert doc.truncated
+    assert 0 < len(doc.text) < 100
+
+
+def test_fetch_bytes_without_truncation_raises():
+    async def main():
+        async with _client(b"x" * 200, "application/xml") as client:
+            return await fetch_bytes(client, "https://example.jp/sitemap.xml", 100, allow_truncate=False)
+
+    with pytest.raises(DocumentTooLargeError):
+        asyncio.run(main())
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+from infra.embedding import EmbeddingService
+from infra.embedding_cache import EmbeddingCache
+
+
+class _RecordingCache(EmbeddingCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads: list[int] = []
+
+    def get_many(self, keys):
+        self.threads.append(threading.get_ident())
+        return super().get_many(keys)
+
+    def put_many(self, items):
+        self.threads.append(threading.get_ident())
+        return super().put_many(items)
+
+
+def _service(cache, calls):
+    service = EmbeddingService(api_key=None, model="test-model", max_attempts=3, cache=cache)
+
+    async def embed_batch(batch, max_attempts):
+        calls.append((list(batch), max_attempts))
+        return [[float(len(t)), 1.0] for t in batch]
+
+    service._embed_batch_async = embed_batch
+    return service
+
+
+def test_aembed_uses_disk_cache_off_the_event_loop(tmp_path):
+    cache = _RecordingCache(str(tmp_path / "embeddings.sqlite3"), memory_items=0)
+    calls = []
+    service = _service(cache, calls)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        first = await service.aembed(["あ", "いい", "", "あ"])
+        second = await service.aembed(["いい"])
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert first == [[1.0, 1.0], [2.0, 1.0], [], [1.0, 1.0]]
+    assert second == [[2.0, 1.0]]
+    # 重複と空文字は API に送らず、2回目はディスクのキャッシュから返す
+    assert calls == [(["あ", "いい"], 3)]
+    assert cache.threads and loop_thread not in cache.threads
+
+
+def test_aembed_memory_only_cache_stays_on_loop():
+    cache = _RecordingCache(None)
+    calls = []
+    service = _service(cache, calls)
+
+    async def main():
+        await service.aembed(["あ"], max_attempts=1)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert calls == [(["あ"], 1)]
+    assert set(cache.threads) == {loop_thread}
+
+
+def test_async_batch_retries_up_to_max_attempts(monkeypatch):
+    service = EmbeddingService(api_key=None, model="test-model", max_attempts=3)
+    attempts = []
+
+    class _Client:
+        async def embed_content_async(self, model, content):
+            attempts.append(model)
+            raise RuntimeError("unavailable")
+
+    async def no_sleep(_delay):
+        return None
+
+    service._genai = _Client()
+    monkeypatch.setattr("infra.embedding.asyncio.sleep", no_sleep)
+    assert asyncio.run(service.aembed(["あ"], max_attempts=1)) == [[]]
+    assert len(attempts) == 1
+    assert asyncio.run(service.aembed(["い"])) == [[]]
+    assert len(attempts) == 4
+
+
+def test_sync_embed_single_attempt_with_timeout(monkeypatch):
+    service = EmbeddingService(api_key=None, model="test-model", max_attempts=3)
+    calls = []
+    sleeps = []
+
+    class _Client:
+        def embed_content(self, model, content, **kwargs):
+            calls.append(kwargs)
+            raise TimeoutError("deadline exceeded")
+
+    service._genai = _Client()
+    monkeypatch.setattr("infra.embedding.time.sleep", sleeps.append)
+    assert service.embed(["あ"], max_attempts=1, timeout=2.0) == [[]]
+    assert calls == [{"request_options": {"timeout": 2.0}}]
+    assert sleeps == []
+    assert service.embed(["い"]) == [[]]
+    assert calls[1:] == [{}, {}, {}]
+    assert len(sleeps) == 2
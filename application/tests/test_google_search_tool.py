@@ -0,0 +1,76 @@
+import pytest
+
+from agent.tools import google_search_tool as gst
+from agent.tools.google_search_tool import SearchResultStore, normalize_search_query, search_cache_key
+from utils.rate_limit import TokenBucket
+from utils.ttl_cache import TTLCache
+
+
+def test_cache_key_keeps_word_order():
+    assert search_cache_key("児童手当 申請") != search_cache_key("申請 児童手当")
+    assert search_cache_key(normalize_search_query("Ａ型  就労　支援")) == search_cache_key("a型 就労 支援 2025")
+    assert search_cache_key(normalize_search_query("  NPO   相談 ")) == "npo 相談"
+
+
+def test_cache_key_maps_reiwa_year():
+    assert search_cache_key("令和7年 児童手当") == search_cache_key("2025 児童手当")
+    assert search_cache_key("R7 児童手当") == "2025 児童手当"
+
+
+def _store(clock, monkeypatch, empty_ttl):
+    monkeypatch.setattr("utils.ttl_cache.time.time", clock)
+    return SearchResultStore(
+        cache=TTLCache(ttl=3600), bucket=TokenBucket(rate=100, capacity=100), wait_seconds=1, empty_ttl=empty_ttl
+    )
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+def test_results_are_cached(clock, monkeypatch):
+    store = _store(clock, monkeypatch, empty_ttl=60)
+    calls = []
+
+    def fetch(q):
+        calls.append(q)
+        return [{"title": "t"}]
+
+    assert store.search("児童手当 2025", fetch) == [{"title": "t"}]
+    clock.now += 1800
+    assert store.search("児童手当  2025", fetch) == [{"title": "t"}]
+    assert len(calls) == 1
+
+
+def test_empty_results_use_short_ttl(clock, monkeypatch):
+    store = _store(clock, monkeypatch, empty_ttl=60)
+    calls = []
+
+    def fetch(q):
+        calls.append(q)
+        return [] if len(calls) == 1 else [{"title": "t"}]
+
+    assert store.search("q", fetch) == []
+    clock.now += 30
+    assert store.search("q", fetch) == []
+    clock.now += 31
+    assert store.search("q", fetch) == [{"title": "t"}]
+    assert len(calls) == 2
+
+
+def test_empty_results_not_cached_when_ttl_zero(clock, monkeypatch):
+    store = _store(clock, monkeypatch, empty_ttl=0)
+    calls = []
+    assert store.search("q", lambda q: calls.append(q) or None) == []
+    assert store.search("q", lambda q: calls.append(q) or None) == []
+    assert len(calls) == 2
+    assert gst.google_search_store.empty_ttl == gst.GOOGLE_SEARCH_EMPTY_CACHE_TTL
@@ -0,0 +1,221 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from infra import job_queue as jq
+from infra.job_queue import JobQueue, JobRunner
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(jq.time, "time", c)
+    return c
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=3, retention_seconds=3600)
+
+
+def test_enqueue_dedupes_identical_jobs(queue):
+    a = queue.enqueue("suggest", "client-1", version=1, payload={"x": 1})
+    b = queue.enqueue("suggest", "client-1", version=1, payload={"x": 1})
+    assert a["id"] == b["id"]
+    assert queue.stats() == {"queued": 1}
+
+
+def test_enqueue_dedupes_against_done_jobs(queue):
+    job = queue.enqueue("suggest", "client-1", version=1)
+    queue.complete(queue.claim()["id"], {"ok": True})
+    again = queue.enqueue("suggest", "client-1", version=1)
+    assert again["id"] == job["id"]
+    assert again["status"] == "done"
+
+
+def test_enqueue_coalesces_queued_job_for_subject(queue):
+    first = queue.enqueue("suggest", "client-1", version=1, payload={"x": 1})
+    second = queue.enqueue("suggest", "client-1", version=2, payload={"x": 2})
+    other = queue.enqueue("suggest", "client-2", version=1)
+    assert second["id"] == first["id"]
+    assert second["version"] == 2
+    assert second["payload"] == {"x": 2}
+    assert second["coalesced"] == 1
+    assert other["id"] != first["id"]
+    assert queue.stats() == {"queued": 2}
+
+
+def test_enqueue_does_not_coalesce_into_running_job(queue):
+    first = queue.enqueue("suggest", "client-1", version=1)
+    queue.claim()
+    second = queue.enqueue("suggest", "client-1", version=2)
+    assert second["id"] != first["id"]
+    assert queue.stats() == {"running": 1, "queued": 1}
+
+
+def test_enqueue_with_delay_debounces(queue, clock):
+    job = queue.enqueue("suggest", "client-1", version=1, delay=10)
+    assert queue.claim() is None
+    clock.now += 8
+    # 同じ内容でも delay 指定時は実行時刻を後ろへずらす
+    again = queue.enqueue("suggest", "client-1", version=1, delay=10)
+    assert again["id"] == job["id"]
+    clock.now += 8
+    assert queue.claim() is None
+    assert queue.next_available_at() == pytest.approx(clock.now + 2)
+    clock.now += 2
+    assert queue.claim()["id"] == job["id"]
+
+
+def test_claim_filters_by_kind_and_orders_by_available_at(queue, clock):
+    a = queue.enqueue("a", "s1")
+    clock.now += 1
+    b = queue.enqueue("b", "s2")
+    assert queue.claim([]) is None
+    claimed = queue.claim(["b"])
+    assert claimed["id"] == b["id"]
+    assert claimed["status"] == "running"
+    assert claimed["attempts"] == 1
+    assert queue.claim()["id"] == a["id"]
+    assert queue.claim() is None
+
+
+class _RacingConnection:
+    """claim の SELECT 直後に別プロセスの claim を割り込ませる。"""
+
+    def __init__(self, conn, interleave):
+        self._conn = conn
+        self._interleave = interleave
+
+    def execute(self, sql, params=()):
+        cur = self._conn.execute(sql, params)
+        if self._interleave is not None and sql.startswith("SELECT") and "available_at <=" in sql:
+            interleave, self._interleave = self._interleave, None
+            interleave()
+        return cur
+
+    def commit(self):
+        self._conn.commit()
+
+
+def test_claim_is_atomic_across_processes(tmp_path, clock):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, other = JobQueue(path), JobQueue(path)
+    a = first.enqueue("a", "s1")
+    clock.now += 1
+    b = first.enqueue("a", "s2")
+    taken = []
+    first._conn = _RacingConnection(first._conn, lambda: taken.append(other.claim()))
+    claimed = first.claim()
+    assert taken[0]["id"] == a["id"]
+    # 割り込まれたジョブは取得せず、次の候補を取得する
+    assert claimed["id"] == b["id"]
+    assert claimed["attempts"] == 1
+    assert other.get(a["id"])["attempts"] == 1
+    assert first.claim() is None
+
+
+def test_fail_retries_with_backoff_then_gives_up(queue, clock):
+    job = queue.enqueue("a", "s1")
+    for attempt in (1, 2):
+        claimed = queue.claim()
+        assert claimed["attempts"] == attempt
+        assert queue.fail(job["id"], "boom", claimed["attempts"]) is True
+        assert queue.get(job["id"])["status"] == "queued"
+        assert queue.claim() is None
+        clock.now += 2**attempt
+    claimed = queue.claim()
+    assert claimed["attempts"] == 3
+    assert queue.fail(job["id"], "boom", claimed["attempts"]) is False
+    failed = queue.get(job["id"])
+    assert failed["status"] == "failed"
+    assert failed["error"] == "boom"
+
+
+def test_failed_job_does_not_block_new_enqueue(queue):
+    job = queue.enqueue("a", "s1")
+    queue.claim()
+    queue.fail(job["id"], "boom", queue.max_attempts)
+    again = queue.enqueue("a", "s1")
+    assert again["id"] != job["id"]
+    assert again["status"] == "queued"
+
+
+def test_recover_requeues_running_and_prunes_old_jobs(queue, clock):
+    done = queue.enqueue("a", "done")
+    queue.complete(queue.claim()["id"])
+    running = queue.enqueue("a", "running")
+    queue.claim()
+    clock.now += 7200
+    assert queue.recover() == 1
+    assert queue.get(running["id"])["status"] == "queued"
+    assert queue.get(done["id"]) is None
+    assert queue.claim()["id"] == running["id"]
+
+
+def test_queue_survives_reopen(tmp_path, clock):
+    path = str(tmp_path / "jobs.sqlite3")
+    job = JobQueue(path).enqueue("a", "s1", payload={"k": "値"})
+    reopened = JobQueue(path)
+    assert reopened.get(job["id"])["payload"] == {"k": "値"}
+
+
+def test_progress_column_migration(tmp_path, clock):
+    path = str(tmp_path / "jobs.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY, kind TEXT NOT NULL, subject TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0,
+            payload TEXT, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+            coalesced INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, created_at REAL NOT NULL,
+            updated_at REAL NOT NULL, available_at REAL NOT NULL
+        )
+        """
+    )
+    conn.execute("INSERT INTO jobs VALUES ('old', 'a', 's1', 0, '{}', 'queued', 0, 0, NULL, NULL, 1, 1, 1)")
+    conn.commit()
+    conn.close()
+
+    queue = JobQueue(path)
+    old = queue.get("old")
+    assert old["progress"] is None
+    queue.set_progress("old", {"processed": 10})
+    assert queue.get("old")["progress"] == {"processed": 10}
+    # 2回目以降の起動では列追加をしない
+    assert JobQueue(path).get("old")["progress"] == {"processed": 10}
+
+
+def test_runner_records_progress_and_result(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    runner = JobRunner(queue, concurrency=1, poll_interval=0.05)
+
+    async def handler(payload, progress):
+        progress({"step": 1})
+        return {"echo": payload["n"]}
+
+    runner.register("echo", handler)
+
+    async def main():
+        runner.start()
+        job = queue.enqueue("echo", "s1", payload={"n": 3})
+        for _ in range(100):
+            if queue.get(job["id"])["status"] == "done":
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return queue.get(job["id"])
+
+    done = asyncio.run(main())
+    assert done["status"] == "done"
+    assert done["result"] == {"echo": 3}
+    assert done["progress"] == {"step": 1}
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from agents.llm_utils import LLMCallLimiter
+
+
+def test_timeout_excludes_queue_wait():
+    limiter = LLMCallLimiter(concurrency=2, timeout=0.2)
+
+    async def call():
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    async def main():
+        # 10 件 / 同時 2 件で全体は 0.5 秒かかるが、各呼び出しは 0.1 秒なのでタイムアウトしない
+        return await asyncio.gather(*(limiter.run(call) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["ok"] * 10
+    assert limiter.in_flight == 0
+
+
+def test_slow_call_times_out():
+    limiter = LLMCallLimiter(concurrency=1, timeout=0.05)
+
+    async def main():
+        await limiter.run(lambda: asyncio.sleep(1))
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+    assert limiter.in_flight == 0
@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from routes.common import (
+    NEXT_PAGE_TOKEN_HEADER,
+    decode_page_token,
+    encode_page_token,
+    page_response,
+    paginate_query,
+    parse_fields,
+)
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _DocRef:
+    def __init__(self, store, doc_id):
+        self.store = store
+        self.id = doc_id
+
+    def get(self):
+        return _Snapshot(self.id, self.store.docs.get(self.id))
+
+    def collection(self, name):
+        # artifacts/{app}/users/{user}/... の階層はすべて同じコレクションとして扱う
+        return self.store
+
+
+class _Query:
+    """Firestore のクエリの代わり。order_by 済みの順序は挿入順とし、呼び出しを記録する。"""
+
+    def __init__(self, store, after=None, limit=None, fields=None):
+        self.store = store
+        self.after = after
+        self.limit_n = limit
+        self.fields = fields
+
+    def _copy(self, **kwargs):
+        params = {"after": self.after, "limit": self.limit_n, "fields": self.fields, **kwargs}
+        return _Query(self.store, **params)
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def start_after(self, snapshot):
+        return self._copy(after=snapshot.id)
+
+    def limit(self, n):
+        return self._copy(limit=n)
+
+    def stream(self):
+        self.store.calls.append({"after": self.after, "limit": self.limit_n, "fields": self.fields})
+        ids = list(self.store.docs)
+        if self.after is not None:
+            ids = ids[ids.index(self.after) + 1 :]
+        if self.limit_n is not None:
+            ids = ids[: self.limit_n]
+        for doc_id in ids:
+            data = self.store.docs[doc_id]
+            if self.fields is not None:
+                data = {k: v for k, v in data.items() if k in self.fields}
+            yield _Snapshot(doc_id, data)
+
+
+class _Collection(_Query):
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+        super().__init__(self)
+
+    def document(self, doc_id):
+        return _DocRef(self, doc_id)
+
+    def collection(self, name):
+        return self
+
+
+def _collection(n):
+    base = datetime(2025, 4, 1)
+    return _Collection(
+        {
+            f"r{i}": {"clientName": "A", "content": f"内容{i}", "speaker": "本人", "timestamp": base + timedelta(i)}
+            for i in range(n)
+        }
+    )
+
+
+def test_page_token_round_trip():
+    token = encode_page_token("doc/日本語")
+    assert "=" not in token
+    assert decode_page_token(token) == "doc/日本語"
+
+
+@pytest.mark.parametrize("token", ["not-base64!", encode_page_token(""), "e30", "bnVsbA"])
+def test_bad_page_token_is_400(token):
+    with pytest.raises(HTTPException) as exc:
+        decode_page_token(token)
+    assert exc.value.status_code == 400
+
+
+def test_paginate_query_walks_pages_with_lookahead():
+    col = _collection(5)
+    docs, token = paginate_query(col, col, page_size=2)
+    assert [d.id for d in docs] == ["r0", "r1"]
+    # 次ページの有無は page_size + 1 件取得して判定する
+    assert col.calls[-1]["limit"] == 3
+    assert decode_page_token(token) == "r1"
+
+    docs, token = paginate_query(col, col, page_size=2, page_token=token)
+    assert [d.id for d in docs] == ["r2", "r3"]
+    assert col.calls[-1]["after"] == "r1"
+
+    docs, token = paginate_query(col, col, page_size=2, page_token=token)
+    assert [d.id for d in docs] == ["r4"]
+    assert token is None
+
+
+def test_paginate_query_exact_last_page_has_no_token():
+    col = _collection(4)
+    _, token = paginate_query(col, col, page_size=2)
+    docs, token = paginate_query(col, col, page_size=2, page_token=token)
+    assert [d.id for d in docs] == ["r2", "r3"]
+    assert token is None
+
+
+def test_paginate_query_without_page_size_returns_all():
+    col = _collection(3)
+    docs, token = paginate_query(col, col)
+    assert len(docs) == 3 and token is None
+    assert col.calls[-1]["limit"] is None
+
+
+def test_paginate_query_missing_cursor_is_400():
+    col = _collection(3)
+    with pytest.raises(HTTPException) as exc:
+        paginate_query(col, col, page_size=2, page_token=encode_page_token("deleted"))
+    assert exc.value.status_code == 400
+
+
+def test_paginate_query_applies_projection():
+    col = _collection(2)
+    docs, _ = paginate_query(col, col, select=["content"])
+    assert col.calls[-1]["fields"] == ["content"]
+    assert docs[0].to_dict() == {"content": "内容0"}
+
+
+def test_parse_fields():
+    assert parse_fields(None, ["a", "b"]) is None
+    assert parse_fields(" b, a ,b,", ["a", "b"]) == ["b", "a"]
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("a,secret", ["a", "b"])
+    assert exc.value.status_code == 400
+
+
+def test_page_response_sets_header():
+    response = Response()
+    items = [{"id": "r0"}]
+    assert page_response(items, response, "tok") is items
+    assert response.headers[NEXT_PAGE_TOKEN_HEADER] == "tok"
+
+    projected = page_response([{"id": "r0", "when": datetime(2025, 4, 1)}], Response(), "tok", projected=True)
+    assert isinstance(projected, JSONResponse)
+    assert projected.headers[NEXT_PAGE_TOKEN_HEADER] == "tok"
+    assert projected.body == b'[{"id":"r0","when":"2025-04-01T00:00:00"}]'
+
+
+@pytest.fixture
+def interview_client(monkeypatch):
+    from routes.interview_records import router as interview_router
+
+    col = _collection(3)
+    monkeypatch.setattr(interview_router, "db", col)
+    app = FastAPI()
+    app.include_router(interview_router.router, prefix="/interview_records")
+    return TestClient(app), col
+
+
+def test_interview_records_projection_keeps_id(interview_client):
+    client, col = interview_client
+    res = client.get("/interview_records/", params={"client_name": "A", "page_size": 2, "fields": "content"})
+    assert res.status_code == 200
+    assert res.json() == [{"id": "r0", "content": "内容0"}, {"id": "r1", "content": "内容1"}]
+    assert col.calls[-1]["fields"] == ["content"]
+
+    token = res.headers[NEXT_PAGE_TOKEN_HEADER]
+    res = client.get("/interview_records/", params={"client_name": "A", "page_size": 2, "page_token": token})
+    assert [r["id"] for r in res.json()] == ["r2"]
+    assert res.json()[0]["speaker"] == "本人"
+    assert NEXT_PAGE_TOKEN_HEADER not in res.headers
+
+
+def test_interview_records_bad_token_and_field(interview_client):
+    client, _ = interview_client
+    res = client.get("/interview_records/", params={"client_name": "A", "page_token": "garbage"})
+    assert res.status_code == 400
+    res = client.get("/interview_records/", params={"client_name": "A", "fields": "password"})
+    assert res.status_code == 400
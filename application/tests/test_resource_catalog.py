@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+import config
+from routes import common
+from routes.resources.catalog import ResourceCatalog
+from routes.resources.vector_index import ResourceVectorIndex
+from utils.vector_codec import encode_vector
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.update_time = "t1"
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeCollection:
+    """on_snapshot は別スレッドから遅れて初回スナップショットを届ける。"""
+
+    def __init__(self, docs, snapshot_delay=None, stream_error=None):
+        self.docs = docs
+        self.snapshot_delay = snapshot_delay
+        self.stream_error = stream_error
+        self.watch_calls = 0
+        self.stream_calls = 0
+
+    def on_snapshot(self, callback):
+        self.watch_calls += 1
+        if self.snapshot_delay is not None:
+            timer = threading.Timer(self.snapshot_delay, callback, args=(list(self.docs), [], None))
+            timer.start()
+        return self
+
+    def unsubscribe(self):
+        pass
+
+    def stream(self):
+        self.stream_calls += 1
+        if self.stream_error is not None:
+            raise self.stream_error
+        return iter(self.docs)
+
+
+def _docs():
+    return [FakeDoc("r1", {"service_name": "A"}), FakeDoc("r2", {"service_name": "B"})]
+
+
+def test_concurrent_ensure_started_waits_for_snapshot(monkeypatch):
+    collection = FakeCollection(_docs(), snapshot_delay=0.2)
+    monkeypatch.setattr(common, "resource_collection", lambda: collection)
+    catalog = ResourceCatalog()
+    seen = []
+
+    def worker():
+        catalog.ensure_started()
+        seen.append(len(catalog.list()))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen == [2, 2, 2, 2]
+    assert collection.watch_calls == 1
+    assert catalog.live
+
+
+def test_failed_fallback_is_retried(monkeypatch):
+    collection = FakeCollection(_docs(), stream_error=RuntimeError("unavailable"))
+    monkeypatch.setattr(common, "resource_collection", lambda: collection)
+    catalog = ResourceCatalog()
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        catalog.start(timeout=0.05)
+    assert not catalog.ready
+
+    collection.stream_error = None
+    catalog.ensure_started()
+    assert catalog.ready
+    assert [r.id for r in catalog.list()] == ["r1", "r2"]
+    # リスナーは登録済みのため、再試行では初回スナップショットを待ち直さない
+    assert collection.watch_calls == 1
+    assert collection.stream_calls == 2
+    assert time.monotonic() - started < 1.0
+
+
+def test_late_subscriber_receives_vectors():
+    catalog = ResourceCatalog()
+    packed = {"embedding_packed": encode_vector([1.0, 0.0, 0.0], "float16"), "embedding_model": config.EMBED_MODEL}
+    catalog._reset(
+        [
+            FakeDoc("r1", {"service_name": "A", **packed}),
+            FakeDoc("r2", {"service_name": "B", "embedding": [0.0, 1.0, 0.0]}),
+            FakeDoc("r3", {"service_name": "C"}),
+        ]
+    )
+    # ベクトルを含まない更新では既存のベクトルを維持する
+    catalog.upsert_local(catalog.get("r1").model_copy(update={"service_name": "A2"}), {"service_name": "A2"})
+
+    index = ResourceVectorIndex()
+    catalog.subscribe(index)
+    scores = index.scores([1.0, 0.0, 0.0])
+    assert scores["r1"] == pytest.approx(1.0, abs=1e-3)
+    assert scores.get("r2", 0.0) == pytest.approx(0.0, abs=1e-3)
+    assert index.scores([0.0, 1.0, 0.0])["r2"] == pytest.approx(1.0, abs=1e-3)
+    assert "r3" not in scores
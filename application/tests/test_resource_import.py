@@ -0,0 +1,197 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from routes.resources.imports import service
+from routes.resources.imports.reader import (
+    ResourceFileFormatError,
+    csv_row_to_entry,
+    iter_csv,
+    iter_json_array,
+    iter_json_lines,
+)
+from utils.ttl_cache import TTLCache
+
+
+ITEMS = [1.5, 2, -3e10, 0, True, False, None, "a, ]", {"x": [1, {"y": "z"}]}, [], 12345678901234567890]
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 5, 7, 64, 64 * 1024])
+def test_iter_json_array_across_chunk_sizes(chunk_chars):
+    text = json.dumps(ITEMS, ensure_ascii=False)
+    assert list(iter_json_array(io.StringIO(text), chunk_chars)) == ITEMS
+    spaced = "\n  [ " + " ,\n ".join(json.dumps(i) for i in ITEMS) + " ]\n"
+    assert list(iter_json_array(io.StringIO(spaced), chunk_chars)) == ITEMS
+
+
+def test_iter_json_array_number_split_at_boundary():
+    assert list(iter_json_array(io.StringIO("[1.5, 2]"), 3)) == [1.5, 2]
+    assert list(iter_json_array(io.StringIO("[10, 2e3]"), 2)) == [10, 2000.0]
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(io.StringIO("[]"), 1)) == []
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 3, 64])
+@pytest.mark.parametrize(
+    "text",
+    ['{"a": 1}', "[1, 2", '[{"a": 1} {"b": 2}]', "[1.5.3]", '[{"a": }]', "[tru]", "", "[1,, 2]"],
+)
+def test_iter_json_array_malformed(text, chunk_chars):
+    with pytest.raises(ResourceFileFormatError):
+        list(iter_json_array(io.StringIO(text), chunk_chars))
+
+
+def test_iter_json_lines():
+    assert list(iter_json_lines(io.StringIO('{"a": 1}\n\n{"b": 2}\n'))) == [{"a": 1}, {"b": 2}]
+    with pytest.raises(ResourceFileFormatError, match="2行目"):
+        list(iter_json_lines(io.StringIO('{"a": 1}\n{"b": \n')))
+
+
+def test_csv_row_to_entry():
+    entry = csv_row_to_entry(
+        {
+            " service_name ": " 就労支援 ",
+            "keywords": "就労、相談|若者; 求職",
+            "contact_phone": "000-0000",
+            "contact_info.url": "https://example.jp",
+            "description": "",
+            "cost": None,
+            None: ["余分な列"],
+        }
+    )
+    assert entry == {
+        "service_name": "就労支援",
+        "keywords": ["就労", "相談", "若者", "求職"],
+        "contact_info": {"phone": "000-0000", "url": "https://example.jp"},
+    }
+
+
+def test_csv_row_without_contact():
+    assert csv_row_to_entry({"service_name": "A", "contact_email": " "}) == {"service_name": "A"}
+
+
+def test_iter_csv():
+    rows = list(iter_csv(io.StringIO("service_name,keywords\nA,x y\nB,\n")))
+    assert rows == [{"service_name": "A", "keywords": ["x", "y"]}, {"service_name": "B"}]
+
+
+class _FakeRef:
+    def __init__(self, doc_id):
+        self.id = doc_id
+
+
+class _FakeCollection:
+    def document(self, doc_id):
+        return _FakeRef(doc_id)
+
+
+class _FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append((ref.id, data))
+
+    def commit(self):
+        if self.db.fail_commits:
+            self.db.fail_commits -= 1
+            raise RuntimeError("commit failed")
+        self.db.docs.update(self.ops)
+
+
+class _FakeFirestore:
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self.fail_commits = 0
+
+    def get_all(self, refs, field_paths=None):
+        for ref in refs:
+            yield type("Snapshot", (), {"id": ref.id, "exists": ref.id in self.docs})()
+
+    def batch(self):
+        return _FakeBatch(self)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = _FakeFirestore()
+    monkeypatch.setattr(service, "db", db)
+    monkeypatch.setattr(service, "resource_collection", lambda: _FakeCollection())
+    monkeypatch.setattr(service, "import_checkpoints", TTLCache(ttl=3600, max_items=10))
+    monkeypatch.setattr(service, "exponential_backoff", lambda func, max_attempts=3: func())
+
+    async def aembed_texts(texts):
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+    monkeypatch.setattr(service, "aembed_texts", aembed_texts)
+    return db
+
+
+def _records(n):
+    return [{"service_name": f"資源{i}", "description": "説明"} for i in range(n)]
+
+
+def _names(db):
+    return sorted(d["service_name"] for d in db.docs.values())
+
+
+def test_import_resources_resumes_from_checkpoint(fake_db):
+    totals = {
+        "total_input": 2,
+        "created": 2,
+        "updated": 0,
+        "skipped": 0,
+        "errors": [],
+        "skipped_invalid_service_name": 0,
+        "missing_field_counts": {f: 0 for f in service.TRACK_FIELDS},
+    }
+    service.import_checkpoints.put("key", {"offset": 2, "totals": totals})
+    progress = []
+
+    result = asyncio.run(
+        service.import_resources(_records(5), checkpoint_key="key", chunk_size=2, progress=progress.append)
+    )
+
+    # 処理済みの 2 件は読み飛ばし、残り 3 件だけを書き込む
+    assert _names(fake_db) == ["資源2", "資源3", "資源4"]
+    assert result["resumed_from"] == 2
+    assert result["total_input"] == 5
+    assert result["created"] == 5
+    assert [p["processed"] for p in progress] == [4, 5]
+    assert service.import_checkpoints.get("key") is None
+
+
+def test_import_resources_saves_checkpoint_until_finished(fake_db):
+    async def interrupted():
+        progress_calls = []
+
+        def progress(p):
+            progress_calls.append(p)
+            if len(progress_calls) == 2:
+                raise KeyboardInterrupt
+
+        await service.import_resources(_records(5), checkpoint_key="key", chunk_size=2, progress=progress)
+
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(interrupted())
+    saved = service.import_checkpoints.get("key")
+    assert saved["offset"] == 4
+    assert saved["totals"]["created"] == 4
+
+    result = asyncio.run(service.import_resources(_records(5), checkpoint_key="key", chunk_size=2))
+    assert _names(fake_db) == [f"資源{i}" for i in range(5)]
+    assert result["resumed_from"] == 4
+    assert result["created"] == 5
+    assert service.import_checkpoints.get("key") is None
+
+
+def test_import_resources_dry_run_skips_writes_and_checkpoint(fake_db):
+    result = asyncio.run(service.import_resources(_records(3), dry_run=True, checkpoint_key="key", chunk_size=2))
+    assert fake_db.docs == {}
+    assert result["created"] == 3
+    assert service.import_checkpoints.get("key") is None
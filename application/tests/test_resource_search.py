@@ -0,0 +1,50 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.pydantic_models import Resource
+from routes.resources import router as resources_router
+from routes.resources.search_index import ResourceSearchIndex
+
+
+def _index():
+    index = ResourceSearchIndex()
+    index.load(
+        [
+            Resource(id="r1", service_name="生活保護", description="生活に困窮する方への支援"),
+            Resource(id="r2", service_name="生活福祉資金", description="生活費の貸付"),
+            Resource(id="r3", service_name="就労支援", description="ハローワークと連携"),
+            Resource(id="r4", service_name="ＤＶ相談", description="配偶者からの暴力"),
+        ],
+        [("m1", "r3", "生活の立て直しも相談できる")],
+    )
+    index.memos_loaded = True
+    return index
+
+
+def test_search_matches_bigram_trigram_and_memos():
+    index = _index()
+    # 2文字は bigram、3文字以上は trigram の積集合から候補を絞る
+    assert sorted(r.id for r in index.search("生活")[0]) == ["r1", "r2", "r3"]
+    assert [r.id for r in index.search("生活保護")[0]] == ["r1"]
+    assert [r.id for r in index.search("生活 貸付")[0]] == ["r2"]
+    # n-gram が揃っても連続していなければ一致しない
+    assert index.search("保護生活") == ([], 0)
+    # NFKC 正規化により全角・半角の表記揺れも一致する
+    assert [r.id for r in index.search("dv")[0]] == ["r4"]
+
+
+def test_search_endpoint_paginates_with_total_count(monkeypatch):
+    monkeypatch.setattr(resources_router, "resource_search_index", _index())
+    app = FastAPI()
+    app.include_router(resources_router.router)
+    client = TestClient(app)
+
+    first = client.get("/resources/search", params={"q": "生活", "limit": 2})
+    assert first.status_code == 200
+    assert first.headers["X-Total-Count"] == "3"
+    assert len(first.json()) == 2
+
+    rest = client.get("/resources/search", params={"q": "生活", "limit": 2, "offset": 2})
+    assert rest.headers["X-Total-Count"] == "3"
+    ids = [r["id"] for r in first.json() + rest.json()]
+    assert sorted(ids) == ["r1", "r2", "r3"]
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+import config
+from agents import router_agent as router_module
+from agents.router_agent import RouterAgent
+
+
+def test_slow_embedding_falls_through_to_llm(monkeypatch):
+    agent = RouterAgent(api_key="test")
+    calls = []
+
+    async def aembed(texts, max_attempts=None):
+        calls.append(max_attempts)
+        await asyncio.sleep(5)
+        return [[1.0, 0.0]]
+
+    class _Chain:
+        async def ainvoke(self, inputs):
+            return {"text": '{"next_agent": "support_plan"}'}
+
+    monkeypatch.setattr(router_module.embedding_service, "aembed", aembed)
+    monkeypatch.setattr(config, "ROUTER_EMBED_TIMEOUT", 0.05)
+    agent.chain = _Chain()
+
+    started = time.perf_counter()
+    route = asyncio.run(agent.route("母子家庭で使える家賃の補助があるか調べたい"))
+    assert route.next_agent == "support_plan"
+    assert time.perf_counter() - started < 1
+    assert calls == [1]
+    assert agent.stats()["llm_calls"] == 1
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+from routes.interactive_support_plan.speculative import PrefetchedStream
+
+
+class _EndlessSource:
+    """閉じられるまでチャンクを出し続けるストリーム（LLM の astream の代わり）。"""
+
+    def __init__(self):
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        return "chunk"
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_prefetched_stream_cancel_stops_pump_and_closes_source():
+    async def main():
+        source = _EndlessSource()
+        prefetch = PrefetchedStream(source, buffer_size=4)
+        it = prefetch.__aiter__()
+        assert await it.__anext__() == "chunk"
+        await prefetch.cancel()
+        await prefetch.cancel()  # 二重に呼んでもよい
+        return prefetch, source
+
+    prefetch, source = asyncio.run(main())
+    assert prefetch._task.cancelled()
+    assert source.closed
+
+
+def test_speculative_hit_cancels_pump_when_client_disconnects():
+    from routes.interactive_support_plan import router as interactive_router
+    from routes.interactive_support_plan.models.interactive import InteractiveSupportPlanRequest
+
+    source = _EndlessSource()
+    created: list[PrefetchedStream] = []
+
+    class _Prefetch(PrefetchedStream):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    class _RouterAgent:
+        async def route(self, message):
+            return SimpleNamespace(next_agent="conversational")
+
+    class _ConversationalAgent:
+        async def generate_response_stream(self, **kwargs):
+            return source
+
+    state = SimpleNamespace(router_agent=_RouterAgent(), conversational_agent=_ConversationalAgent())
+    request = SimpleNamespace(app=SimpleNamespace(state=state))
+    req = InteractiveSupportPlanRequest(client_name="A", assessment_data={}, message="こんにちは")
+
+    async def main():
+        original = interactive_router.PrefetchedStream
+        interactive_router.PrefetchedStream = _Prefetch
+        try:
+            gen = interactive_router._speculative_stream(req, request, 0.0)
+            assert await gen.__anext__() == "chunk"
+            # StreamingResponse はクライアント切断時にジェネレータを閉じる
+            await gen.aclose()
+        finally:
+            interactive_router.PrefetchedStream = original
+
+    asyncio.run(main())
+    assert created and created[0]._task.cancelled()
+    assert source.closed
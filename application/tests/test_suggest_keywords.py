@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+from models.pydantic_models import Resource
+from routes.resources.keyword_index import ResourceKeywordIndex
+from routes.resources.tokenizer import MorphologicalTokenizer, NgramTokenizer
+
+
+def _index(keywords_by_id: dict[str, list[str]]) -> ResourceKeywordIndex:
+    index = ResourceKeywordIndex()
+    index.on_catalog_reset(
+        [(Resource(id=rid, service_name=rid, keywords=kws), {}) for rid, kws in keywords_by_id.items()]
+    )
+    return index
+
+
+def _scores(index, text):
+    tokenized = NgramTokenizer(max_n=config.SUGGEST_NGRAM_MAX).tokenize(text)
+    ids, scores = index.match_scores(tokenized.terms, tokenized.text)
+    return dict(zip(ids, scores.tolist())), tokenized
+
+
+def test_single_short_ngram_hit_does_not_pass_stage_one():
+    index = _index({"a": ["支援"], "b": ["就労移行支援"], "c": ["家計"]})
+    scores, _ = _scores(index, "本人は就労の相談と生活の支援を希望している")
+    # n-gram 照合ではどこにでも一致する2文字語が1つ一致しただけでは閾値を超えない
+    assert scores["a"] * config.SUGGEST_KEYWORD_WEIGHT <= config.SUGGEST_SCORE_THRESHOLD
+    assert scores["b"] == 0
+    assert scores["c"] == 0
+
+
+def test_rare_full_length_keyword_passes_stage_one():
+    index = _index({"a": ["就労移行支援"], "b": ["家計相談"], "c": ["住居確保"]})
+    scores, _ = _scores(index, "就労移行支援の利用を検討中")
+    assert scores["a"] == pytest.approx(1.0)
+    assert scores["a"] * config.SUGGEST_KEYWORD_WEIGHT > config.SUGGEST_SCORE_THRESHOLD
+
+
+def test_common_keyword_weighs_less_than_rare_keyword():
+    index = _index({"a": ["生活相談", "就労準備"], "b": ["生活相談"], "c": ["生活相談"], "d": ["家計改善"]})
+    scores, _ = _scores(index, "生活相談と就労準備")
+    # 4資源中3資源が持つ「生活相談」は、1資源だけが持つ「就労準備」より軽い
+    assert 0 < scores["b"] < 0.6
+    assert scores["a"] == pytest.approx(scores["b"] + 1.0)
+
+
+def test_long_keyword_matches_by_substring():
+    long_kw = "生活困窮者自立支援制度"
+    assert len(long_kw) > config.SUGGEST_NGRAM_MAX
+    index = _index({"a": [long_kw], "b": ["困窮者自立支援制度の案内"]})
+    scores, tokenized = _scores(index, "市の生活困窮者自立支援制度による相談を継続")
+    assert long_kw not in tokenized.terms
+    assert scores["a"] == pytest.approx(1.0)
+    assert scores["b"] == 0
+    assert index.overlap("a", set(tokenized.terms), tokenized.text) == [long_kw]
+    assert index.overlap("a", set(tokenized.terms)) == []
+
+
+def test_removed_resource_keywords_are_not_matched():
+    index = _index({"a": ["生活困窮者自立支援制度"], "b": ["家計改善"]})
+    index.on_catalog_remove("a")
+    ids, scores = index.match_scores(set(), "生活困窮者自立支援制度")
+    assert ids == ["b"]
+    assert scores.tolist() == [0.0]
+
+
+def test_morphological_tokenizer_uses_one_analyzer_per_thread():
+    pytest.importorskip("janome")
+    tokenizer = MorphologicalTokenizer("janome")
+    analyzers = {}
+    lock = threading.Lock()
+    text = "母子家庭で就労支援と家計相談を希望。住居確保給付金の申請を検討している。"
+
+    def work(_):
+        result = tokenizer.tokenize(text)
+        with lock:
+            analyzers.setdefault(threading.get_ident(), set()).add(id(tokenizer._analyzer()))
+        return result
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(work, range(40)))
+    assert all(r == results[0] for r in results)
+    assert "就労支援" in results[0].terms
+    assert all(len(ids) == 1 for ids in analyzers.values())
+    assert len({i for ids in analyzers.values() for i in ids}) == len(analyzers)
@@ -0,0 +1,57 @@
+import base64
+
+import numpy as np
+import pytest
+
+from routes.resources.service import resource_embedding
+from utils.vector_codec import decode_vector, encode_vector
+
+
+def _vector(dim=768, seed=0):
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def _cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_round_trip_keeps_direction(dtype):
+    vec = _vector()
+    packed = encode_vector(vec.tolist(), dtype)
+    assert packed["dtype"] == dtype
+    assert packed["dim"] == vec.size
+    decoded = decode_vector(packed)
+    assert decoded.dtype == np.float32
+    assert decoded.shape == vec.shape
+    assert _cosine(vec, decoded) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_int8_all_zero_vector():
+    packed = encode_vector([0.0] * 8, "int8")
+    assert packed["scale"] == 1.0
+    assert decode_vector(packed).tolist() == [0.0] * 8
+
+
+def test_decode_base64_string_data():
+    vec = _vector(16)
+    packed = encode_vector(vec, "float16")
+    as_json = {**packed, "data": base64.b64encode(packed["data"]).decode("ascii")}
+    assert np.array_equal(decode_vector(as_json), decode_vector(packed))
+
+
+def test_decode_rejects_malformed_input():
+    packed = encode_vector(_vector(16), "float16")
+    assert decode_vector({**packed, "dim": 15}) is None
+    assert decode_vector({**packed, "dtype": "float64"}) is None
+    assert decode_vector(None) is None
+    with pytest.raises(ValueError):
+        encode_vector([1.0], "float64")
+
+
+def test_resource_embedding_prefers_packed_and_falls_back_to_legacy():
+    legacy = [0.5, -0.25, 1.0]
+    assert resource_embedding({"embedding": legacy}).tolist() == legacy
+    packed = encode_vector([1.0, 0.0, 0.0], "float16")
+    assert resource_embedding({"embedding_packed": packed, "embedding": legacy}).tolist() == [1.0, 0.0, 0.0]
+    assert resource_embedding({}) is None
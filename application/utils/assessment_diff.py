@@ -0,0 +1,90 @@
+"""アセスメントの変更検出。
+
+サジェスト再生成の要否判定に使う。文字列は NFKC 正規化と空白の畳み込みを行ってから比較するため、
+全角/半角や改行位置だけの違いは変更として扱わない。
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Any
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", value)).strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+def assessment_content_hash(assessment: Any) -> str:
+    """正規化済みアセスメントの sha256。同じ内容なら同じキーになる。"""
+    canonical = json.dumps(_normalize_value(assessment), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def flatten_assessment(assessment: Any, prefix: str = "") -> dict[str, str]:
+    """ネストしたアセスメントを {"項目.小項目": 値} の形に平坦化する（空値は除外）。"""
+    out: dict[str, str] = {}
+    if isinstance(assessment, dict):
+        for k, v in assessment.items():
+            out.update(flatten_assessment(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(assessment, (list, tuple)):
+        for i, v in enumerate(assessment):
+            out.update(flatten_assessment(v, f"{prefix}[{i}]"))
+    elif assessment is not None:
+        text = _normalize_value(assessment if isinstance(assessment, str) else json.dumps(assessment, default=str))
+        if text:
+            out[prefix] = text
+    return out
+
+
+def _changed_spans(old: str, new: str) -> tuple[int, bool]:
+    """(変更文字数, 変更箇所に数字を含むか) を返す。"""
+    changed = 0
+    digits = False
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        changed += max(i2 - i1, j2 - j1)
+        digits = digits or any(ch.isdigit() for ch in old[i1:i2] + new[j1:j2])
+    return changed, digits
+
+
+def diff_assessments(old: Any, new: Any) -> dict:
+    """項目単位の差分。added/removed/changed は項目パスのリスト、changed_chars は変更文字数の合計。"""
+    a = flatten_assessment(old or {})
+    b = flatten_assessment(new or {})
+    added = sorted(set(b) - set(a))
+    removed = sorted(set(a) - set(b))
+    changed = sorted(k for k in set(a) & set(b) if a[k] != b[k])
+    changed_chars = sum(len(b[k]) for k in added) + sum(len(a[k]) for k in removed)
+    digits_changed = False
+    for k in changed:
+        n, digits = _changed_spans(a[k], b[k])
+        changed_chars += n
+        digits_changed = digits_changed or digits
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "changed_chars": changed_chars,
+        "digits_changed": digits_changed,
+    }
+
+
+def is_trivial_change(old: Any, new: Any, min_changed_chars: int) -> bool:
+    """軽微な変更（誤字・句読点の修正など）かどうか。
+
+    項目の追加/削除がなく、数字（金額・要介護度・日付など）に変更がなく、
+    変更文字数が閾値未満の場合に True。
+    """
+    diff = diff_assessments(old, new)
+    if diff["added"] or diff["removed"] or diff["digits_changed"]:
+        return False
+    return diff["changed_chars"] < min_changed_chars
@@ -0,0 +1,104 @@
+"""アセスメントのダイジェスト。
+
+アセスメント dict の平坦化・正規化・ハッシュ計算を1回だけ行い、そこから作るテキスト・トークン・埋め込みを
+内容ハッシュ単位でメモ化する。suggest と各エージェント（プロンプトの文脈）で共有し、
+同じアセスメントに対して毎回 json.dumps や再埋め込みをしないようにする。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import config
+from utils.assessment_diff import assessment_content_hash, flatten_assessment
+
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_TEXT_MAX_CHARS = 20000
+PROMPT_CONTEXT_MAX_CHARS = 8000
+
+
+class AssessmentDigest:
+    def __init__(self, assessment: Any, content_hash: Optional[str] = None):
+        self.hash = content_hash or assessment_content_hash(assessment)
+        # {"項目.小項目": 正規化済みの値}（空値は除外、元の順序を保持）
+        self.items: dict[str, str] = flatten_assessment(assessment)
+        self._derived: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def text(self) -> str:
+        """値のみを改行で連結したテキスト（検索・埋め込み用）。"""
+        return self.derive("text", lambda: "\n".join(self.items.values())[:SUGGEST_TEXT_MAX_CHARS])
+
+    def context(self, max_chars: Optional[int] = PROMPT_CONTEXT_MAX_CHARS) -> str:
+        """「項目: 値」の行で表したプロンプト用の文脈。JSON の整形より短く、同じ文字数でより多くの項目が入る。"""
+        full = self.derive("context", lambda: "\n".join(f"{k}: {v}" for k, v in self.items.items()))
+        return full[:max_chars] if max_chars else full
+
+    def derive(self, name: str, factory: Callable[[], Any]) -> Any:
+        """name ごとに factory の結果を1回だけ計算して保持する。"""
+        with self._lock:
+            if name in self._derived:
+                return self._derived[name]
+        value = factory()
+        with self._lock:
+            return self._derived.setdefault(name, value)
+
+    async def aembedding(self) -> list[float]:
+        """text の埋め込み。失敗時は空リストを返し、保持せず次回に再試行する。"""
+        cached = self._derived.get("embedding")
+        if cached:
+            return cached
+        if not self.text:
+            return []
+        try:
+            from infra.embedding import embedding_service
+
+            vec = (await embedding_service.aembed([self.text]))[0]
+        except Exception as e:
+            logger.error(f"assessment digest embedding failed: {e}")
+            return []
+        if vec:
+            with self._lock:
+                self._derived["embedding"] = vec
+        return vec
+
+
+class AssessmentDigestCache:
+    def __init__(self, max_items: int = 256):
+        self.max_items = max(1, max_items)
+        self._items: OrderedDict[str, AssessmentDigest] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, assessment: Any) -> AssessmentDigest:
+        """内容ハッシュのみ計算し、平坦化はキャッシュにない場合だけ行う。"""
+        content_hash = assessment_content_hash(assessment)
+        with self._lock:
+            cached = self._items.get(content_hash)
+            if cached is not None:
+                self._items.move_to_end(content_hash)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        digest = AssessmentDigest(assessment, content_hash)
+        with self._lock:
+            digest = self._items.setdefault(content_hash, digest)
+            self._items.move_to_end(content_hash)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return digest
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "items": len(self._items)}
+
+
+assessment_digests = AssessmentDigestCache(max_items=config.ASSESSMENT_DIGEST_CACHE_ITEMS)
+
+
+def assessment_digest(assessment: Any) -> AssessmentDigest:
+    return assessment_digests.get(assessment)
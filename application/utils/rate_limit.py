@@ -0,0 +1,40 @@
+"""スレッドセーフなトークンバケット。"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """rate 個/秒で補充され、最大 capacity 個まで貯まるトークンバケット。"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """トークンを1つ取得できれば 0、できなければ次のトークンまでの待ち秒数を返す。"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float) -> bool:
+        """timeout 秒までブロックしてトークンを取得する。取得できなければ False。"""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
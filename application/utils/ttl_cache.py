@@ -0,0 +1,119 @@
+"""有効期限付きキャッシュ（メモリ LRU + 任意でローカル SQLite）。
+
+値は JSON シリアライズ可能なものに限る。SQLite を指定した場合はプロセス再起動後も有効期限まで再利用できる。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    def __init__(self, ttl: float, max_items: int = 1000, path: Optional[str] = None, namespace: str = "default"):
+        self.ttl = ttl
+        self.max_items = max(1, max_items)
+        self.namespace = namespace
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ttl_cache (namespace TEXT NOT NULL, key TEXT NOT NULL,"
+                    " value TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                )
+                self._conn.execute("DELETE FROM ttl_cache WHERE expires_at < ?", (time.time(),))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"ttl cache: disk tier disabled ({path}): {e}")
+                self._conn = None
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, expires_at FROM ttl_cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"ttl cache read failed: {e}")
+                    row = None
+                if row is not None:
+                    entry = (row[1], json.loads(row[0]))
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                self._memory.pop(key, None)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, (expires_at, value))
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ttl_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    # 期限切れ行を定期的に掃除する
+                    self._conn.execute("DELETE FROM ttl_cache WHERE expires_at < ?", (time.time(),))
+                self._conn.commit()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning(f"ttl cache write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("DELETE FROM ttl_cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"ttl cache delete failed: {e}")
+
+    def _remember(self, key: str, entry: tuple[float, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_items": len(self._memory),
+            "disk_enabled": self._conn is not None,
+        }
@@ -0,0 +1,53 @@
+"""埋め込みベクトルのコンパクトな保存形式。
+
+Firestore に float の配列で保存すると 768 次元で 1 件あたり数十KB（読み込み後は Python の float オブジェクト）になるため、
+float16 または int8（最大絶対値でスケーリング）のバイト列にして {"dtype", "dim", "scale", "data"} の map で保存する。
+data は Firestore の bytes 型。JSON 経由で受け取った base64 文字列も復号できる。
+"""
+
+import base64
+from typing import Optional
+
+import numpy as np
+
+
+SUPPORTED_DTYPES = ("float16", "int8")
+
+
+def encode_vector(vec, dtype: str = "float16") -> dict:
+    arr = np.asarray(vec, dtype=np.float32).ravel()
+    if dtype == "int8":
+        scale = float(np.max(np.abs(arr))) / 127.0 if arr.size else 0.0
+        scale = scale or 1.0
+        q = np.clip(np.rint(arr / scale), -127, 127).astype(np.int8)
+        return {"dtype": "int8", "dim": int(arr.size), "scale": scale, "data": q.tobytes()}
+    if dtype != "float16":
+        raise ValueError(f"unsupported vector dtype: {dtype}")
+    return {"dtype": "float16", "dim": int(arr.size), "data": arr.astype("<f2").tobytes()}
+
+
+def decode_vector(packed: Optional[dict]) -> Optional[np.ndarray]:
+    """float32 の1次元配列に戻す。形式が不正なら None。"""
+    if not isinstance(packed, dict):
+        return None
+    data = packed.get("data")
+    if isinstance(data, str):
+        try:
+            data = base64.b64decode(data)
+        except ValueError:
+            return None
+    if not isinstance(data, (bytes, bytearray)):
+        return None
+    dtype = packed.get("dtype")
+    try:
+        if dtype == "float16":
+            arr = np.frombuffer(data, dtype="<f2").astype(np.float32)
+        elif dtype == "int8":
+            arr = np.frombuffer(data, dtype=np.int8).astype(np.float32) * float(packed.get("scale") or 1.0)
+        else:
+            return None
+    except ValueError:
+        return None
+    if packed.get("dim") and arr.size != packed["dim"]:
+        return None
+    return arr